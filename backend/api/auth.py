@@ -2,8 +2,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from backend.db.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.db.database import get_async_db
 from backend.models.models import User
 from backend.schema.schemas import UserCreate, UserOut
 from ..utils.utils import (  # we'll move shared functions here
@@ -22,24 +23,25 @@ router = APIRouter(prefix="/api", tags=["auth"])
 
 
 @router.post("/signup", response_model=UserOut)
-def signup(user: UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == user.email).first()
+async def signup(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = await db.scalar(select(User.id).where(User.email == user.email))
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
-    db_user = create_user(db, user)
+    db_user = await create_user(db, user)
     return db_user
 
 
 @router.post("/login")
-def login(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=401, detail="Incorrect email or password")
 
-    access_token = create_access_token({"sub": user.email})
-    refresh_token = create_refresh_token({"sub": user.email})
+    # The user id travels in the token so requests never look it up again
+    access_token = create_access_token({"sub": user.email, "uid": user.id})
+    refresh_token = create_refresh_token({"sub": user.email, "uid": user.id})
 
     resp = JSONResponse(content={"access_token": access_token, "token_type": "bearer"})
     resp.set_cookie(
@@ -55,7 +57,7 @@ def login(
 
 @router.post("/refresh")
 def refresh(token_data: dict = Depends(verify_token)):
-    access_token = create_access_token({"sub": token_data["sub"]})
+    access_token = create_access_token({"sub": token_data["sub"], "uid": token_data.get("uid")})
     return {"access_token": access_token}
 
 
@@ -1,62 +1,199 @@
 from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 import json
-from backend.api.helpers import summarize, search, extract
+import os
+import time
+import asyncio
+from typing import AsyncIterator
+from backend.api.helpers import search, extract
+from backend.rag.reranker import reranker, RERANK_ENABLED, RERANK_CANDIDATES, RERANK_TOP_K
+from backend.rag.answer_cache import answer_cache, ANSWER_CACHE_ENABLED
+from backend.rag.query_embedder import embed_query
+from backend.rag.corpus import get_corpus_version
+from backend.rag.summaries import stored_summary
+from backend.db.database import get_async_db
+from backend.utils.metrics import (
+    span,
+    record_span,
+    TOOL_SECONDS,
+    LLM_FIRST_TOKEN_SECONDS,
+    LLM_COMPLETION_SECONDS,
+    ACTIVE_CHATS,
+    CHAT_REQUESTS,
+)
 
 # Local utilities & RAG pipeline
 from backend.utils.utils import get_current_user
-from backend.rag.pipeline import get_or_create_collection
+# Local LLM (llama3.2:3b via Ollama), created on first use
+from backend.rag.llm import get_llm
 # @tool → tells LLM “this function can be called”
 from langchain_core.tools import tool 
-# ChatOllama → supports tool calling
-from langchain_ollama import ChatOllama
 # HumanMessage → user input
 # ToolMessage → tool result sent back to LLM
 from langchain_core.messages import HumanMessage, ToolMessage
 # partial → pre-fill user_email automatically
 from functools import partial
 
-# Local LLM - THIS IS REQUIRED
-from langchain_ollama import OllamaLLM
+router = APIRouter(prefix="/api", tags=["chat"])
 
-# Initialize the local LLM
-llm = ChatOllama(
-    model="llama3.2:3b",
-    temperature=0.3,
-)
+# Adjacent tokens are merged into one SSE frame until either limit is hit
+STREAM_FLUSH_CHARS = int(os.getenv("STREAM_FLUSH_CHARS", "48"))
+STREAM_FLUSH_INTERVAL = float(os.getenv("STREAM_FLUSH_INTERVAL", "0.05"))
 
-router = APIRouter(prefix="/api", tags=["chat"])
+
+class ChatTelemetry:
+    """Per-response latency numbers, sent to the client as a trailing SSE event."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_token_at = None
+        self.first_answer_token_at = None
+        self.answer_started_at = None
+        self.tokens = 0
+        self.answer_tokens = 0
+
+    def token(self, final_pass: bool = False) -> None:
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self.tokens += 1
+        if final_pass:
+            if self.first_answer_token_at is None:
+                self.first_answer_token_at = now
+            self.answer_tokens += 1
+
+    def summary(self) -> dict:
+        end = time.perf_counter()
+        ms = lambda t: round((t - self.start) * 1000, 1) if t is not None else None
+        # Generation rate of the streamed answer (falls back to the whole response)
+        gen_start = self.first_answer_token_at or self.first_token_at
+        gen_tokens = self.answer_tokens or self.tokens
+        gen_seconds = end - gen_start if gen_start is not None else 0
+        return {
+            "ttft_ms": ms(self.first_token_at),
+            "answer_ttft_ms": ms(self.first_answer_token_at),
+            "tokens": self.tokens,
+            "tokens_per_sec": round(gen_tokens / gen_seconds, 2) if gen_seconds > 0 else None,
+            "total_ms": ms(end),
+        }
+
+
+async def timed_llm_stream(chunks: AsyncIterator, phase: str) -> AsyncIterator:
+    """
+    Pass an LLM stream through, recording time to its first chunk and to
+    its end (`phase`: "tool_select" for the first pass, "answer" after tools).
+    """
+    start = time.perf_counter()
+    first_at = None
+    status = "ok"
+    try:
+        async for chunk in chunks:
+            if first_at is None:
+                first_at = time.perf_counter()
+                LLM_FIRST_TOKEN_SECONDS.labels(phase).observe(first_at - start)
+            yield chunk
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        if status == "ok":
+            LLM_COMPLETION_SECONDS.labels(phase).observe(seconds)
+        first_ms = round((first_at - start) * 1000, 3) if first_at is not None else None
+        record_span(f"llm.{phase}", seconds, status, first_token_ms=first_ms)
+
+
+async def coalesce(tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Merge adjacent tokens into reasonably sized frames. The first token is
+    sent immediately so time-to-first-token isn't delayed.
+    """
+    buffer = []
+    size = 0
+    last_flush = None
+    async for token in tokens:
+        buffer.append(token)
+        size += len(token)
+        now = time.perf_counter()
+        if last_flush is None or size >= STREAM_FLUSH_CHARS or now - last_flush >= STREAM_FLUSH_INTERVAL:
+            yield "".join(buffer)
+            buffer, size, last_flush = [], 0, now
+    if buffer:
+        yield "".join(buffer)
 
 @tool
-def rag_search(query: str, document_id: int | None = None, user_email: str | None = None) -> str:
+def rag_search(query: str, document_id: int | None = None, user_email: str | None = None, user_id: int | None = None) -> str:
     """Search the user's documents for relevant information."""
     if not user_email:
         return "Error: User not authenticated."
-    docs, _ = search(query=query, document_id=document_id, user_email=user_email)
+    if RERANK_ENABLED:
+        # Over-fetch, then keep only the chunks the cross-encoder rates best
+        with span("retrieval", candidates=RERANK_CANDIDATES):
+            docs, metas = search(query=query, document_id=document_id, user_email=user_email, user_id=user_id, n_results=RERANK_CANDIDATES)
+        with span("retrieval.rerank", candidates=len(docs)):
+            docs, _ = reranker.rerank(query, docs, metas, top_k=RERANK_TOP_K)
+    else:
+        with span("retrieval"):
+            docs, _ = search(query=query, document_id=document_id, user_email=user_email, user_id=user_id)
+        docs = docs[:10]
     if not docs:
         return "No relevant information found."
-    return "\n\n".join(docs[:10])
+    return "\n\n".join(docs)
 
 @tool
-def rag_summarize(document_id: int | None = None, user_email: str | None = None) -> str:
-    """Generate a concise summary of the user's documents."""
+def rag_summarize(document_id: int | None = None, user_email: str | None = None, user_id: int | None = None) -> str:
+    """Summarize one of the user's documents (by document_id), or all of them."""
     if not user_email:
         return "Error: User not authenticated."
-    docs, _ = search(query="", document_id=document_id, user_email=user_email)
-    return summarize(docs)
+    # Precomputed at ingest (see rag.summaries): a lookup, no retrieval
+    return stored_summary(user_id, user_email=user_email, document_id=document_id)
 
 @tool
-def rag_extract(field: str, document_id: int | None = None, user_email: str | None = None) -> str:
+def rag_extract(field: str, document_id: int | None = None, user_email: str | None = None, user_id: int | None = None) -> str:
     """Extract specific information like names, emails, dates from documents."""
     if not user_email:
         return "Error: User not authenticated."
-    docs, _ = search(query=field, document_id=document_id, user_email=user_email)
+    docs, _ = search(query=field, document_id=document_id, user_email=user_email, user_id=user_id)
     results = extract(docs, field)
     if not results:
         return f"No '{field}' found in documents."
     return "\n".join(results[:20])
 
+# Tools the model may call, by name
+TOOLS = {
+    "rag_search": rag_search,
+    "rag_summarize": rag_summarize,
+    "rag_extract": rag_extract,
+}
+
+
+async def run_tool(tool_call: dict, user_email: str, user_id: int | None = None) -> tuple[str, bool]:
+    """
+    Execute one tool call. Sync tools run in a worker thread via `ainvoke`,
+    so several calls from the same model turn can overlap.
+
+    Returns:
+        (tool output for the model, whether the call succeeded)
+    """
+    tool_fn = TOOLS.get(tool_call["name"])
+    if tool_fn is None:
+        return "Unknown tool.", False
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        # Parse LLM intent; the user is always taken from the session
+        return await tool_fn.ainvoke({**tool_call["args"], "user_email": user_email, "user_id": user_id}), True
+    except Exception as e:
+        status = "error"
+        return f"Tool error: {e}", False
+    finally:
+        seconds = time.perf_counter() - start
+        TOOL_SECONDS.labels(tool_call["name"]).observe(seconds)
+        record_span(f"chat.tool.{tool_call['name']}", seconds, status)
+
 # ----------------------
 # Request schema
 # ----------------------
@@ -67,16 +204,46 @@ class ChatRequest(BaseModel):
 # ----------------------
 # Chat endpoint
 # ----------------------
+def replay_cached_answer(cached):
+    """Replay a cached answer over the same SSE format as a live one."""
+    telemetry = ChatTelemetry()
+    telemetry.token()
+    yield f"data: {json.dumps({'content': cached.answer})}\n\n"
+    yield f"data: {json.dumps({'citations': cached.citations, 'cached': True})}\n\n"
+    yield f"data: {json.dumps({'metrics': {**telemetry.summary(), 'cached': True}})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
 @router.post("/chat")
-async def chat(request: ChatRequest, current_user: dict = Depends(get_current_user)):
+async def chat(
+    request: ChatRequest,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
     
     user_email = current_user["email"]
     
     if not request.message or not request.message.strip():
+        CHAT_REQUESTS.labels("empty").inc()
         return StreamingResponse(
             iter(["data: [DONE]\n\n"]),
             media_type="text/event-stream"
         )
+
+    # Semantic answer cache: near-identical question, same corpus version
+    if ANSWER_CACHE_ENABLED:
+        with span("chat.answer_cache"):
+            # The model call is blocking — keep it off the event loop
+            query_vector = await run_in_threadpool(embed_query, request.message)
+            corpus_version = await get_corpus_version(db, user_email)
+            cached = answer_cache.lookup(user_email, request.document_id, query_vector, corpus_version)
+        if cached:
+            CHAT_REQUESTS.labels("cached").inc()
+            return StreamingResponse(replay_cached_answer(cached), media_type="text/event-stream")
+
+    # Nothing below needs the request session: hand its connection back to
+    # the pool now instead of holding it for the whole stream
+    await db.close()
     
     # Bind tools with user_email pre-filled    
     # tools = [
@@ -86,7 +253,7 @@ async def chat(request: ChatRequest, current_user: dict = Depends(get_current_us
     # ]    
     
     # LLM decides when to call tools
-    model_with_tools = llm.bind_tools([
+    model_with_tools = get_llm().bind_tools([
     rag_search,
     rag_summarize,
     rag_extract,
@@ -138,62 +305,94 @@ async def chat(request: ChatRequest, current_user: dict = Depends(get_current_us
 # """
 
     # Streaming generator for LLM output to frontend
-    def stream_response():
+    async def stream_response():
+        answer_parts = []
+        citations = []
+        status = "ok"
+        telemetry = ChatTelemetry()
+        # Shared between the first pass and its content stream
+        first_pass = {"gathered": None}
+
+        async def first_pass_tokens():
+            async for chunk in timed_llm_stream(model_with_tools.astream(messages), "tool_select"):
+                # Merge chunks so tool calls split across chunks are complete
+                gathered = first_pass["gathered"]
+                first_pass["gathered"] = chunk if gathered is None else gathered + chunk
+                if chunk.content:
+                    telemetry.token()
+                    yield chunk.content
+
+        async def final_answer_tokens():
+            async for chunk in timed_llm_stream(get_llm().astream(messages), "answer"):
+                if isinstance(chunk.content, str) and chunk.content:
+                    telemetry.token(final_pass=True)
+                    yield chunk.content
+
+        ACTIVE_CHATS.inc()
+        tool_count = 0
+        tools_ok = True
         try:
             # First pass: stream initial response + detect tool calls
-            tool_call_results = {}
+            async for text in coalesce(first_pass_tokens()):
+                answer_parts.append(text)
+                yield f"data: {json.dumps({'content': text})}\n\n"
 
-            for chunk in model_with_tools.stream(messages):
-                if chunk.content:
-                    yield f"data: {json.dumps({'content': chunk.content})}\n\n"
-
-                # Collect tool calls
-                if chunk.tool_calls:   # Detect tool calls
-                    for tool_call in chunk.tool_calls:
-                        tool_name = tool_call["name"]
-                        args = tool_call["args"]
-                        tool_id = tool_call["id"]
-
-                        # Execute tool
-                        # Parse LLM intent
-                        if tool_name == "rag_search":
-                            result = rag_search.invoke({**args, "user_email": user_email})
-                        elif tool_name == "rag_summarize":
-                            result = rag_summarize.invoke({**args, "user_email": user_email})
-                            
-                        elif tool_name == "rag_extract":
-                            result = rag_extract.invoke({**args, "user_email": user_email})
-                            # ->calls search(...)
-                        # → retrieves chunks from Chroma
-                        # → runs extract(...)
-                        # → returns matching text
-                        else:
-                            result = "Unknown tool."
-
-                        tool_call_results[tool_id] = result
-
-                        # Add to messages for final answer
-                        messages.append(chunk)
-                        # Send result back to LLM, Read tool output
-                        messages.append(ToolMessage(content=result, tool_call_id=tool_id))
-                        # now llm has user question, retrieved knowledge and tool results
+            gathered = first_pass["gathered"]
+            tool_calls = gathered.tool_calls if gathered is not None else []
 
             # After tool calls, get final answer
-            if tool_call_results:
-                # LLM formats, explains, and reasons over tool output
-                final_response = llm.invoke(messages)
-                for token in final_response.content:
-                    if isinstance(token, str):
-                        yield f"data: {json.dumps({'content': token})}\n\n"
-                    elif hasattr(token, 'content'):
-                        yield f"data: {json.dumps({'content': token.content})}\n\n"
+            if tool_calls:
+                tool_count = len(tool_calls)
+                # Add the model's tool-call turn once, then every result
+                messages.append(gathered)
+                # Independent tool calls from one turn run concurrently
+                results = await asyncio.gather(
+                    *(run_tool(tool_call, user_email, current_user["id"]) for tool_call in tool_calls)
+                )
+                for tool_call, (result, ok) in zip(tool_calls, results):
+                    # Send result back to LLM, Read tool output
+                    messages.append(ToolMessage(content=result, tool_call_id=tool_call["id"]))
+                    tools_ok = tools_ok and ok
+                # now llm has user question, retrieved knowledge and tool results
+
+                # LLM formats, explains, and reasons over tool output — streamed token by token
+                async for text in coalesce(final_answer_tokens()):
+                    answer_parts.append(text)
+                    yield f"data: {json.dumps({'content': text})}\n\n"
 
             # Always send citations (you can enhance this later)
-            yield f"data: {json.dumps({'citations': []})}\n\n"
+            yield f"data: {json.dumps({'citations': citations})}\n\n"
+
+            # Only an answer that streamed to the end is cached, and never
+            # one written around a failed tool (it would outlive the failure)
+            answer = "".join(answer_parts)
+            if ANSWER_CACHE_ENABLED and tools_ok and answer.strip():
+                answer_cache.store(
+                    user_email, request.document_id, request.message,
+                    query_vector, corpus_version, answer, citations,
+                )
 
         except Exception as e:
+            status = "error"
             yield f"data: {json.dumps({'error': str(e)})}\n\n"
+        except BaseException:
+            # Client went away (GeneratorExit / CancelledError): nothing
+            # more may be yielded, and the partial answer is not cached
+            status = "cancelled"
+            raise
         finally:
-            yield "data: [DONE]\n\n"
+            ACTIVE_CHATS.dec()
+            CHAT_REQUESTS.labels(status).inc()
+            record_span("chat.total", time.perf_counter() - telemetry.start, status, tools=tool_count)
+
+        # Trailing telemetry event: TTFT, tokens/sec, total latency
+        yield f"data: {json.dumps({'metrics': telemetry.summary()})}\n\n"
+        yield "data: [DONE]\n\n"
 
     return StreamingResponse(stream_response(), media_type="text/event-stream")
+
+
+@router.get("/chat/cache")
+def chat_cache_stats(current_user: dict = Depends(get_current_user)):
+    """Hit-rate metrics for the semantic answer cache."""
+    return answer_cache.stats()
@@ -1,55 +1,146 @@
 # backend/api/documents.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import base64
+import hashlib
+import mimetypes
+import os
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pathlib import Path
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 
-from backend.db.database import get_db
+from backend.db.database import get_async_db
 from backend.models.document import Document
-from backend.models.models import User
+from backend.models.chunk import DocumentChunk
 from backend.utils.utils import get_current_user
-from backend.rag.pipeline import get_or_create_collection
+from backend.rag.vector_store import get_or_create_collection
+from backend.rag.bm25 import get_bm25_index
+from backend.rag.corpus import corpus_version_bump, get_corpus_version
+from backend.rag.chunk_store import get_chunk_ids, delete_vectors, legacy_chunk_ids, add_tombstones
+from backend.rag.page_store import read_page, delete_pages
+from backend.jobs.queue import enqueue_ingest_job
+from backend.models.job import IngestJob
 
 router = APIRouter(prefix="/api", tags=["documents"])
 
 UPLOAD_DIR = Path("uploaded_files")
 
+# Documents per page when the client doesn't ask for a limit
+DOCUMENTS_PAGE_SIZE = int(os.getenv("DOCUMENTS_PAGE_SIZE", "100"))
+DOCUMENTS_MAX_PAGE_SIZE = int(os.getenv("DOCUMENTS_MAX_PAGE_SIZE", "1000"))
+
+
+def encode_cursor(upload_date: datetime, doc_id: int) -> str:
+    """Opaque keyset cursor: the (upload_date, id) of the last row returned."""
+    raw = f"{upload_date.isoformat()}|{doc_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        date, doc_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(date), int(doc_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def listing_etag(user_id: int, corpus_version: int, *params) -> str:
+    """
+    Weak ETag for a listing page: any ingest, update or delete bumps the
+    corpus version, and each page / filter gets its own tag.
+    """
+    key = hashlib.sha256(repr(params).encode()).hexdigest()[:16]
+    return f'W/"docs-{user_id}-{corpus_version}-{key}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored."""
+    strip = lambda tag: tag.strip().removeprefix("W/")
+    return any(tag.strip() == "*" or strip(tag) == strip(etag) for tag in if_none_match.split(","))
+
+
 # ============================
 # LIST USER DOCUMENTS
 # ============================
 @router.get("/documents")
-def list_documents(
+async def list_documents(
+    request: Request,
+    limit: int = DOCUMENTS_PAGE_SIZE,
+    cursor: str | None = None,
+    prefix: str | None = None,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    docs = (
-        db.query(Document)
-        .join(User)
-        .filter(User.email == current_user["email"])
-        .order_by(Document.upload_date.desc())
-        .all()
+    """
+    The user's documents, newest first, one page at a time.
+
+    Keyset pagination on (upload_date, id): pass the `X-Next-Cursor`
+    response header back as `cursor` for the next page (absent on the last
+    page). `prefix` filters by filename prefix. Responses carry an ETag
+    tied to the corpus version; a matching `If-None-Match` gets a 304.
+    """
+    limit = min(max(limit, 1), DOCUMENTS_MAX_PAGE_SIZE)
+    corpus_version = await get_corpus_version(db, current_user["email"])
+    etag = listing_etag(current_user["id"], corpus_version, limit, cursor, prefix)
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    query = (
+        # Only the columns the listing shows, as plain rows
+        select(Document.id, Document.filename, Document.upload_date, Document.page_count, Document.chunk_count)
+        .where(Document.user_id == current_user["id"])
+        .order_by(Document.upload_date.desc(), Document.id.desc())
+        .limit(limit + 1)
     )
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        query = query.where(or_(
+            Document.upload_date < after_date,
+            and_(Document.upload_date == after_date, Document.id < after_id),
+        ))
+    if prefix:
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.where(Document.filename.like(f"{escaped}%", escape="\\"))
 
-    return [doc.to_dict() for doc in docs]
+    rows = (await db.execute(query)).all()
+    headers = {"ETag": etag}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1].upload_date, rows[-1].id)
+
+    return JSONResponse(
+        [
+            {
+                "id": row.id,
+                "filename": row.filename,
+                "upload_date": row.upload_date.isoformat(),
+                "page_count": row.page_count,
+                "chunk_count": row.chunk_count,
+            }
+            for row in rows
+        ],
+        headers=headers,
+    )
 
 
 # ============================
 # GET DOCUMENT BY ID
 # ============================
 @router.get("/documents/{doc_id}")
-def get_document(
+async def get_document(
     doc_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    doc = (
-        db.query(Document)
-        .join(User)
-        .filter(
+    doc = await db.scalar(
+        select(Document)
+        .where(
             Document.id == doc_id,
-            User.email == current_user["email"]
+            Document.user_id == current_user["id"]
         )
-        .first()
     )
 
     if not doc:
@@ -57,67 +148,253 @@ def get_document(
 
     return doc.to_dict()
 
-@router.get("/documents/{doc_id}/view")
-def view_document(
+# Types the stdlib table may not know (it depends on the host's mime.types)
+MEDIA_TYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".doc": "application/msword",
+    ".md": "text/markdown; charset=utf-8",
+    ".txt": "text/plain; charset=utf-8",
+    ".csv": "text/csv; charset=utf-8",
+}
+
+
+def media_type_for(filename: str) -> str:
+    """MIME type from the document's extension, falling back to octet-stream."""
+    ext = Path(filename).suffix.lower()
+    if ext in MEDIA_TYPES:
+        return MEDIA_TYPES[ext]
+    guessed, _ = mimetypes.guess_type(filename)
+    return guessed or "application/octet-stream"
+
+
+@router.api_route("/documents/{doc_id}/view", methods=["GET", "HEAD"])
+async def view_document(
     doc_id: int,
+    request: Request,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    doc = db.query(Document).filter(
-        Document.id == doc_id,
-        Document.user_email == current_user["email"]
-    ).first()
+    """
+    Serve the original file inline with its real content type.
+
+    - Strong ETag from the file's SHA-256; a matching If-None-Match gets 304.
+    - `Range: bytes=...` gets 206 partial content (If-Range is honoured),
+      so PDF.js-style viewers fetch only the bytes page 1 needs instead of
+      the whole file.
+    """
+    row = (await db.execute(
+        select(Document.file_path, Document.filename, Document.file_hash)
+        .where(
+            Document.id == doc_id,
+            Document.user_id == current_user["id"]
+        )
+    )).first()
     
-    if not doc:
+    if not row:
         raise HTTPException(status_code=404, detail="File not found on server")
+
+    # Content-addressed: a new version of the document has a new hash
+    etag = f'"{row.file_hash}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
     
-    file_path = Path(doc.file_path) 
+    file_path = Path(row.file_path) 
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="File not found on server")
     
+    # FileResponse answers Range / If-Range itself (206, 416, Accept-Ranges)
     return FileResponse(
         path=str(file_path),
-        media_type="application/pdf",
-        filename=doc.filename
+        media_type=media_type_for(row.filename),
+        filename=row.filename,
+        content_disposition_type="inline",
+        headers=headers,
+    )
+
+
+# ============================
+# PAGE TEXT (from the page store)
+# ============================
+@router.get("/documents/{doc_id}/pages/{page_number}")
+async def get_document_page(
+    doc_id: int,
+    page_number: int,
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Extracted text of one page (1-based), read from the page store with
+    a single random access — the original file is never parsed again.
+    """
+    file_hash = await db.scalar(
+        select(Document.file_hash).where(
+            Document.id == doc_id,
+            Document.user_id == current_user["id"]
+        )
+    )
+    if file_hash is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    # Page text only changes with a new version of the file
+    etag = f'W/"{file_hash}-p{page_number}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        page = await run_in_threadpool(read_page, doc_id, page_number - 1)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Page text not stored for this document")
+    except IndexError:
+        raise HTTPException(status_code=404, detail="Page not found")
+
+    return JSONResponse({
+        "document_id": doc_id,
+        "page": page_number,
+        "page_label": page["metadata"].get("page_label", str(page_number)),
+        "total_pages": page["total_pages"],
+        "extract_timeout": page["metadata"].get("extract_timeout", False),
+        "text": page["text"],
+    }, headers=headers)
+
+
+# ============================
+# PRECOMPUTED SUMMARIES
+# ============================
+@router.get("/documents/{doc_id}/summary")
+async def get_document_summary(
+    doc_id: int,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Document summary plus per-section summaries, built after ingest."""
+    row = (await db.execute(
+        select(Document.summary, Document.section_summaries).where(
+            Document.id == doc_id,
+            Document.user_id == current_user["id"]
+        )
+    )).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    return {
+        "document_id": doc_id,
+        "status": "ready" if row.summary else "pending",
+        "summary": row.summary,
+        "sections": row.section_summaries or [],
+    }
+
+
+# ============================
+# RE-CHUNK FROM STORED PAGES
+# ============================
+@router.post("/documents/{doc_id}/rechunk")
+async def rechunk_document(
+    doc_id: int,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Queue a re-split of the current version with today's chunk settings.
+    The worker reads the stored page text; only chunks whose text changed
+    are re-embedded.
+    """
+    doc = (await db.execute(
+        select(Document.file_path, Document.filename, Document.file_hash).where(
+            Document.id == doc_id,
+            Document.user_id == current_user["id"]
+        )
+    )).first()
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    # Updates of one document must not run concurrently
+    active = await db.scalar(
+        select(IngestJob.id).where(
+            IngestJob.document_id == doc_id,
+            IngestJob.kind.in_(("update", "rechunk")),
+            IngestJob.status.in_(("queued", "running")),
+        )
+    )
+    if active:
+        raise HTTPException(status_code=409, detail=f"Document is already being re-indexed (job {active})")
+
+    job = await enqueue_ingest_job(
+        db,
+        user_id=current_user["id"],
+        file_path=doc.file_path,
+        filename=doc.filename,
+        file_hash=doc.file_hash,
+        kind="rechunk",
+        document_id=doc_id,
     )
+    return {"message": "Re-chunking queued", "document_id": doc_id, "job_id": job.id, "status": job.status}
 
 
 # ============================
 # DELETE DOCUMENT + EMBEDDINGS
 # ============================
+def _delete_embeddings(user_email: str, doc: Document, chunk_ids: list[str]) -> tuple[str, int]:
+    """
+    Bulk-delete a document's vectors and keyword postings by chunk id.
+    Chroma + BM25 are blocking — called through the threadpool.
+
+    Returns:
+        (collection name, vectors deleted)
+    """
+    collection = get_or_create_collection(user_email, user_id=doc.user_id)
+    if not chunk_ids:
+        # Ingested before chunk ids were recorded
+        chunk_ids = legacy_chunk_ids(collection, doc.id, doc.filename, user_email)
+    deleted = delete_vectors(collection, chunk_ids)
+    keyword_index = get_bm25_index(user_email)
+    # By id too: legacy postings were indexed without a document_id
+    keyword_index.delete_ids(chunk_ids)
+    keyword_index.delete_document(doc.id)
+    return collection.name, deleted
+
+
 @router.delete("/documents/{doc_id}")
-def delete_document(
+async def delete_document(
     doc_id: int,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    doc = (
-        db.query(Document)
-        .join(User)
-        .filter(
+    doc = await db.scalar(
+        select(Document)
+        .where(
             Document.id == doc_id,
-            User.email == current_user["email"]
+            Document.user_id == current_user["id"]
         )
-        .first()
     )
 
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    # 1 Delete embeddings from Chroma
-    collection = get_or_create_collection(current_user["email"])
-    collection.delete(where={"source": doc.filename})
+    # 1 Delete embeddings from Chroma (by recorded chunk id)
+    chunk_ids = await get_chunk_ids(db, doc.id)
+    collection_name, deleted = await run_in_threadpool(
+        _delete_embeddings, current_user["email"], doc, chunk_ids
+    )
 
     # 2️ Delete file from disk
     file_path = Path(doc.file_path)
     if file_path.exists():
         file_path.unlink()
+    delete_pages(doc.id)
 
-    # 3️ Delete DB record
-    db.delete(doc)
-    db.commit()
+    # 3️ Delete DB records
+    await db.execute(delete(DocumentChunk).where(DocumentChunk.document_id == doc.id))
+    await db.delete(doc)
+    await add_tombstones(db, collection_name, deleted)
+    await db.execute(corpus_version_bump(doc.user_id))
+    await db.commit()
 
     return {
         "message": "Document deleted successfully",
-        "document_id": doc_id
+        "document_id": doc_id,
+        "chunks_deleted": deleted
     }
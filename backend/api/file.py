@@ -1,14 +1,23 @@
+import lzma
 import os
-import shutil
-from fastapi import APIRouter, File, UploadFile, BackgroundTasks, Depends, HTTPException
+import re
+import tarfile
+import tempfile
+import zipfile
+import zlib
+from typing import BinaryIO, Iterator, List
+from fastapi import APIRouter, File, UploadFile, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from backend.utils.utils import get_current_user
-from backend.rag.pipeline import process_uploaded_file
-from backend.utils.file_hash import compute_file_hash
-from sqlalchemy.orm import Session
-from backend.db.database import get_db  
+from backend.jobs.queue import enqueue_ingest_job, enqueue_batch_job
+from backend.utils.file_hash import stream_to_file, FileTooLargeError
+from backend.utils.upload_stream import stream_upload, MalformedUpload
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.db.database import get_async_db
 from backend.models.document import Document
-from backend.models.models import User
+from backend.utils.metrics import span, UPLOADS
 
 
 router = APIRouter(prefix="/api", tags=["files"])
@@ -19,49 +28,104 @@ os.makedirs(Upload_DIR, exist_ok=True)
 ALLOWED_EXTENSIONS = {".txt", ".pdf", ".docx", ".md", ".csv"}
 MAX_FILE_SIZE = 50 * 1024 * 1024
 
+# Batch uploads: archives are unpacked member by member, never in memory
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "5000"))
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_BYTES", str(2 * 1024 * 1024 * 1024)))
+# What a corrupt, truncated or encrypted archive member raises while it is read
+MEMBER_READ_ERRORS = (
+    zipfile.BadZipFile, tarfile.TarError, zlib.error, lzma.LZMAError, EOFError, RuntimeError, NotImplementedError,
+)
+
+# Published uploads get normal file permissions (mkstemp creates them 0600)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+UPLOAD_FILE_MODE = 0o666 & ~_UMASK
+
+_DOCUMENT_PATH = re.compile(r"^/api/documents/\d+$")
+
+
+def upload_body_limit(method: str, path: str) -> int | None:
+    """
+    Max request body per upload route (file limit plus multipart overhead),
+    enforced by BodyLimitMiddleware before FastAPI reads the body.
+    """
+    if method == "POST" and path == "/api/upload":
+        return MAX_FILE_SIZE + 64 * 1024
+    if method == "PUT" and _DOCUMENT_PATH.match(path):
+        return MAX_FILE_SIZE + 64 * 1024
+    if method == "POST" and path == "/api/upload/batch":
+        return MAX_BATCH_BYTES + 1024 * 1024
+    return None
+
+
+def publish_upload(tmp_path: str, file_path: str) -> None:
+    """Atomically move a finished temp file into place with normal permissions."""
+    os.chmod(tmp_path, UPLOAD_FILE_MODE)
+    os.replace(tmp_path, file_path)
+
+
 def validate_file(file: UploadFile):
-    ext = os.path.splitext(file.filename)[1].lower() 
+    validate_filename(file.filename)
+
+
+def validate_filename(filename: str):
+    ext = os.path.splitext(filename)[1].lower()
     if ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=400, 
             detail=f"Invalid file type: {ext}. Allowed: PDF, TXT, DOCX, MD, CSV"
         )
 
-    file.file.seek(0, 2)
-    size = file.file.tell()
-    file.file.seek(0)
 
-    if size > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="File too large. Max 50MB")
+# The body is parsed by stream_upload, not FastAPI; describe it for /docs
+_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"],
+        }}},
+    }
+}
+
 
-@router.post("/upload")
+@router.post("/upload", openapi_extra=_UPLOAD_BODY)
 async def upload_file(
-    file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = BackgroundTasks(),
+    request: Request,
     current_user: dict = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
+    tmp_path = None
     try:
-        # Step 1: Validate file
-        validate_file(file)
-        
-        # Step 2: Read file bytes ONCE
-        file_bytes = await file.read()
+        # Steps 1-2: Stream the file part of the body straight to a temp
+        # file, hashing as it goes (memory stays constant whatever the file
+        # size, and the body is written to disk once). The type is checked
+        # from the part headers, before any of the file is written.
+        fd, tmp_path = tempfile.mkstemp(dir=Upload_DIR, prefix=".upload-", suffix=".part")
+        os.close(fd)
+        try:
+            with span("upload.stream") as info:
+                filename, file_hash, file_size = await stream_upload(
+                    request, tmp_path, MAX_FILE_SIZE, on_filename=validate_filename
+                )
+                info["bytes"] = file_size
+        except FileTooLargeError:
+            raise HTTPException(status_code=400, detail="File too large. Max 50MB")
+        except MalformedUpload as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Step 3: Compute hash and check for duplicates 
+        # Step 3: Check for duplicates before the file is published
         try:
-            file_hash = compute_file_hash(file_bytes)
-            
-            # Get user from DB
-            user = db.query(User).filter(User.email == current_user["email"]).first()
-            if not user:
-                raise HTTPException(status_code=404, detail="User not found")
-            
             # Check for duplicate using filter (not filter_by)
-            existing = db.query(Document).filter(
-                Document.file_hash == file_hash,
-                Document.user_id == user.id
-            ).first()
+            with span("upload.dedupe"):
+                existing = await db.scalar(
+                    select(Document.id).where(
+                        Document.file_hash == file_hash,
+                        Document.user_id == current_user["id"]
+                    )
+                )
             
             if existing:
                 raise HTTPException(status_code=400, detail="File already uploaded")
@@ -70,36 +134,341 @@ async def upload_file(
             print("⚠️ Skipping duplicate check - file_hash column not in Document model")
         
         # Step 4: Create safe filename
-        safe_filename = f"{current_user['email'].split('@')[0]}_{file.filename}"
+        safe_filename = f"{current_user['email'].split('@')[0]}_{filename}"
         file_path = os.path.join(Upload_DIR, safe_filename)
         
-        # Step 5: Save file to disk using the bytes we already read
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_bytes)  # ✅ Write the bytes directly
+        # Step 5: Atomically move the finished temp file into place
+        publish_upload(tmp_path, file_path)
+        tmp_path = None
             
-        print(f"✅ File saved to: {file_path} ({len(file_bytes)} bytes)")
+        print(f"✅ File saved to: {file_path} ({file_size} bytes)")
             
-        # Step 6: Start background processing
-        background_tasks.add_task(
-            process_uploaded_file,
-            file_path,
-            file.filename,
-            current_user["email"],
-            file_hash
-        )    
+        # Step 6: Queue ingestion for the worker pool (runs out of process)
+        with span("upload.enqueue"):
+            job = await enqueue_ingest_job(
+                db,
+                user_id=current_user["id"],
+                file_path=file_path,
+                filename=filename,
+                file_hash=file_hash,
+            )
+        UPLOADS.labels("queued").inc()
         
         # Step 7: Return success
         return JSONResponse({
-            "message": "File uploaded & processing started",
+            "message": "File uploaded & processing queued",
             "filename": safe_filename,
-            "size_kb": len(file_bytes) // 1024,
-            "status": "processing"
+            "size_kb": file_size // 1024,
+            "job_id": job.id,
+            "status": job.status
         })
         
     except HTTPException as e:
+        UPLOADS.labels("rejected").inc()
         raise e
     except Exception as e:
+        UPLOADS.labels("error").inc()
         print(f"❌ Upload error: {e}")
         import traceback
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Remove partial / rejected uploads
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+@router.put("/documents/{doc_id}")
+async def update_document_file(
+    doc_id: int,
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Upload a new version of an existing document. Only chunks whose text
+    changed are re-embedded (see pipeline.update_document).
+    """
+    tmp_path = None
+    try:
+        validate_file(file)
+
+        doc = await db.scalar(
+            select(Document).where(
+                Document.id == doc_id,
+                Document.user_id == current_user["id"]
+            )
+        )
+        if not doc:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        fd, tmp_path = tempfile.mkstemp(dir=Upload_DIR, prefix=".upload-", suffix=".part")
+        os.close(fd)
+        try:
+            file_hash, file_size = await run_in_threadpool(
+                stream_to_file, file.file, tmp_path, MAX_FILE_SIZE
+            )
+        except FileTooLargeError:
+            raise HTTPException(status_code=400, detail="File too large. Max 50MB")
+
+        if file_hash == doc.file_hash:
+            return JSONResponse({"message": "Document unchanged", "document_id": doc_id})
+
+        existing = await db.scalar(
+            select(Document.id).where(
+                Document.file_hash == file_hash,
+                Document.user_id == current_user["id"]
+            )
+        )
+        if existing:
+            raise HTTPException(status_code=400, detail=f"File already uploaded as document {existing}")
+
+        # Versioned name: the current file stays in place until the update lands
+        safe_filename = f"{current_user['email'].split('@')[0]}_{file_hash[:12]}_{file.filename}"
+        file_path = os.path.join(Upload_DIR, safe_filename)
+        publish_upload(tmp_path, file_path)
+        tmp_path = None
+
+        job = await enqueue_ingest_job(
+            db,
+            user_id=current_user["id"],
+            file_path=file_path,
+            filename=file.filename,
+            file_hash=file_hash,
+            kind="update",
+            document_id=doc_id,
+        )
+
+        return JSONResponse({
+            "message": "New version uploaded & re-indexing queued",
+            "document_id": doc_id,
+            "size_kb": file_size // 1024,
+            "job_id": job.id,
+            "status": job.status
+        })
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        print(f"❌ Update error: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# ============================
+# BATCH / ARCHIVE UPLOAD
+# ============================
+class BatchTooLargeError(ValueError):
+    """Raised when a batch exceeds MAX_BATCH_FILES or MAX_BATCH_BYTES."""
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+class UnreadableMember:
+    """Stands in for an archive member that could not be opened; reading it raises why."""
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+    def read(self, size: int = -1) -> bytes:
+        raise self.error
+
+
+def iter_archive_members(upload: UploadFile) -> Iterator[tuple[str, BinaryIO]]:
+    """
+    Yield (member path, readable stream) for each regular file in a zip or
+    tar upload. Tar archives are read in streaming mode; zip members are
+    decompressed on the fly from the spooled upload. A corrupt member
+    raises one of MEMBER_READ_ERRORS when its stream is read.
+    """
+    if upload.filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(upload.file) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                try:
+                    member = archive.open(info)
+                except MEMBER_READ_ERRORS as e:
+                    # Encrypted, unsupported compression or a bad local header
+                    yield info.filename, UnreadableMember(e)
+                    continue
+                with member:
+                    yield info.filename, member
+    else:
+        with tarfile.open(fileobj=upload.file, mode="r|*") as archive:
+            for member in archive:
+                # Regular files only: no links, devices or directories
+                if member.isfile():
+                    yield member.name, archive.extractfile(member)
+
+
+def spool_batch(uploads: List[UploadFile]) -> tuple[list, list]:
+    """
+    Stream every uploaded file, and every member of uploaded archives, to
+    its own temp file in fixed-size blocks, hashing as it goes.
+
+    Returns:
+        (spooled, rejected): spooled entries carry `name`, `filename`,
+        `tmp_path`, `file_hash` and `size`; rejected ones `name` and `reason`.
+
+    Raises:
+        BatchTooLargeError: Past MAX_BATCH_FILES files or MAX_BATCH_BYTES
+            bytes. Already spooled temp files are removed.
+    """
+    spooled, rejected = [], []
+    total_bytes = 0
+
+    def sources():
+        for upload in uploads:
+            if is_archive(upload.filename):
+                try:
+                    for member_path, stream in iter_archive_members(upload):
+                        yield f"{upload.filename}/{member_path}", member_path, stream, True
+                except MEMBER_READ_ERRORS as e:
+                    # The rest of the archive can't be read (members before it were kept)
+                    rejected.append({"name": upload.filename, "reason": f"Unreadable archive: {str(e) or type(e).__name__}"})
+            else:
+                yield upload.filename, upload.filename, upload.file, False
+
+    try:
+        for name, path, stream, in_archive in sources():
+            # Strip archive directories (and any "../") from the stored name
+            filename = os.path.basename(path.replace("\\", "/"))
+            if not filename or filename.startswith(".") or "__MACOSX/" in path:
+                continue
+            ext = os.path.splitext(filename)[1].lower()
+            if ext not in ALLOWED_EXTENSIONS:
+                rejected.append({"name": name, "reason": f"Invalid file type: {ext}"})
+                continue
+            if len(spooled) >= MAX_BATCH_FILES:
+                raise BatchTooLargeError(f"Too many files. Max {MAX_BATCH_FILES} per batch")
+
+            fd, tmp_path = tempfile.mkstemp(dir=Upload_DIR, prefix=".upload-", suffix=".part")
+            os.close(fd)
+            try:
+                file_hash, size = stream_to_file(stream, tmp_path, MAX_FILE_SIZE)
+            except FileTooLargeError:
+                os.remove(tmp_path)
+                rejected.append({"name": name, "reason": "File too large. Max 50MB"})
+                continue
+            except MEMBER_READ_ERRORS as e:
+                os.remove(tmp_path)
+                if not in_archive:
+                    raise
+                rejected.append({"name": name, "reason": f"Unreadable archive member: {str(e) or type(e).__name__}"})
+                continue
+            except Exception:
+                os.remove(tmp_path)
+                raise
+            total_bytes += size
+            spooled.append({"name": name, "filename": filename, "tmp_path": tmp_path, "file_hash": file_hash, "size": size})
+            if total_bytes > MAX_BATCH_BYTES:
+                raise BatchTooLargeError(f"Batch too large. Max {MAX_BATCH_BYTES // (1024 * 1024)}MB")
+    except BaseException:
+        for item in spooled:
+            if os.path.exists(item["tmp_path"]):
+                os.remove(item["tmp_path"])
+        raise
+    return spooled, rejected
+
+
+@router.post("/upload/batch")
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Upload many files, or zip/tar archives of them, as one batch job.
+
+    Every file is hashed while it is streamed to disk; duplicates (within
+    the batch or of the user's existing documents, found in one indexed
+    query) are skipped. The rest are ingested by a single worker job whose
+    chunks share embedding batches across files.
+
+    Returns:
+        The batch job id and a per-file status: queued (with its job id),
+        duplicate (with the existing document id) or rejected (with a reason).
+    """
+    spooled = []
+    try:
+        with span("upload.stream", batch=True) as info:
+            try:
+                spooled, rejected = await run_in_threadpool(spool_batch, files)
+            except BatchTooLargeError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            info["files"] = len(spooled)
+
+        statuses = [{"filename": r["name"], "status": "rejected", "reason": r["reason"]} for r in rejected]
+
+        # Dedupe within the batch, then against the user's documents in one query
+        unique = {}
+        for item in spooled:
+            if item["file_hash"] in unique:
+                statuses.append({"filename": item["name"], "status": "duplicate", "duplicate_of": unique[item["file_hash"]]["name"]})
+            else:
+                unique[item["file_hash"]] = item
+        existing = {}
+        if unique:
+            with span("upload.dedupe", batch=True):
+                existing = dict((await db.execute(
+                    select(Document.file_hash, Document.id).where(
+                        Document.user_id == current_user["id"],
+                        Document.file_hash.in_(list(unique)),
+                    )
+                )).all())
+        for file_hash, document_id in existing.items():
+            statuses.append({"filename": unique.pop(file_hash)["name"], "status": "duplicate", "document_id": document_id})
+
+        if not unique:
+            UPLOADS.labels("rejected").inc()
+            return JSONResponse({"message": "Nothing new to ingest", "job_id": None, "files": statuses})
+
+        # Hash in the name: archives often hold several files with the same name
+        prefix = current_user["email"].split("@")[0]
+        accepted = []
+        for file_hash, item in unique.items():
+            file_path = os.path.join(Upload_DIR, f"{prefix}_{file_hash[:12]}_{item['filename']}")
+            publish_upload(item["tmp_path"], file_path)
+            accepted.append({**item, "file_path": file_path})
+
+        name = files[0].filename if len(files) == 1 else f"{len(accepted)} files"
+        with span("upload.enqueue", batch=True, files=len(accepted)):
+            batch, children = await enqueue_batch_job(db, current_user["id"], name, accepted)
+        UPLOADS.labels("queued").inc()
+
+        statuses = [
+            {"filename": item["name"], "status": "queued", "job_id": child.id}
+            for item, child in zip(accepted, children)
+        ] + statuses
+        print(f"✅ Batch {batch.id}: {len(accepted)} file(s) queued, {len(statuses) - len(accepted)} skipped")
+
+        return JSONResponse({
+            "message": "Batch uploaded & processing queued",
+            "job_id": batch.id,
+            "status": batch.status,
+            "queued": len(accepted),
+            "skipped": len(statuses) - len(accepted),
+            "size_kb": sum(item["size"] for item in accepted) // 1024,
+            "files": statuses,
+        })
+
+    except HTTPException as e:
+        UPLOADS.labels("rejected").inc()
+        raise e
+    except Exception as e:
+        UPLOADS.labels("error").inc()
+        print(f"❌ Batch upload error: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Temp files of duplicates / failed requests
+        for item in spooled:
+            if os.path.exists(item["tmp_path"]):
+                os.remove(item["tmp_path"])
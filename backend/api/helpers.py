@@ -1,50 +1,96 @@
-from backend.rag.pipeline import get_or_create_collection
+import os
+from backend.rag.vector_store import get_or_create_collection
+from backend.rag.query_embedder import embed_query
+from backend.rag.bm25 import get_bm25_index
+from backend.utils.metrics import span
 from typing import List, Optional, Dict, Any
 
+# =========================
+# HYBRID RETRIEVAL CONFIG
+# =========================
+# Candidates pulled from each retriever before fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))
+# Reciprocal rank fusion: score = Σ weight / (RRF_K + rank)
+RRF_K = int(os.getenv("RRF_K", "60"))
+DENSE_WEIGHT = float(os.getenv("DENSE_WEIGHT", "1.0"))
+BM25_WEIGHT = float(os.getenv("BM25_WEIGHT", "1.0"))
 
-def search(query: str, document_id: int | None = None, user_email: str = "",) -> tuple[List[str] , List[Dict[str, Any]]]:
+
+def reciprocal_rank_fusion(rankings: List[tuple[float, List[str]]], k: int = RRF_K) -> List[str]:
+    """
+    Fuse several ranked id lists.
+
+    Args:
+        rankings: (weight, ids best-first) per retriever.
+        k: RRF damping constant.
+
+    Returns:
+        Ids ordered by fused score.
     """
-    Retrieve relevant chunks from the user's Chroma collection.
+    scores: Dict[str, float] = {}
+    for weight, ids in rankings:
+        for rank, chunk_id in enumerate(ids, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + weight / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def search(query: str, document_id: int | None = None, user_email: str = "", n_results: int = 8, user_id: int | None = None) -> tuple[List[str] , List[Dict[str, Any]]]:
+    """
+    Retrieve relevant chunks from the user's Chroma collection, fused with
+    BM25 keyword hits so exact terms (ids, emails, acronyms) are found too.
 
     Args:
-        query: The search query (semantic similarity).
+        query: The search query (semantic similarity + keywords).
         document_id: Optional filter to a specific document.
         user_email: User's email to isolate their collection.
+        n_results: Number of chunks to return.
+        user_id: User's id (required by the shared tenant layout).
 
     Returns:
         Tuple of (documents list, metadatas list) — always lists, never None.
+        Each metadata dict also carries the chunk's `chunk_id`.
     """
-    collection = get_or_create_collection(user_email)
+    collection = get_or_create_collection(user_email, user_id=user_id)
     where_clause = {"document_id": document_id} if document_id is not None else None
-    results= collection.query(
-        query_texts=[query],
-        n_results=8,
-        where=where_clause,
-        include=["documents", "metadatas"]
-    )
-    
+    depth = max(HYBRID_CANDIDATES, n_results)
+
+    # Dense: embed with the ingest model (LRU-cached) instead of Chroma's default embedder
+    with span("retrieval.embed_query"):
+        query_vector = embed_query(query)
+    with span("retrieval.dense", depth=depth):
+        results= collection.query(
+            query_embeddings=[query_vector],
+            n_results=depth,
+            where=where_clause,
+            include=["documents", "metadatas"]
+        )
+    dense_ids = results["ids"][0] if results["ids"] and results["ids"][0] else []
     docs = results["documents"][0] if results["documents"] and results["documents"][0] else []
     metas = results["metadatas"][0] if results["metadatas"] and results["metadatas"][0] else []
-    return docs, metas
+    found = {cid: (doc, meta) for cid, doc, meta in zip(dense_ids, docs, metas)}
 
-def summarize(chunks: list[str]) -> str:
-    """
-    Simple truncation-based summary.
-    Can be upgraded to LLM-based summarization later.
+    # Sparse: BM25 over the user's whole corpus
+    with span("retrieval.bm25", depth=depth):
+        sparse_ids = [cid for cid, _ in get_bm25_index(user_email).search(query, depth, document_id)]
 
-    Args:
-        chunks: List of text chunks.
+    fused = reciprocal_rank_fusion([(DENSE_WEIGHT, dense_ids), (BM25_WEIGHT, sparse_ids)])[:n_results]
+
+    # Keyword-only hits aren't in the dense results yet
+    missing = [cid for cid in fused if cid not in found]
+    if missing:
+        with span("retrieval.fetch", ids=len(missing)):
+            extra = collection.get(ids=missing, include=["documents", "metadatas"])
+        for cid, doc, meta in zip(extra["ids"], extra["documents"], extra["metadatas"]):
+            found[cid] = (doc, meta)
+
+    docs, metas = [], []
+    for cid in fused:
+        if cid in found:
+            doc, meta = found[cid]
+            docs.append(doc)
+            metas.append({**(meta or {}), "chunk_id": cid})
+    return docs, metas
 
-    Returns:
-        Truncated summary string.
-    """
-    if not chunks:
-        return "No content to summarize."
-    
-    text = " ".join(chunks)
-    # truncate to ~500 tokens (rough limit)
-    return text[:2000] + ("..." if len(text) > 2000 else "")
-    
 def extract(chunks: list[str], field: str) -> List[str]:
     """
     Naive keyword-based extraction of a field (e.g., "email", "name").
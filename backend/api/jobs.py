@@ -0,0 +1,65 @@
+# backend/api/jobs.py
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.db.database import get_async_db
+from backend.models.job import IngestJob
+from backend.utils.utils import get_current_user
+
+router = APIRouter(prefix="/api", tags=["jobs"])
+
+
+# ============================
+# LIST USER INGESTION JOBS
+# ============================
+@router.get("/jobs")
+async def list_jobs(
+    limit: int = 50,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    jobs = (
+        await db.scalars(
+            select(IngestJob)
+            .where(IngestJob.user_id == current_user["id"])
+            .order_by(IngestJob.id.desc())
+            .limit(min(max(limit, 1), 200))
+        )
+    ).all()
+
+    return [job.to_dict() for job in jobs]
+
+
+# ============================
+# GET JOB STATUS BY ID
+# ============================
+@router.get("/jobs/{job_id}")
+async def get_job(
+    job_id: int,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    job = await db.scalar(
+        select(IngestJob)
+        .where(
+            IngestJob.id == job_id,
+            IngestJob.user_id == current_user["id"]
+        )
+    )
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    result = job.to_dict()
+    if job.kind == "batch":
+        # Per-file status of the batch
+        files = (
+            await db.scalars(select(IngestJob).where(IngestJob.batch_id == job.id).order_by(IngestJob.id))
+        ).all()
+        result["files"] = [f.to_dict() for f in files]
+        result["counts"] = {
+            status: sum(1 for f in files if f.status == status)
+            for status in ("pending", "running", "done", "failed")
+        }
+    return result
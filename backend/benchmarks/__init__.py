@@ -0,0 +1 @@
+# backend/benchmarks/__init__.py
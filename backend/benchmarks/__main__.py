@@ -0,0 +1,46 @@
+# backend/benchmarks/__main__.py
+"""
+Run the core suite (ingest, search, chat, viewer), each in its own process, and
+write JSON results to benchmark_results/.
+
+Usage:
+    python -m backend.benchmarks            # quick defaults, fake embeddings
+    python -m backend.benchmarks --full     # real embedding model, larger sizes
+"""
+import argparse
+import subprocess
+import sys
+
+QUICK = {
+    "ingest": ["--pages", "10", "100", "--embeddings", "fake"],
+    "search": ["--sizes", "1000", "10000"],
+    "chat": ["--requests", "50"],
+    "viewer": ["--size-mb", "10", "--runs", "3"],
+}
+FULL = {
+    "ingest": ["--pages", "10", "100", "500"],
+    "search": ["--sizes", "1000", "10000", "100000", "1000000", "--queries", "500"],
+    "chat": ["--requests", "200", "--concurrency", "8", "--token-delay-ms", "20"],
+    "viewer": ["--size-mb", "50", "--runs", "10"],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument("--full", action="store_true")
+    parser.add_argument("--only", nargs="+", choices=list(QUICK))
+    args = parser.parse_args()
+
+    plan = FULL if args.full else QUICK
+    failed = []
+    for name in args.only or plan:
+        print(f"▶️  {name}", file=sys.stderr)
+        if subprocess.run([sys.executable, "-m", f"backend.benchmarks.{name}", *plan[name]]).returncode:
+            failed.append(name)
+    if failed:
+        print(f"❌ Failed: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# backend/benchmarks/chat.py
+"""
+End-to-end /api/chat: time-to-first-token and total latency through the
+real endpoint (auth, tool loop, hybrid search, SSE streaming), with a
+scripted fake LLM in place of Ollama and the hashing embedder.
+
+The fake model answers every request with one rag_search tool call and
+then a fixed answer, streamed word by word with --token-delay-ms between
+words, so results isolate the app's own overhead.
+
+Usage:
+    python -m backend.benchmarks.chat
+    python -m backend.benchmarks.chat --requests 200 --concurrency 8 --token-delay-ms 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from backend.benchmarks.common import isolated_env, create_schema_and_user, percentiles, write_results, start_server
+
+ANSWER = (
+    "According to the documents, the supply contract for the Lisbon office was approved "
+    "in 2019 by Alice Moreau, and the renewal terms are net thirty days from invoice."
+)
+
+
+async def one_request(client, message: str) -> dict:
+    start = time.perf_counter()
+    first_token = None
+    server_metrics = None
+    async with client.stream("POST", "/api/chat", json={"message": message}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            data = line[len("data: "):]
+            if data == "[DONE]":
+                break
+            event = json.loads(data)
+            if "content" in event and first_token is None:
+                first_token = time.perf_counter()
+            if "metrics" in event:
+                server_metrics = event["metrics"]
+            if "error" in event:
+                raise RuntimeError(event["error"])
+    end = time.perf_counter()
+    return {
+        "ttft_ms": ((first_token or end) - start) * 1000,
+        "total_ms": (end - start) * 1000,
+        "server": server_metrics or {},
+    }
+
+
+async def run(args, user_email: str, user_id: int, base_url: str) -> dict:
+    import httpx
+    from backend.utils.utils import create_refresh_token
+
+    token = create_refresh_token({"sub": user_email, "uid": user_id})
+    async with httpx.AsyncClient(base_url=base_url, cookies={"refresh_token": token}, timeout=120) as client:
+        # Warm-up (first search opens Chroma/BM25, first token path compiles)
+        for i in range(3):
+            await one_request(client, f"warm-up question {i}")
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        results = []
+
+        async def worker(i: int):
+            async with semaphore:
+                results.append(await one_request(client, f"Who approved the Lisbon supply contract? #{i}"))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(args.requests)))
+        wall = time.perf_counter() - start
+
+    ttft = percentiles([r["ttft_ms"] for r in results])
+    total = percentiles([r["total_ms"] for r in results])
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "token_delay_ms": args.token_delay_ms,
+        "throughput_rps": round(args.requests / wall, 2),
+        "ttft": ttft,
+        "total": total,
+        "server_ttft_ms_mean": round(
+            sum(r["server"].get("ttft_ms", 0) or 0 for r in results) / len(results), 3
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /api/chat with a scripted fake LLM")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--token-delay-ms", type=float, default=0.0)
+    parser.add_argument("--pages", type=int, default=20, help="size of the indexed fixture document")
+    parser.add_argument("--rerank", action="store_true", help="keep the cross-encoder reranker on")
+    parser.add_argument("--out", help="results JSON path (default benchmark_results/chat-<commit>.json)")
+    args = parser.parse_args()
+
+    workdir = isolated_env("chat")
+    if not args.rerank:
+        os.environ["RERANK_ENABLED"] = "false"
+    user_email = "bench@example.com"
+    user_id = create_schema_and_user(user_email)
+
+    from backend.benchmarks.fakes import HashEmbeddings, ScriptedChatModel
+    from backend.benchmarks.fixtures import write_fixture
+    from backend.rag.embeddings import set_embeddings
+    from backend.rag.llm import set_llm
+    from backend.rag.pipeline import process_uploaded_file
+
+    set_embeddings(HashEmbeddings(), "bench-hash")
+    set_llm(ScriptedChatModel(
+        tool_query="Lisbon supply contract approval",
+        answer=ANSWER,
+        token_delay=args.token_delay_ms / 1000,
+    ))
+    process_uploaded_file(write_fixture(workdir, "txt", args.pages), "fixture.txt", user_email, "bench-chat", user_id=user_id)
+
+    print(f"⏱️  {args.requests} chat requests (concurrency {args.concurrency})...", file=sys.stderr)
+    server, base_url = start_server()
+    try:
+        results = asyncio.run(run(args, user_email, user_id, base_url))
+    finally:
+        server.should_exit = True
+    print(json.dumps(results, indent=2), file=sys.stderr)
+    write_results("chat", results, args.out)
+
+
+if __name__ == "__main__":
+    main()
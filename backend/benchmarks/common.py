@@ -0,0 +1,110 @@
+# backend/benchmarks/common.py
+"""Shared helpers for the benchmark suite: isolated env, percentiles, JSON results."""
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+RESULTS_DIR = Path(os.getenv("BENCHMARK_RESULTS_DIR", "benchmark_results"))
+
+
+def isolated_env(prefix: str) -> Path:
+    """
+    Point the DB, Chroma, BM25, page store and embedding cache at a fresh temp dir.
+    Must run before any backend module reads its config at import.
+    """
+    workdir = Path(tempfile.mkdtemp(prefix=f"bench-{prefix}-"))
+    # Never the real database, unless explicitly asked for
+    os.environ["DATABASE_URL"] = os.getenv("BENCHMARK_DATABASE_URL", f"sqlite:///{workdir / 'bench.db'}")
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ["CHROMA_DIR"] = str(workdir / "chroma")
+    os.environ["BM25_DIR"] = str(workdir / "bm25")
+    os.environ["PAGE_STORE_DIR"] = str(workdir / "page_store")
+    os.environ["EMBEDDING_CACHE_DIR"] = str(workdir / "embedding_cache")
+    os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+    return workdir
+
+
+def create_schema_and_user(email: str = "bench@example.com") -> int:
+    """Create tables and a benchmark user; returns the user id."""
+    from backend.db.database import Base, SessionLocal, engine
+    from backend.models import models, document, job, chunk  # noqa: F401  (register tables)
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = db.query(models.User).filter(models.User.email == email).first()
+        if user is None:
+            user = models.User(email=email, name="bench", hashed_password="!")
+            db.add(user)
+            db.commit()
+        return user.id
+
+
+def percentiles(values_ms: List[float]) -> dict:
+    if not values_ms:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0}
+    ordered = sorted(values_ms)
+    pick = lambda q: round(ordered[min(int(q * len(ordered)), len(ordered) - 1)], 3)
+    return {
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "mean_ms": round(sum(ordered) / len(ordered), 3),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def write_results(name: str, results: dict, out: Optional[str] = None) -> Path:
+    """
+    Write `results` with run metadata as JSON. Default path:
+    benchmark_results/<name>-<commit>.json, comparable with compare.py.
+    """
+    commit = _git_commit()
+    payload = {
+        "benchmark": name,
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    path = Path(out) if out else RESULTS_DIR / f"{name}-{commit or 'local'}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2))
+    print(f"✅ {name} results written to {path}", file=sys.stderr)
+    return path
+
+
+def start_server():
+    """
+    Serve the app with uvicorn on a free local port in a background thread.
+    (httpx's in-process ASGI transport buffers whole responses, which
+    would hide time-to-first-token and streamed file bytes.)
+    """
+    import socket
+    import threading
+    import uvicorn
+    from backend.main import app
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
@@ -0,0 +1,98 @@
+# backend/benchmarks/compare.py
+"""
+Compare two benchmark result files and flag regressions.
+
+Usage:
+    python -m backend.benchmarks.compare benchmark_results/search-abc123.json benchmark_results/search-def456.json
+    python -m backend.benchmarks.compare old.json new.json --threshold 0.05
+
+Exits with status 1 if any metric got worse by more than --threshold.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Optional
+
+# Fields that identify a run inside a list of runs
+ID_KEYS = ("format", "pages", "chunks", "backend", "layout", "users", "concurrency")
+HIGHER_IS_BETTER = ("per_sec", "rps", "recall", "overlap", "speedup", "cosine")
+LOWER_IS_BETTER = ("_ms", "_s", "_mb")
+
+
+def direction(metric: str) -> Optional[int]:
+    """+1 if higher is better, -1 if lower is better, None if not a tracked metric."""
+    name = metric.rsplit(".", 1)[-1]
+    if any(token in name for token in HIGHER_IS_BETTER):
+        return 1
+    if name.endswith(LOWER_IS_BETTER):
+        return -1
+    return None
+
+
+def flatten(value, prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves keyed by dotted path; list items keyed by their identifying fields."""
+    out: Dict[str, float] = {}
+    if isinstance(value, dict):
+        for key, child in value.items():
+            out.update(flatten(child, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            if isinstance(item, dict):
+                ident = ",".join(f"{k}={item[k]}" for k in ID_KEYS if k in item) or str(i)
+            else:
+                ident = str(i)
+            out.update(flatten(item, f"{prefix}[{ident}]"))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = float(value)
+    return out
+
+
+def compare(old: dict, new: dict, threshold: float) -> list:
+    before, after = flatten(old.get("results", old)), flatten(new.get("results", new))
+    rows = []
+    for metric in sorted(before.keys() & after.keys()):
+        sign = direction(metric)
+        if sign is None or before[metric] == 0:
+            continue
+        change = (after[metric] - before[metric]) / abs(before[metric])
+        rows.append({
+            "metric": metric,
+            "before": before[metric],
+            "after": after[metric],
+            "change_pct": round(change * 100, 1),
+            "regression": change * sign < -threshold,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    parser.add_argument("--json", action="store_true", help="print rows as JSON")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    rows = compare(old, new, args.threshold)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"{old.get('benchmark', '?')}: {old.get('commit')} → {new.get('commit')}")
+        for row in rows:
+            flag = "❌" if row["regression"] else "  "
+            print(f"{flag} {row['metric']:<60} {row['before']:>12.3f} → {row['after']:>12.3f}  ({row['change_pct']:+.1f}%)")
+
+    regressions = [r for r in rows if r["regression"]]
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) over {args.threshold:.0%}", file=sys.stderr)
+        sys.exit(1)
+    print("✅ No regressions", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# backend/benchmarks/embedding_backends.py
+"""
+Compare embedding backends (torch / onnx / onnx-int8): throughput and
+retrieval drift against the PyTorch baseline on the synthetic fixture corpus.
+
+Defaults to a tiny model so it runs in seconds; with --offline it only uses
+models already in the local Hugging Face cache (or a local path).
+
+Usage:
+    python -m backend.benchmarks.embedding_backends
+    python -m backend.benchmarks.embedding_backends --model ./models/MiniLM-L3 --offline --threads 4
+    python -m backend.benchmarks.embedding_backends --backends torch onnx-int8 --out embed.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from backend.benchmarks.fixtures import synthetic_corpus
+
+TINY_MODEL = os.getenv("BENCHMARK_EMBEDDING_MODEL", "sentence-transformers/paraphrase-MiniLM-L3-v2")
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+
+
+def _top_k(doc_vectors: np.ndarray, query_vectors: np.ndarray, k: int) -> np.ndarray:
+    scores = _normalize(query_vectors) @ _normalize(doc_vectors).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def run_backend(backend: str, model: str, passages, queries, threads: int, batch_size: int, k: int) -> dict:
+    from backend.rag.embeddings import build_embeddings
+
+    start = time.perf_counter()
+    embedder = build_embeddings(model, backend, threads=threads, batch_size=batch_size)
+    load_s = time.perf_counter() - start
+
+    embedder.embed_documents(passages[:batch_size])  # warm-up
+
+    start = time.perf_counter()
+    doc_vectors = np.asarray(embedder.embed_documents(passages), dtype=np.float32)
+    embed_s = time.perf_counter() - start
+    query_vectors = np.asarray(embedder.embed_documents([q for q, _ in queries]), dtype=np.float32)
+
+    top = _top_k(doc_vectors, query_vectors, k)
+    truth = np.array([idx for _, idx in queries])
+    return {
+        "backend": backend,
+        "load_s": round(load_s, 2),
+        "chunks_per_sec": round(len(passages) / embed_s, 1),
+        f"recall@{k}": round(float(np.mean([t in row for t, row in zip(truth, top)])), 4),
+        "_doc_vectors": doc_vectors,
+        "_top": top,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument("--model", default=TINY_MODEL, help="model id or local path")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"],
+                        choices=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--passages", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--offline", action="store_true", help="never download models")
+    parser.add_argument("--out", help="write results JSON here")
+    args = parser.parse_args()
+
+    if args.offline:
+        os.environ["HF_HUB_OFFLINE"] = "1"
+        os.environ["TRANSFORMERS_OFFLINE"] = "1"
+
+    passages, queries = synthetic_corpus(args.passages)
+    backends = args.backends if "torch" in args.backends else ["torch", *args.backends]
+
+    rows = []
+    for backend in backends:
+        print(f"⏱️  {backend}...", file=sys.stderr)
+        try:
+            rows.append(run_backend(backend, args.model, passages, queries, args.threads, args.batch_size, args.k))
+        except ImportError as e:
+            print(f"⚠️ Skipping {backend}: {e}", file=sys.stderr)
+
+    baseline = next((r for r in rows if r["backend"] == "torch"), None)
+    for row in rows:
+        if baseline is not None:
+            a, b = _normalize(row["_doc_vectors"]), _normalize(baseline["_doc_vectors"])
+            row["mean_cosine_vs_torch"] = round(float(np.mean(np.sum(a * b, axis=1))), 5)
+            # Share of the baseline's top-k that this backend also returns
+            overlap = [len(set(x) & set(y)) / args.k for x, y in zip(row["_top"], baseline["_top"])]
+            row[f"top{args.k}_overlap_vs_torch"] = round(float(np.mean(overlap)), 4)
+            row["recall_drift"] = round(row[f"recall@{args.k}"] - baseline[f"recall@{args.k}"], 4)
+            row["speedup_vs_torch"] = round(row["chunks_per_sec"] / baseline["chunks_per_sec"], 2)
+        del row["_doc_vectors"], row["_top"]
+
+    report = {
+        "model": args.model,
+        "passages": len(passages),
+        "queries": len(queries),
+        "threads": args.threads,
+        "batch_size": args.batch_size,
+        "results": rows,
+    }
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2))
+        print(f"✅ Results written to {args.out}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# backend/benchmarks/fakes.py
+"""
+Stand-ins for the model-bound parts of the stack, so benchmarks measure the
+pipeline itself and run offline: a hashing embedder and a scripted chat
+model that replays tool calls and answers like Ollama would.
+"""
+import hashlib
+import json
+import time
+import uuid
+from typing import Any, Iterator, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic bag-of-words vectors: same text → same vector, similar words → overlap."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _vector(self, text: str) -> List[float]:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            h = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+            vec[h % self.dim] += 1.0 if (h >> 32) & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Plays a RAG turn the way Ollama would: a user question gets one
+    `rag_search` tool call, a conversation ending in a tool result gets
+    `answer`. Content streams word by word with an optional per-token
+    delay; tool calls stream as tool_call_chunks. The reply depends only
+    on the conversation, so concurrent requests don't interfere.
+    """
+
+    tool_query: str = "documents"
+    answer: str = "Here is what the documents say."
+    token_delay: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ScriptedChatModel":
+        return self
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        if messages and isinstance(messages[-1], ToolMessage):
+            return AIMessage(content=self.answer)
+        return AIMessage(content="", tool_calls=[{
+            "name": "rag_search",
+            "args": {"query": self.tool_query},
+            "id": f"call_{uuid.uuid4().hex[:8]}",
+            "type": "tool_call",
+        }])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        message = self._reply(messages)
+        if message.content:
+            for token in message.content.split(" "):
+                if self.token_delay:
+                    time.sleep(self.token_delay)
+                yield ChatGenerationChunk(message=AIMessageChunk(content=token + " "))
+        for index, call in enumerate(message.tool_calls):
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[{
+                    "name": call["name"],
+                    "args": json.dumps(call["args"]),
+                    "id": call["id"],
+                    "index": index,
+                }],
+            ))
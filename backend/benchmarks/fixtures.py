@@ -0,0 +1,167 @@
+# backend/benchmarks/fixtures.py
+"""
+Deterministic synthetic corpus for benchmarks (no downloads, no real data).
+
+Every passage states one unique fact, and each query asks about exactly one
+passage, so retrieval recall can be scored without labelling.
+"""
+import random
+from typing import List, Tuple
+
+PEOPLE = ["Alice Moreau", "Ravi Patel", "Chen Wei", "Maria Lopez", "John Okafor", "Sara Nilsson",
+          "Tomasz Nowak", "Aiko Tanaka", "Omar Haddad", "Lena Fischer", "Diego Ramos", "Priya Nair"]
+CITIES = ["Lisbon", "Nairobi", "Osaka", "Toronto", "Krakow", "Lima", "Dublin", "Pune", "Oslo", "Austin"]
+ENTITIES = ["supply contract", "lease agreement", "software license", "maintenance plan", "data policy",
+            "insurance claim", "purchase order", "service level agreement", "audit report", "budget forecast"]
+ACTIONS = ["approved", "signed", "rejected", "audited", "renewed", "drafted", "amended", "reviewed"]
+FILLER = [
+    "The parties agree to cooperate in good faith on all related matters.",
+    "Payment terms are net thirty days from the date of invoice.",
+    "Either party may terminate with ninety days written notice.",
+    "All figures are reported in euros unless stated otherwise.",
+    "Confidential information must not be disclosed to third parties.",
+    "This section supersedes any previous oral understanding.",
+    "Disputes shall be settled by arbitration in the agreed venue.",
+    "Deliverables are reviewed at the end of each quarter.",
+]
+
+
+def synthetic_corpus(n: int, seed: int = 7, filler_sentences: int = 6) -> Tuple[List[str], List[Tuple[str, int]]]:
+    """
+    Build `n` passages and one query per passage.
+
+    Returns:
+        (passages, queries) where each query is (text, index of its passage).
+    """
+    rng = random.Random(seed)
+    passages, queries, seen = [], [], set()
+    while len(passages) < n:
+        person, city, entity = rng.choice(PEOPLE), rng.choice(CITIES), rng.choice(ENTITIES)
+        action, year = rng.choice(ACTIONS), rng.randint(1995, 2025)
+        key = (person, city, entity, action, year)
+        if key in seen:
+            continue
+        seen.add(key)
+        fact = f"In {year}, {person} {action} the {entity} for the {city} office."
+        body = rng.sample(FILLER, k=min(filler_sentences, len(FILLER)))
+        body.insert(rng.randrange(len(body) + 1), fact)
+        passages.append(" ".join(body))
+        queries.append((f"Who {action} the {city} {entity} in {year}?", len(passages) - 1))
+    return passages, queries
+
+
+# =========================
+# FIXTURE FILES
+# =========================
+def fixture_pages(pages: int, seed: int = 11, sentences_per_page: int = 30) -> List[str]:
+    """Page texts built from the synthetic passages (~2-3k chars each)."""
+    passages, _ = synthetic_corpus(pages * 4, seed=seed, filler_sentences=6)
+    per_page = [" ".join(passages[i * 4:(i + 1) * 4]) for i in range(pages)]
+    return [text[: sentences_per_page * 100] for text in per_page]
+
+
+def write_txt(path, pages: List[str]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(pages))
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path, pages: List[str], line_chars: int = 90, image_bytes: int = 0) -> None:
+    """
+    Minimal valid PDF (Helvetica text, one content stream per page) — no extra deps.
+    `image_bytes` > 0 gives every page an uncompressed image of about that
+    size, like a scanned document, to build large files.
+    """
+    objects = []  # index i → object number i + 1
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")  # filled in once the page tree exists
+    pages_obj = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids = []
+    for text in pages:
+        lines = [text[i:i + line_chars] for i in range(0, len(text), line_chars)] or [""]
+        ops = ["BT", "/F1 10 Tf", "12 TL", "50 780 Td"]
+        ops += [f"({_pdf_escape(line)}) Tj T*" for line in lines]
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        xobjects = b""
+        if image_bytes > 0:
+            side = max(int((image_bytes / 3) ** 0.5), 1)
+            pixels = random.Random(len(page_ids)).randbytes(side * side * 3)  # incompressible, like photo data
+            image = add(
+                b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB "
+                b"/BitsPerComponent 8 /Length %d >>\nstream\n" % (side, side, len(pixels)) + pixels + b"\nendstream"
+            )
+            xobjects = b" /XObject << /Im1 %d 0 R >>" % image
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >>%s >> /Contents %d 0 R >>" % (pages_obj, font, xobjects, content)
+        ))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_obj
+    kids = b" ".join(b"%d 0 R" % p for p in page_ids)
+    objects[pages_obj - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_docx(path, pages: List[str]) -> None:
+    """Minimal .docx (one paragraph per page) — no extra deps."""
+    import zipfile
+    from xml.sax.saxutils import escape
+
+    body = "".join(f"<w:p><w:r><w:t xml:space=\"preserve\">{escape(p)}</w:t></w:r></w:p>" for p in pages)
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f"<w:body>{body}</w:body></w:document>"
+    )
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        "</Types>"
+    )
+    rels = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="word/document.xml"/></Relationships>'
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml", content_types)
+        z.writestr("_rels/.rels", rels)
+        z.writestr("word/document.xml", document)
+
+
+WRITERS = {"pdf": write_pdf, "docx": write_docx, "txt": write_txt}
+
+
+def write_fixture(directory, fmt: str, pages: int, seed: int = 11) -> str:
+    """Generate a `pages`-page fixture of format pdf | docx | txt; returns its path."""
+    from pathlib import Path
+
+    path = Path(directory) / f"fixture_{pages}p_{seed}.{fmt}"
+    WRITERS[fmt](path, fixture_pages(pages, seed=seed))
+    return str(path)
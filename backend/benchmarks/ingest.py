@@ -0,0 +1,84 @@
+# backend/benchmarks/ingest.py
+"""
+Ingest throughput: pages/sec, chunks/sec and peak RSS of
+`process_uploaded_file` on generated PDF, DOCX and TXT fixtures.
+
+Runs against a throwaway SQLite DB / Chroma dir. The embedding cache is
+empty per run, so every chunk is embedded. `--embeddings fake` swaps the
+model for a hashing embedder to isolate extract/split/store overhead.
+
+Usage:
+    python -m backend.benchmarks.ingest
+    python -m backend.benchmarks.ingest --formats pdf --pages 10 100 500 --embeddings fake
+"""
+import argparse
+import sys
+import time
+
+from backend.benchmarks.common import isolated_env, create_schema_and_user, write_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark document ingestion")
+    parser.add_argument("--formats", nargs="+", default=["pdf", "docx", "txt"], choices=["pdf", "docx", "txt"])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--embeddings", choices=["real", "fake"], default="real")
+    parser.add_argument("--out", help="results JSON path (default benchmark_results/ingest-<commit>.json)")
+    args = parser.parse_args()
+
+    workdir = isolated_env("ingest")
+    user_email = "bench@example.com"
+    user_id = create_schema_and_user(user_email)
+
+    from backend.benchmarks.fixtures import write_fixture
+    from backend.models.document import Document
+    from backend.db.database import SessionLocal
+    from backend.rag.pipeline import process_uploaded_file
+    from backend.rag.embeddings import get_embeddings, set_embeddings
+    from backend.utils.memory import PeakMemory, current_rss_bytes
+
+    if args.embeddings == "fake":
+        from backend.benchmarks.fakes import HashEmbeddings
+        set_embeddings(HashEmbeddings(), "bench-hash")
+    else:
+        get_embeddings()  # load the model outside the timed region
+
+    # Warm-up run (imports, Chroma client, first batch) outside the results
+    process_uploaded_file(write_fixture(workdir, "txt", 2, seed=0), "warmup.txt", user_email, "bench-warmup", user_id=user_id)
+
+    rows = []
+    for seed, (fmt, pages) in enumerate(((f, p) for f in args.formats for p in args.pages), start=1):
+        # A distinct seed per run, so no run hits the previous one's embedding cache
+        path = write_fixture(workdir, fmt, pages, seed=seed)
+        file_hash = f"bench-{fmt}-{pages}-{time.time_ns()}"
+        print(f"⏱️  {fmt} × {pages} pages...", file=sys.stderr)
+
+        rss_before = current_rss_bytes() or 0
+        mem = PeakMemory()
+        start = time.perf_counter()
+        with mem:
+            document_id = process_uploaded_file(path, f"fixture.{fmt}", user_email, file_hash, user_id=user_id)
+        elapsed = time.perf_counter() - start
+
+        with SessionLocal() as db:
+            doc = db.get(Document, document_id)
+            page_count, chunk_count = doc.page_count, doc.chunk_count
+
+        rows.append({
+            "format": fmt,
+            "pages": pages,
+            "extracted_pages": page_count,
+            "chunks": chunk_count,
+            "seconds": round(elapsed, 3),
+            # DOCX/TXT load as one section, so rate is per generated page
+            "pages_per_sec": round(pages / elapsed, 2),
+            "chunks_per_sec": round(chunk_count / elapsed, 2),
+            "peak_rss_mb": mem.peak_mb,
+            "rss_growth_mb": round((mem.peak_bytes - rss_before) / (1024 * 1024), 1),
+        })
+
+    write_results("ingest", {"embeddings": args.embeddings, "runs": rows}, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# backend/benchmarks/search.py
+"""
+Search latency: p50/p95/p99 of `helpers.search` (dense + BM25 fusion) as
+one user's collection grows.
+
+The collection is filled incrementally up to each size with random unit
+vectors and synthetic passage text (so BM25 has real postings), then
+queried. Query embedding uses the hashing embedder by default so the
+numbers reflect retrieval, not the model; `--embeddings real` includes it.
+
+Usage:
+    python -m backend.benchmarks.search
+    python -m backend.benchmarks.search --sizes 1000 10000 100000 1000000 --queries 500
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from backend.benchmarks.common import isolated_env, create_schema_and_user, percentiles, write_results
+
+DIM = 384
+ADD_BATCH = 4000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark helpers.search latency vs collection size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--n-results", type=int, default=8)
+    parser.add_argument("--embeddings", choices=["real", "fake"], default="fake")
+    parser.add_argument("--seed", type=int, default=3)
+    parser.add_argument("--out", help="results JSON path (default benchmark_results/search-<commit>.json)")
+    args = parser.parse_args()
+
+    isolated_env("search")
+    user_email = "bench@example.com"
+    user_id = create_schema_and_user(user_email)
+
+    from backend.api.helpers import search
+    from backend.benchmarks.fixtures import synthetic_corpus
+    from backend.rag.bm25 import get_bm25_index
+    from backend.rag.embeddings import get_embeddings, set_embeddings
+    from backend.rag.vector_store import get_or_create_collection
+
+    if args.embeddings == "fake":
+        from backend.benchmarks.fakes import HashEmbeddings
+        set_embeddings(HashEmbeddings(DIM), "bench-hash")
+    dim = len(get_embeddings().embed_query("dimension probe"))
+
+    rng = np.random.default_rng(args.seed)
+    passages, queries = synthetic_corpus(5000, seed=args.seed)
+    collection = get_or_create_collection(user_email, user_id=user_id)
+    keyword_index = get_bm25_index(user_email)
+
+    rows = []
+    stored = 0
+    for size in sorted(args.sizes):
+        print(f"⏱️  filling to {size} chunks...", file=sys.stderr)
+        fill_start = time.perf_counter()
+        while stored < size:
+            n = min(ADD_BATCH, size - stored)
+            ids = [f"1-{i}" for i in range(stored, stored + n)]
+            texts = [passages[i % len(passages)] for i in range(stored, stored + n)]
+            vectors = rng.standard_normal((n, dim)).astype(np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            collection.add(
+                ids=ids,
+                documents=texts,
+                embeddings=vectors.tolist(),
+                metadatas=[{"document_id": 1, "chunk_index": i, "page": 0} for i in range(stored, stored + n)],
+            )
+            keyword_index.add(ids, texts, [1] * n)
+            stored += n
+        fill_s = time.perf_counter() - fill_start
+
+        # Warm-up, then timed queries (distinct texts, so the query LRU doesn't hide work)
+        for text, _ in queries[:10]:
+            search(text, user_email=user_email, user_id=user_id, n_results=args.n_results)
+        latencies = []
+        for q in range(args.queries):
+            text = f"{queries[q % len(queries)][0]} #{size}-{q}"
+            start = time.perf_counter()
+            search(text, user_email=user_email, user_id=user_id, n_results=args.n_results)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        row = {"chunks": size, "fill_s": round(fill_s, 2), "queries": args.queries, **percentiles(latencies)}
+        rows.append(row)
+        print(f"   {row}", file=sys.stderr)
+
+    write_results("search", {"embeddings": args.embeddings, "n_results": args.n_results, "runs": rows}, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# backend/benchmarks/tenant_layout.py
+"""
+Compare Chroma tenant layouts (per_user vs shared) as the user count grows.
+
+Each (layout, users) point runs in a fresh subprocess against a temp
+PersistentClient, so RSS and open-file counts aren't polluted by earlier
+runs. Vectors are random 384-dim floats (same width as all-MiniLM-L6-v2),
+so no embedding model is needed.
+
+Usage:
+    python -m backend.benchmarks.tenant_layout
+    python -m backend.benchmarks.tenant_layout --users 10 100 --chunks-per-user 20 --out tenant.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+DIM = 384
+
+
+def _open_fds() -> int:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return -1
+
+
+def _dir_size_mb(path: Path) -> float:
+    total = sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+    return round(total / (1024 * 1024), 2)
+
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)], 3)
+
+
+def run_point(layout: str, users: int, chunks_per_user: int, queries: int, seed: int) -> dict:
+    """Build one layout for `users` tenants and measure it (runs in the child)."""
+    import chromadb
+    from backend.utils.memory import current_rss_bytes
+
+    rng = random.Random(seed)
+    vec = lambda: [rng.random() for _ in range(DIM)]
+    workdir = Path(tempfile.mkdtemp(prefix=f"chroma-{layout}-"))
+    try:
+        rss_start = current_rss_bytes()
+        fds_start = _open_fds()
+        client = chromadb.PersistentClient(path=str(workdir))
+
+        # Handles stay open for the whole run, as the app's handle cache keeps them
+        handles = {}
+        start = time.perf_counter()
+        for uid in range(users):
+            ids = [f"{uid}-{i}" for i in range(chunks_per_user)]
+            metas = [{"document_id": uid, "chunk_index": i} for i in range(chunks_per_user)]
+            if layout == "per_user":
+                handles[uid] = client.get_or_create_collection(name=f"docs_u{uid}")
+            else:
+                handles[uid] = handles.get(0) or client.get_or_create_collection(name="docs_shared")
+                metas = [{**m, "user_id": uid} for m in metas]
+            handles[uid].add(
+                ids=ids,
+                embeddings=[vec() for _ in ids],
+                documents=[f"chunk {i} of user {uid}" for i in range(chunks_per_user)],
+                metadatas=metas,
+            )
+        build_s = time.perf_counter() - start
+
+        latencies = []
+        for _ in range(queries):
+            uid = rng.randrange(users)
+            where = {"user_id": uid} if layout == "shared" else None
+            t0 = time.perf_counter()
+            handles[uid].query(query_embeddings=[vec()], n_results=4, where=where)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+        return {
+            "layout": layout,
+            "users": users,
+            "chunks": users * chunks_per_user,
+            "build_s": round(build_s, 2),
+            "query_p50_ms": _percentile(latencies, 0.50),
+            "query_p95_ms": _percentile(latencies, 0.95),
+            "rss_delta_mb": round((current_rss_bytes() - rss_start) / (1024 * 1024), 1),
+            "open_fds_delta": _open_fds() - fds_start,
+            "disk_mb": _dir_size_mb(workdir),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Chroma tenant layouts")
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--layouts", nargs="+", default=["per_user", "shared"], choices=["per_user", "shared"])
+    parser.add_argument("--chunks-per-user", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--point", nargs=2, metavar=("LAYOUT", "USERS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.point:
+        layout, users = args.point[0], int(args.point[1])
+        print(json.dumps(run_point(layout, users, args.chunks_per_user, args.queries, args.seed)))
+        return
+
+    results = []
+    for users in args.users:
+        for layout in args.layouts:
+            print(f"⏱️  {layout}: {users} users...", file=sys.stderr)
+            proc = subprocess.run(
+                [sys.executable, "-m", "backend.benchmarks.tenant_layout",
+                 "--point", layout, str(users),
+                 "--chunks-per-user", str(args.chunks_per_user),
+                 "--queries", str(args.queries), "--seed", str(args.seed)],
+                capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                print(f"❌ {layout}/{users} failed:\n{proc.stderr}", file=sys.stderr)
+                continue
+            row = json.loads(proc.stdout.strip().splitlines()[-1])
+            results.append(row)
+            print(json.dumps(row), file=sys.stderr)
+
+    report = {"chunks_per_user": args.chunks_per_user, "queries": args.queries, "results": results}
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2))
+        print(f"✅ Results written to {args.out}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# backend/benchmarks/viewer.py
+"""
+Document viewer: time-to-first-page of a large PDF served by
+/api/documents/{id}/view, downloading the whole file vs. fetching only
+the byte ranges page 1 needs (what PDF.js does against a server that
+answers Range requests), plus ETag revalidation of an unchanged file.
+
+Page 1 is "shown" once pypdf has parsed it and extracted its text. The
+client is throttled to --bandwidth-mbps with --rtt-ms per request so
+loopback doesn't hide transfer time; --bandwidth-mbps 0 gives raw numbers.
+
+Usage:
+    python -m backend.benchmarks.viewer
+    python -m backend.benchmarks.viewer --size-mb 50 --bandwidth-mbps 100 --rtt-ms 20
+"""
+import argparse
+import hashlib
+import io
+import os
+import sys
+import time
+
+from backend.benchmarks.common import isolated_env, create_schema_and_user, percentiles, write_results, start_server
+
+# PDF.js requests ranges in 64 KB chunks by default
+RANGE_CHUNK = 64 * 1024
+
+
+class Network:
+    """Client-side throttle: one RTT per request plus transfer time."""
+
+    def __init__(self, bandwidth_mbps: float, rtt_ms: float):
+        self.bytes_per_sec = bandwidth_mbps * 1_000_000 / 8 if bandwidth_mbps > 0 else 0
+        self.rtt = rtt_ms / 1000 if bandwidth_mbps > 0 else 0
+        self.requests = 0
+        self.bytes = 0
+
+    def transferred(self, nbytes: int) -> None:
+        self.requests += 1
+        self.bytes += nbytes
+        if self.bytes_per_sec:
+            time.sleep(self.rtt + nbytes / self.bytes_per_sec)
+
+
+class RangeFile(io.RawIOBase):
+    """Seekable read-only file over HTTP Range requests, cached in RANGE_CHUNK blocks."""
+
+    def __init__(self, client, url: str, network: Network):
+        self.client, self.url, self.network = client, url, network
+        self.blocks = {}
+        self.pos = 0
+        # The first chunk also tells us the size (Content-Range: bytes 0-65535/SIZE)
+        response = self._get(0, RANGE_CHUNK - 1)
+        assert response.status_code == 206, response.status_code
+        self.size = int(response.headers["content-range"].rsplit("/", 1)[1])
+        self.blocks[0] = response.content
+
+    def _get(self, start: int, end: int):
+        response = self.client.get(self.url, headers={"Range": f"bytes={start}-{end}"})
+        self.network.transferred(len(response.content))
+        return response
+
+    def _fetch(self, first: int, last: int) -> None:
+        # One request for each run of missing blocks
+        missing = [b for b in range(first, last + 1) if b not in self.blocks]
+        while missing:
+            run = [missing.pop(0)]
+            while missing and missing[0] == run[-1] + 1:
+                run.append(missing.pop(0))
+            start = run[0] * RANGE_CHUNK
+            end = min((run[-1] + 1) * RANGE_CHUNK, self.size) - 1
+            data = self._get(start, end).content
+            for i, block in enumerate(run):
+                self.blocks[block] = data[i * RANGE_CHUNK:(i + 1) * RANGE_CHUNK]
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.pos
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        base = {0: 0, 1: self.pos, 2: self.size}[whence]
+        self.pos = max(0, min(base + offset, self.size))
+        return self.pos
+
+    def read(self, n: int = -1) -> bytes:
+        if n is None or n < 0:
+            n = self.size - self.pos
+        n = min(n, self.size - self.pos)
+        if n <= 0:
+            return b""
+        first, last = self.pos // RANGE_CHUNK, (self.pos + n - 1) // RANGE_CHUNK
+        self._fetch(first, last)
+        data = b"".join(self.blocks[b] for b in range(first, last + 1))
+        offset = self.pos - first * RANGE_CHUNK
+        self.pos += n
+        return data[offset:offset + n]
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def first_page_text(stream) -> str:
+    import pypdf
+
+    return pypdf.PdfReader(stream).pages[0].extract_text()
+
+
+def full_download(client, url: str, network: Network) -> dict:
+    start = time.perf_counter()
+    body = bytearray()
+    with client.stream("GET", url) as response:
+        for block in response.iter_bytes():
+            body += block
+    network.transferred(len(body))
+    text = first_page_text(io.BytesIO(bytes(body)))
+    return {"ms": (time.perf_counter() - start) * 1000, "text": text}
+
+
+def ranged(client, url: str, network: Network) -> dict:
+    start = time.perf_counter()
+    text = first_page_text(RangeFile(client, url, network))
+    return {"ms": (time.perf_counter() - start) * 1000, "text": text}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark time-to-first-page of the document viewer")
+    parser.add_argument("--size-mb", type=float, default=50)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--bandwidth-mbps", type=float, default=100.0, help="0 = unthrottled loopback")
+    parser.add_argument("--rtt-ms", type=float, default=20.0)
+    parser.add_argument("--out", help="results JSON path (default benchmark_results/viewer-<commit>.json)")
+    args = parser.parse_args()
+
+    workdir = isolated_env("viewer")
+    user_email = "bench@example.com"
+    user_id = create_schema_and_user(user_email)
+
+    import httpx
+    from backend.benchmarks.fixtures import fixture_pages, write_pdf
+    from backend.db.database import SessionLocal
+    from backend.models.document import Document
+    from backend.utils.utils import create_refresh_token
+
+    path = workdir / "large.pdf"
+    print(f"📄 Writing {args.size_mb} MB, {args.pages}-page PDF...", file=sys.stderr)
+    write_pdf(path, fixture_pages(args.pages), image_bytes=int(args.size_mb * 1024 * 1024 / args.pages))
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        file_hash = hashlib.sha256(f.read()).hexdigest()
+    with SessionLocal() as db:
+        doc = Document(filename="large.pdf", file_path=str(path), file_hash=file_hash,
+                       user_id=user_id, page_count=args.pages, chunk_count=0)
+        db.add(doc)
+        db.commit()
+        url = f"/api/documents/{doc.id}/view"
+
+    server, base_url = start_server()
+    token = create_refresh_token({"sub": user_email, "uid": user_id})
+    results = {"file_mb": round(size / (1024 * 1024), 1), "bandwidth_mbps": args.bandwidth_mbps, "rtt_ms": args.rtt_ms}
+    try:
+        with httpx.Client(base_url=base_url, cookies={"refresh_token": token}, timeout=300) as client:
+            expected = first_page_text(str(path))
+            for name, fetch in (("full_download", full_download), ("range_requests", ranged)):
+                timings, network = [], None
+                for _ in range(args.runs):
+                    network = Network(args.bandwidth_mbps, args.rtt_ms)
+                    run = fetch(client, url, network)
+                    assert run["text"] == expected, f"{name}: page 1 differs"
+                    timings.append(run["ms"])
+                results[name] = {
+                    "first_page": percentiles(timings),
+                    "requests": network.requests,
+                    "kb_transferred": network.bytes // 1024,
+                }
+                print(f"   {name}: {results[name]}", file=sys.stderr)
+
+            # Revalidation of an unchanged file: 304, no body
+            etag = client.head(url).headers["etag"]
+            timings = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                response = client.get(url, headers={"If-None-Match": etag})
+                assert response.status_code == 304, response.status_code
+                timings.append((time.perf_counter() - start) * 1000)
+            results["revalidate_304"] = percentiles(timings)
+    finally:
+        server.should_exit = True
+
+    results["first_page_speedup"] = round(
+        results["full_download"]["first_page"]["p50_ms"] / max(results["range_requests"]["first_page"]["p50_ms"], 1e-6), 1
+    )
+    write_results("viewer", results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
 import os
+import threading
+import time
+from collections import deque
 from pathlib import Path
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.schema import CreateColumn, UniqueConstraint
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from dotenv import load_dotenv
 
 # Get the path to the .env file (go up 1 level from backend/db/ to backend/)
@@ -16,9 +23,100 @@ if not SQLALCHEMY_DATABASE_URL:
         f".env exists: {env_path.exists()}"
     )
 
+# Connection pool tuning (.env)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds; below MySQL wait_timeout
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+
+# Async drivers for the sync URLs we support
+_ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql+mysqldb": "mysql+aiomysql",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """mysql+pymysql://... → mysql+aiomysql://... (override with ASYNC_DATABASE_URL)."""
+    parsed = make_url(url)
+    driver = _ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+class PoolWaitStats:
+    """Time spent waiting for a pooled connection, so pool exhaustion is visible."""
+
+    def __init__(self, window: int = 1000):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        ms = seconds * 1000
+        with self._lock:
+            self.count += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+            self._recent.append(ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent)
+        p = lambda q: round(recent[min(int(q * len(recent)), len(recent) - 1)], 2) if recent else 0.0
+        return {
+            "checkouts": self.count,
+            "avg_wait_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p95_wait_ms": p(0.95),
+            "max_wait_ms": round(self.max_ms, 2),
+        }
+
+
+sync_pool_wait = PoolWaitStats()
+async_pool_wait = PoolWaitStats()
+
+
+def _timed_pool(pool_class, stats: PoolWaitStats):
+    """
+    Pool class that records how long each checkout waited, so sessions can
+    stay lazy (no connection until their first query) and still be measured.
+    """
+
+    class TimedPool(pool_class):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                stats.record(time.perf_counter() - start)
+
+    return TimedPool
+
+
+def _pool_options(url: str, pool_class, stats: PoolWaitStats) -> dict:
+    # SQLite doesn't use a sized QueuePool
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": _timed_pool(pool_class, stats),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(SQLALCHEMY_DATABASE_URL)
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    pool_pre_ping=True
+    pool_pre_ping=True,
+    **_pool_options(SQLALCHEMY_DATABASE_URL, QueuePool, sync_pool_wait),
 )
 
 SessionLocal = sessionmaker(
@@ -27,12 +125,113 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# Async engine for request handlers — never blocks the event loop on MySQL
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    **_pool_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool, async_pool_wait),
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
+
+def add_missing_columns(table, names: list[str]) -> list[str]:
+    """
+    create_all() creates missing tables but never alters existing ones.
+    Add any of `names` (columns of `table`) that the live table lacks,
+    with the column's type, NOT NULL and server default, e.g.:
+
+        ALTER TABLE users ADD COLUMN corpus_version INTEGER NOT NULL DEFAULT 0;
+        ALTER TABLE documents ADD COLUMN summary TEXT;
+
+    A NOT NULL column needs a server_default to be added to a table that
+    already has rows.
+
+    Returns the columns added.
+    """
+    existing = {column["name"] for column in inspect(engine).get_columns(table.name)}
+    added = [name for name in names if name not in existing]
+    with engine.begin() as conn:
+        for name in added:
+            column_spec = CreateColumn(table.c[name]).compile(dialect=engine.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_spec}"))
+            print(f"🛠️ Added column {table.name}.{name}")
+    return added
+
+
+def add_missing_indexes(table, names: list[str]) -> list[str]:
+    """
+    Create any of `names` (indexes or named unique constraints of `table`)
+    that the live table lacks. An index whose uniqueness changed since it
+    was created (e.g. `documents.file_hash`, once unique across all users)
+    is dropped and re-created. A unique constraint is added as a unique
+    index, which SQLite can do on an existing table:
+
+        CREATE UNIQUE INDEX uq_documents_user_file_hash ON documents (user_id, file_hash);
+
+    Returns the indexes created.
+    """
+    inspector = inspect(engine)
+    live = {index["name"]: bool(index["unique"]) for index in inspector.get_indexes(table.name)}
+    live.update({constraint["name"]: True for constraint in inspector.get_unique_constraints(table.name)})
+    indexes = {index.name: index for index in table.indexes}
+    constraints = {c.name: c for c in table.constraints if isinstance(c, UniqueConstraint)}
+
+    created = []
+    with engine.begin() as conn:
+        for name in names:
+            if name in constraints:
+                if name not in live:
+                    columns = ", ".join(column.name for column in constraints[name].columns)
+                    conn.execute(text(f"CREATE UNIQUE INDEX {name} ON {table.name} ({columns})"))
+                    created.append(name)
+                continue
+            index = indexes[name]
+            if live.get(name) == bool(index.unique):
+                continue
+            if name in live:
+                index.drop(bind=conn)
+            index.create(bind=conn)
+            created.append(name)
+    for name in created:
+        print(f"🛠️ Created index {table.name}.{name}")
+    return created
+
+
+def _pool_state(pool) -> dict:
+    state = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            state[name] = fn()
+    return state
+
+
+def pool_status() -> dict:
+    """Current pool occupancy and checkout wait times for both engines."""
+    return {
+        "sync": {**_pool_state(engine.pool), **sync_pool_wait.snapshot()},
+        "async": {**_pool_state(async_engine.pool), **async_pool_wait.snapshot()},
+    }
+
+
 # Dependency for FastAPI
 def get_db():
+    # The connection is checked out on the first query (wait timed by the pool)
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+# Async dependency for FastAPI
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
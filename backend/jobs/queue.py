@@ -0,0 +1,358 @@
+# backend/jobs/queue.py
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.db.database import SessionLocal
+from backend.models.document import Document
+from backend.models.job import IngestJob
+
+
+# =========================
+# CONFIG
+# =========================
+# A running job whose heartbeat is older than this is assumed to be lost
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "300"))
+# How many times a lost job is retried before it is marked failed
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Minimum delay between two progress writes for the same job
+PROGRESS_WRITE_INTERVAL = float(os.getenv("JOB_PROGRESS_INTERVAL", "1.0"))
+
+
+async def enqueue_ingest_job(
+    db: AsyncSession,
+    user_id: int,
+    file_path: str,
+    filename: str,
+    file_hash: str,
+    kind: str = "ingest",
+    document_id: int | None = None,
+) -> IngestJob:
+    """
+    Persist a new ingestion job. Workers pick it up from the table, so the
+    job survives API restarts and worker crashes.
+
+    Args:
+        kind: "ingest" for a new document, "update" to re-index a new
+            version of `document_id`, "rechunk" to re-split it from its
+            stored pages ("summarize" jobs come from enqueue_summary_jobs).
+    """
+    job = IngestJob(
+        kind=kind,
+        document_id=document_id,
+        user_id=user_id,
+        file_path=file_path,
+        filename=filename,
+        file_hash=file_hash,
+        status="queued",
+        stages={},
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+
+async def enqueue_batch_job(db: AsyncSession, user_id: int, name: str, files: list) -> tuple[IngestJob, list]:
+    """
+    Persist a batch job plus one `pending` job per file, in one commit.
+    Workers claim only the batch job; it runs its files itself (see
+    pipeline.process_batch), and the per-file rows carry their status.
+
+    Args:
+        name: Label for the batch (archive name or file count).
+        files: Dicts with `file_path`, `filename`, `file_hash`.
+
+    Returns:
+        (batch job, per-file jobs in input order)
+    """
+    batch = IngestJob(
+        kind="batch",
+        user_id=user_id,
+        file_path="",
+        filename=name[:255],
+        file_hash="",
+        status="queued",
+        stages={},
+    )
+    db.add(batch)
+    await db.flush()
+    children = [
+        IngestJob(
+            kind="ingest",
+            batch_id=batch.id,
+            user_id=user_id,
+            file_path=f["file_path"],
+            filename=f["filename"][:255],
+            file_hash=f["file_hash"],
+            status="pending",
+            stages={},
+        )
+        for f in files
+    ]
+    db.add_all(children)
+    await db.commit()
+    return batch, children
+
+
+def enqueue_summary_jobs(document_ids: list) -> int:
+    """
+    Queue a "summarize" job for each document's current version, skipping
+    documents that already have one waiting. Called by the worker once a
+    document is searchable, so summarizing never delays ingestion.
+
+    Returns:
+        Number of jobs queued.
+    """
+    if not document_ids:
+        return 0
+    db = SessionLocal()
+    try:
+        waiting = {
+            row.document_id
+            for row in db.query(IngestJob.document_id).filter(
+                IngestJob.kind == "summarize",
+                IngestJob.status == "queued",
+                IngestJob.document_id.in_(document_ids),
+            )
+        }
+        docs = (
+            db.query(Document.id, Document.user_id, Document.file_path, Document.filename, Document.file_hash)
+            .filter(Document.id.in_(document_ids))
+            .all()
+        )
+        jobs = [
+            IngestJob(
+                kind="summarize",
+                document_id=doc.id,
+                user_id=doc.user_id,
+                file_path=doc.file_path,
+                filename=doc.filename,
+                file_hash=doc.file_hash,
+                status="queued",
+                stages={},
+            )
+            for doc in docs
+            if doc.id not in waiting
+        ]
+        db.add_all(jobs)
+        db.commit()
+        return len(jobs)
+    finally:
+        db.close()
+
+
+def batch_files(batch_id: int) -> list:
+    """A batch's files not yet finished (a retried batch skips the rest)."""
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(IngestJob.id, IngestJob.file_path, IngestJob.filename, IngestJob.file_hash)
+            .filter(IngestJob.batch_id == batch_id, IngestJob.status.in_(("pending", "running")))
+            .order_by(IngestJob.id)
+            .all()
+        )
+        return [{"id": r.id, "file_path": r.file_path, "filename": r.filename, "file_hash": r.file_hash} for r in rows]
+    finally:
+        db.close()
+
+
+def start_job(job_id: int) -> None:
+    """Mark a batch's per-file job as running."""
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        db.query(IngestJob).filter(IngestJob.id == job_id).update(
+            {
+                IngestJob.status: "running",
+                IngestJob.started_at: now,
+                IngestJob.heartbeat_at: now,
+                IngestJob.attempts: IngestJob.attempts + 1,
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def fail_batch_files(batch_id: int, error: str) -> None:
+    """Fail every unfinished file of a batch that was aborted."""
+    db = SessionLocal()
+    try:
+        db.query(IngestJob).filter(
+            IngestJob.batch_id == batch_id, IngestJob.status.in_(("pending", "running"))
+        ).update(
+            {IngestJob.status: "failed", IngestJob.error: error, IngestJob.finished_at: datetime.utcnow()},
+            synchronize_session=False,
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def claim_next_job(worker_id: str) -> Optional[int]:
+    """
+    Atomically move the oldest queued job to `running`.
+
+    Uses a conditional UPDATE so two workers can never claim the same row,
+    on any database backend.
+
+    Returns:
+        The claimed job id, or None if the queue is empty.
+    """
+    db = SessionLocal()
+    try:
+        while True:
+            candidate = (
+                db.query(IngestJob.id)
+                .filter(IngestJob.status == "queued")
+                .order_by(IngestJob.id)
+                .first()
+            )
+            if not candidate:
+                return None
+
+            now = datetime.utcnow()
+            claimed = (
+                db.query(IngestJob)
+                .filter(IngestJob.id == candidate.id, IngestJob.status == "queued")
+                .update(
+                    {
+                        IngestJob.status: "running",
+                        IngestJob.worker_id: worker_id,
+                        IngestJob.started_at: now,
+                        IngestJob.heartbeat_at: now,
+                        IngestJob.attempts: IngestJob.attempts + 1,
+                        IngestJob.error: None,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if claimed:
+                return candidate.id
+            # Another worker won the race — try the next one
+    finally:
+        db.close()
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Put running jobs whose worker stopped heart-beating back in the queue
+    (or fail them once they've used up their attempts).
+
+    Returns:
+        Number of jobs recovered.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+    db = SessionLocal()
+    try:
+        stale = (
+            db.query(IngestJob)
+            # A batch's files are recovered with their batch job, not on their own
+            .filter(IngestJob.status == "running", IngestJob.heartbeat_at < cutoff, IngestJob.batch_id.is_(None))
+            .all()
+        )
+        for job in stale:
+            if job.attempts >= JOB_MAX_ATTEMPTS:
+                job.status = "failed"
+                job.error = "Worker lost while processing (max attempts reached)"
+                job.finished_at = datetime.utcnow()
+            else:
+                job.status = "queued"
+                job.worker_id = None
+        db.commit()
+        return len(stale)
+    finally:
+        db.close()
+
+
+def queue_depth() -> dict:
+    """Number of queued, running and pending (batch file) jobs (served by the status index)."""
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(IngestJob.status, func.count(IngestJob.id))
+            .filter(IngestJob.status.in_(("queued", "running", "pending")))
+            .group_by(IngestJob.status)
+            .all()
+        )
+        return {"queued": 0, "running": 0, "pending": 0, **dict(rows)}
+    finally:
+        db.close()
+
+
+def finish_job(
+    job_id: int,
+    status: str,
+    error: str | None = None,
+    document_id: int | None = None,
+    peak_rss_mb: float | None = None,
+) -> None:
+    """Mark a job as done or failed."""
+    db = SessionLocal()
+    try:
+        job = db.get(IngestJob, job_id)
+        if not job:
+            return
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        if document_id is not None:
+            job.document_id = document_id
+        if peak_rss_mb is not None:
+            job.peak_rss_mb = peak_rss_mb
+        if status == "done":
+            job.stage = "done"
+        db.commit()
+    finally:
+        db.close()
+
+
+class JobProgress:
+    """
+    Progress callback handed to the pipeline: `progress(stage, fraction)`.
+
+    Writes are throttled so a long embedding stage doesn't hammer the DB,
+    and every write doubles as the job's heartbeat.
+    """
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self.stages: dict = {}
+        self.document_id: Optional[int] = None
+        self._stage: Optional[str] = None
+        self._last_write = 0.0
+
+    def __call__(self, stage: str, fraction: float, document_id: int | None = None) -> None:
+        fraction = max(0.0, min(1.0, fraction))
+        self.stages[stage] = round(fraction, 4)
+        if document_id is not None:
+            self.document_id = document_id
+
+        now = time.monotonic()
+        if stage == self._stage and fraction < 1.0 and now - self._last_write < PROGRESS_WRITE_INTERVAL:
+            return
+        self._stage = stage
+        self._last_write = now
+        self._write(stage)
+
+    def _write(self, stage: str) -> None:
+        db = SessionLocal()
+        try:
+            values = {
+                IngestJob.stage: stage,
+                IngestJob.stages: dict(self.stages),
+                IngestJob.heartbeat_at: datetime.utcnow(),
+            }
+            if self.document_id is not None:
+                values[IngestJob.document_id] = self.document_id
+            db.query(IngestJob).filter(IngestJob.id == self.job_id).update(values, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
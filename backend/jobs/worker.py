@@ -0,0 +1,240 @@
+# backend/jobs/worker.py
+"""
+Ingestion worker pool.
+
+Run alongside the API:
+    python -m backend.jobs.worker --workers 4
+
+Each worker process polls the `ingest_jobs` table, claims one job at a time
+and runs the RAG pipeline on it, so PDF parsing and embedding never run
+inside the API process.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime
+
+from backend.db.database import SessionLocal, engine
+from backend.jobs.queue import (
+    JobProgress,
+    batch_files,
+    claim_next_job,
+    enqueue_summary_jobs,
+    fail_batch_files,
+    finish_job,
+    requeue_stale_jobs,
+    start_job,
+)
+from backend.models.job import IngestJob
+from backend.utils.memory import PeakMemory
+from backend.utils.metrics import span, mark_process_dead
+from backend.models import models  # noqa: F401  (register User mapper)
+from backend.models import document  # noqa: F401  (register Document mapper)
+
+
+# =========================
+# CONFIG
+# =========================
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+# Seconds an idle worker waits before polling the queue again
+POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2.0"))
+# Seconds between heartbeats while a job is running
+HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "30"))
+
+
+def _heartbeat(job_id: int, stop: threading.Event) -> None:
+    """Keep the job's heartbeat fresh during long single stages."""
+    while not stop.wait(HEARTBEAT_INTERVAL):
+        db = SessionLocal()
+        try:
+            db.query(IngestJob).filter(IngestJob.id == job_id).update(
+                {IngestJob.heartbeat_at: datetime.utcnow()}, synchronize_session=False
+            )
+            db.commit()
+        except Exception as e:
+            print(f"⚠️ Heartbeat failed for job {job_id}: {e}")
+        finally:
+            db.close()
+
+
+def run_job(job_id: int) -> None:
+    """Run the ingestion pipeline for one claimed job and record the outcome."""
+    # Imported here so the supervisor process never loads the embedding model
+    from backend.rag.pipeline import process_uploaded_file, update_document, process_batch
+    from backend.rag.summaries import build_document_summary, SUMMARY_ENABLED
+
+    db = SessionLocal()
+    try:
+        job = db.get(IngestJob, job_id)
+        file_path, filename, file_hash = job.file_path, job.filename, job.file_hash
+        kind, target_id = job.kind, job.document_id
+        user_id, user_email = job.user_id, job.user.email
+    finally:
+        db.close()
+
+    progress = JobProgress(job_id)
+    stop = threading.Event()
+    beat = threading.Thread(target=_heartbeat, args=(job_id, stop), daemon=True)
+    beat.start()
+    mem = PeakMemory()
+    error = None
+    # Documents whose new text should get (fresh) summaries
+    to_summarize = []
+    try:
+        with mem, span("ingest.job", job_id=job_id, kind=kind) as info:
+            if kind == "summarize":
+                # Map-reduce summaries of an ingested document (LLM-bound, runs after ingest)
+                build_document_summary(target_id, file_hash=file_hash, progress=progress)
+                document_id = target_id
+            elif kind == "batch":
+                # Many files, one shared embedding batcher; per-file status on the child rows
+                def on_file(entry, status, document_id=None, error=None):
+                    if status == "running":
+                        start_job(entry["id"])
+                    else:
+                        finish_job(entry["id"], status, error=error, document_id=document_id)
+                        if status == "done":
+                            to_summarize.append(document_id)
+
+                counts = process_batch(
+                    batch_files(job_id),
+                    user_email,
+                    user_id,
+                    progress=progress,
+                    on_file=on_file,
+                )
+                document_id = None
+                if counts["failed"]:
+                    error = f"{counts['failed']} of {counts['done'] + counts['failed']} file(s) failed"
+                info.update(counts)
+            elif kind in ("update", "rechunk"):
+                # New version of an existing document, or the same version
+                # re-split from its stored pages: re-index by chunk diff
+                document_id = update_document(
+                    target_id,
+                    file_path,
+                    filename,
+                    user_email,
+                    file_hash,
+                    progress=progress,
+                    user_id=user_id,
+                    from_store=kind == "rechunk",
+                )
+                if kind == "update":
+                    to_summarize.append(document_id)
+            else:
+                document_id = process_uploaded_file(
+                    file_path,
+                    filename,
+                    user_email,
+                    file_hash,
+                    progress=progress,
+                    user_id=user_id,
+                )
+                to_summarize.append(document_id)
+            info["document_id"] = document_id
+        finish_job(job_id, "done", error=error, document_id=document_id, peak_rss_mb=mem.peak_mb)
+        print(f"✅ Job {job_id} done ({filename}, peak RSS {mem.peak_mb} MB)")
+        if SUMMARY_ENABLED and to_summarize:
+            try:
+                enqueue_summary_jobs(to_summarize)
+            except Exception as e:
+                # The document is searchable; summaries can be backfilled later
+                print(f"⚠️ Could not queue summaries for job {job_id}: {e}")
+    except Exception as e:
+        traceback.print_exc()
+        finish_job(job_id, "failed", error=str(e), document_id=progress.document_id, peak_rss_mb=mem.peak_mb)
+        if kind == "batch":
+            fail_batch_files(job_id, f"Batch failed: {e}")
+        print(f"❌ Job {job_id} failed: {e}")
+    finally:
+        stop.set()
+
+
+def worker_loop(worker_id: str) -> None:
+    """Claim and run jobs until told to stop."""
+    # Don't share pooled connections inherited from the supervisor
+    engine.dispose(close=False)
+    stopping = False
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    print(f"👷 Worker {worker_id} started")
+    while not stopping:
+        try:
+            job_id = claim_next_job(worker_id)
+        except Exception as e:
+            print(f"⚠️ Worker {worker_id} could not poll queue: {e}")
+            job_id = None
+
+        if job_id is None:
+            time.sleep(POLL_INTERVAL)
+            continue
+        run_job(job_id)
+    print(f"👋 Worker {worker_id} stopped")
+
+
+def run_pool(num_workers: int) -> None:
+    """
+    Supervisor: start `num_workers` processes, restart any that die and
+    periodically recover jobs whose worker was lost.
+    """
+    host = socket.gethostname()
+    # Workers are non-daemonic so they may start their own process pools
+    workers: dict[int, mp.Process] = {}
+
+    def spawn(slot: int) -> None:
+        p = mp.Process(target=worker_loop, args=(f"{host}-{os.getpid()}-{slot}",), daemon=False)
+        p.start()
+        workers[slot] = p
+
+    for slot in range(num_workers):
+        spawn(slot)
+
+    stopping = False
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    print(f"🚀 Ingestion pool running with {num_workers} worker(s)")
+    while not stopping:
+        try:
+            recovered = requeue_stale_jobs()
+            if recovered:
+                print(f"♻️ Re-queued {recovered} stale job(s)")
+        except Exception as e:
+            print(f"⚠️ Stale job check failed: {e}")
+
+        for slot, p in list(workers.items()):
+            if not p.is_alive() and not stopping:
+                mark_process_dead(p.pid)
+                print(f"⚠️ Worker {slot} exited ({p.exitcode}) — restarting")
+                spawn(slot)
+        time.sleep(POLL_INTERVAL * 5)
+
+    for p in workers.values():
+        p.terminate()
+    for p in workers.values():
+        p.join()
+        mark_process_dead(p.pid)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the document ingestion worker pool")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="number of worker processes")
+    args = parser.parse_args()
+    run_pool(args.workers)
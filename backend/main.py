@@ -3,35 +3,164 @@
 # from pathlib import Path
 
 # sys.path.append(str(Path(__file__).parent.parent))
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import text
 from fastapi.middleware.cors import CORSMiddleware
-from backend.db.database import engine, Base
+from backend.db.database import engine, async_engine, Base, pool_status, add_missing_columns, add_missing_indexes
+from backend.utils.lazy import Lazy, lazy_status
+from backend.utils.metrics import QUEUE_DEPTH, render_metrics
+from backend.utils.body_limit import BodyLimitMiddleware
+from backend.jobs.queue import queue_depth
 from backend.api.auth import router as auth_router  # your auth router
-from backend.api.file import router as file_router  # your upload router
+from backend.api.file import router as file_router, upload_body_limit  # your upload router
 from backend.api.chat import router as chat_router  # your chat router
 from backend.models import models  # Ensure models are imported
 from backend.api.documents import router as documents_router
+from backend.api.jobs import router as jobs_router
+from backend.models import job  # Ensure job table is registered
+from backend.models import chunk  # Ensure chunk bookkeeping tables are registered
+from backend.models.document import Document
+
+# Load the embedding model + Chroma + DB in the background at startup, so
+# the first request doesn't pay for them (/ready reports when done)
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() in {"1", "true", "yes"}
+
+# Cold-start timings (seconds), reported by /ready
+startup_timings = {"import_s": None, "startup_s": None, "warmup_s": None, "ready_after_s": None}
+
+
+def _create_tables():
+    # Create tables (once per process, on startup rather than at import)
+    Base.metadata.create_all(bind=engine)
+    # Columns added after the users / documents tables first shipped
+    add_missing_columns(models.User.__table__, ["corpus_version"])
+    add_missing_columns(Document.__table__, ["summary", "section_summaries"])
+    # file_hash is unique per user, no longer across all users
+    add_missing_indexes(Document.__table__, ["uq_documents_user_file_hash", "ix_documents_file_hash"])
+    # Keyset pagination of the document listing
+    add_missing_indexes(Document.__table__, ["ix_documents_user_upload_date"])
+    return True
+
+
+db_schema = Lazy("db", _create_tables)
+
+
+def warmup() -> None:
+    """Build every heavy resource now instead of on the first request."""
+    from backend.rag.embeddings import get_embeddings
+    from backend.rag.vector_store import get_client
+
+    start = time.perf_counter()
+    db_schema.get()
+    get_client().heartbeat()
+    get_embeddings().embed_query("warm-up")
+    startup_timings["warmup_s"] = round(time.perf_counter() - start, 3)
+    print(f"🔥 Warm-up finished in {startup_timings['warmup_s']}s")
+
+
+def _mark_ready() -> None:
+    if startup_timings["ready_after_s"] is None:
+        startup_timings["ready_after_s"] = round(time.perf_counter() - _IMPORT_STARTED, 3)
+        print(f"⏱️ Cold start: ready {startup_timings['ready_after_s']}s after import")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start = time.perf_counter()
+    await run_in_threadpool(db_schema.get)
+    startup_timings["startup_s"] = round(time.perf_counter() - start, 3)
+    print(f"🚀 API started in {startup_timings['startup_s']}s (import {startup_timings['import_s']}s)")
+
+    warm_task = None
+    if WARMUP_ON_STARTUP:
+        async def _warm():
+            try:
+                await run_in_threadpool(warmup)
+                _mark_ready()
+            except Exception as e:
+                print(f"⚠️ Warm-up failed: {e}")
+        warm_task = asyncio.create_task(_warm())
+    yield
+    if warm_task is not None:
+        warm_task.cancel()
+
 
 app = FastAPI(title="AI Knowledge Search Engine", description="Personal RAG-powered document search and chat",
-    version="1.0.0",)
+    version="1.0.0", lifespan=lifespan)
 
 # CORS
+# Oversize uploads are cut off while streaming in, not after FastAPI has
+# spooled the whole body (added before CORS so rejections carry CORS headers)
+app.add_middleware(BodyLimitMiddleware, limit_for=upload_body_limit)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Pagination / caching / byte-range headers readable by the frontend
+    expose_headers=["ETag", "X-Next-Cursor", "Accept-Ranges", "Content-Range", "Content-Length"],
 )
 
-# Create tables
-Base.metadata.create_all(bind=engine)
-
 # Include routers
 app.include_router(auth_router)  # /api/signup, /api/login, /api/me, /api/refresh
 app.include_router(file_router)  # /api/upload
 app.include_router(chat_router)
 app.include_router(documents_router)
+app.include_router(jobs_router)  # /api/jobs, /api/jobs/{id}
+
+
+@app.get("/health/db")
+def db_pool_health():
+    """Connection pool occupancy and checkout wait times."""
+    return pool_status()
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint: stage/tool/LLM latencies, cache hits, queue depth."""
+    try:
+        for status, count in queue_depth().items():
+            QUEUE_DEPTH.labels(status).set(count)
+    except Exception as e:
+        print(f"⚠️ Queue depth unavailable: {e}")
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness probe: 200 once the embedding model, Chroma and the DB are
+    warm, 503 before that. Includes per-resource init times and cold-start
+    timings.
+    """
+    resources = lazy_status()
+    db_ok = True
+    try:
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    except Exception as e:
+        db_ok = False
+        resources["db"] = {**resources.get("db", {}), "error": str(e)}
+
+    required = ("embeddings", "chroma", "db")
+    is_ready = db_ok and all(resources.get(name, {}).get("ready") for name in required)
+    if is_ready:
+        _mark_ready()
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"ready": is_ready, "resources": resources, "cold_start": startup_timings},
+    )
 
 
 @app.get("/")
@@ -41,3 +170,6 @@ def root():
         "docs": "/docs",
         "redoc": "/redoc"
         }
+
+
+startup_timings["import_s"] = round(time.perf_counter() - _IMPORT_STARTED, 3)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from backend.db.database import Base
+from datetime import datetime
+
+
+class DocumentChunk(Base):
+    """One stored chunk: its Chroma/BM25 id and content hash, per document."""
+    __tablename__ = "document_chunks"
+
+    # Same id the vector + keyword indexes use ("<document_id>-<n>")
+    id = Column(String(64), primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)
+    page = Column(Integer, default=0)
+    # SHA-256 of the chunk text
+    content_hash = Column(String(64), nullable=False)
+
+
+class CollectionStats(Base):
+    """Per-collection bookkeeping for vector compaction."""
+    __tablename__ = "collection_stats"
+
+    name = Column(String(255), primary_key=True)
+    # Vectors deleted since the last compaction (tombstones in the HNSW index)
+    deleted = Column(Integer, nullable=False, default=0, server_default="0")
+    compactions = Column(Integer, nullable=False, default=0, server_default="0")
+    last_compacted_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,19 +1,32 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index, Text, JSON, UniqueConstraint
+from sqlalchemy.orm import relationship, deferred
 from backend.db.database import Base
 from datetime import datetime
 
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        # Keyset pagination of a user's documents, newest first
+        Index("ix_documents_user_upload_date", "user_id", "upload_date", "id"),
+        # The same file may be uploaded by different users, once per user
+        UniqueConstraint("user_id", "file_hash", name="uq_documents_user_file_hash"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255), nullable=False, index=True)
-    file_hash = Column(String(64), nullable=False, unique=True, index=True)
+    file_hash = Column(String(64), nullable=False, index=True)
     file_path = Column(String(500), nullable=False)
     upload_date = Column(DateTime, default=datetime.utcnow)
     page_count = Column(Integer, default=0)
     chunk_count = Column(Integer, default=0)
+
+    # Built by a "summarize" job after ingest (see rag.summaries); NULL until
+    # then and again after a new version is uploaded. Deferred so listing /
+    # loading documents doesn't pull the text.
+    summary = deferred(Column(Text, nullable=True))
+    # [{"section", "start_page", "end_page", "summary"}, ...] in page order
+    section_summaries = deferred(Column(JSON, nullable=True))
     
     # Foreign key to user
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -0,0 +1,67 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Text, JSON, Index
+from sqlalchemy.orm import relationship
+from backend.db.database import Base
+from datetime import datetime
+
+
+class IngestJob(Base):
+    __tablename__ = "ingest_jobs"
+    __table_args__ = (
+        # Workers poll for the oldest queued job
+        Index("ix_ingest_jobs_status_id", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    filename = Column(String(255), nullable=False)
+    file_path = Column(String(500), nullable=False)
+    file_hash = Column(String(64), nullable=False)
+
+    # ingest: new document; update: new version of `document_id`;
+    # rechunk: re-split `document_id` from its stored page text;
+    # summarize: build `document_id`'s summaries (queued after ingest);
+    # batch: parent of the per-file jobs uploaded together (see batch_id)
+    kind = Column(String(20), nullable=False, default="ingest", server_default="ingest")
+    # Per-file jobs of a batch point at their parent and are run by it,
+    # not claimed by workers on their own
+    batch_id = Column(Integer, ForeignKey("ingest_jobs.id", ondelete="CASCADE"), nullable=True, index=True)
+
+    # queued → running → done | failed (a batch's files start as pending)
+    status = Column(String(20), nullable=False, default="queued")
+    stage = Column(String(32), nullable=True)
+    # stage name → progress (0.0 - 1.0)
+    stages = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+    # Peak resident memory of the worker while running this job
+    peak_rss_mb = Column(Float, nullable=True)
+    worker_id = Column(String(64), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+
+    # Set once ingestion has created the Document row
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="SET NULL"), nullable=True)
+
+    # Foreign key to user
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    user = relationship("User")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "filename": self.filename,
+            "kind": self.kind,
+            "batch_id": self.batch_id,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": self.stages or {},
+            "error": self.error,
+            "attempts": self.attempts,
+            "peak_rss_mb": self.peak_rss_mb,
+            "document_id": self.document_id,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, text
 from backend.db.database import Base
 from sqlalchemy.orm import relationship
 
@@ -8,6 +8,8 @@ class User(Base):
     email = Column(String(255), unique=True, index=True, nullable=False)
     name = Column(String(255), nullable=False)
     hashed_password = Column(String(255), nullable=False) 
+    # Bumped whenever the user's documents change (see rag/corpus.py)
+    corpus_version = Column(Integer, nullable=False, default=0, server_default=text("0"))
     
     # relationship to documents
     documents = relationship("Document", back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
@@ -0,0 +1,155 @@
+# backend/rag/answer_cache.py
+"""
+Semantic answer cache for /api/chat.
+
+A question is answered from cache when an earlier question from the same
+user, scoped to the same document filter, has an embedding within
+ANSWER_CACHE_THRESHOLD cosine similarity *and* was answered against the
+same corpus version.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.utils.metrics import cache_result
+
+
+# =========================
+# CONFIG
+# =========================
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}
+# Minimum cosine similarity between query embeddings for a hit
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+# Per-user and overall size limits (least recently used evicted first)
+ANSWER_CACHE_MAX_PER_USER = int(os.getenv("ANSWER_CACHE_MAX_PER_USER", "200"))
+ANSWER_CACHE_MAX_USERS = int(os.getenv("ANSWER_CACHE_MAX_USERS", "1000"))
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    vector: np.ndarray
+    corpus_version: int
+    answer: str
+    citations: List[Dict[str, Any]] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl: float = ANSWER_CACHE_TTL,
+        max_per_user: int = ANSWER_CACHE_MAX_PER_USER,
+        max_users: int = ANSWER_CACHE_MAX_USERS,
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_per_user = max_per_user
+        self.max_users = max_users
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # (user, scope) → OrderedDict[entry id → CachedAnswer], both in LRU order
+        self._users: "OrderedDict[Tuple[str, Any], OrderedDict[int, CachedAnswer]]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def lookup(self, user: str, scope: Any, vector, corpus_version: int) -> Optional[CachedAnswer]:
+        """
+        Best cached answer for this query, or None.
+
+        Args:
+            user: Cache partition (the user's email).
+            scope: Extra key the answer depends on (e.g. document_id filter).
+            vector: Query embedding.
+            corpus_version: The user's current corpus version.
+        """
+        query = self._unit(vector)
+        now = time.time()
+        with self._lock:
+            entries = self._users.get((user, scope))
+            best_id, best_score = None, -1.0
+            if entries:
+                # Drop expired / outdated answers as we go
+                for entry_id in list(entries):
+                    entry = entries[entry_id]
+                    if entry.corpus_version != corpus_version or now - entry.created_at > self.ttl:
+                        del entries[entry_id]
+                        self.evictions += 1
+                if entries:
+                    ids = list(entries)
+                    matrix = np.stack([entries[i].vector for i in ids])
+                    scores = matrix @ query
+                    idx = int(np.argmax(scores))
+                    best_id, best_score = ids[idx], float(scores[idx])
+
+            if best_id is not None and best_score >= self.threshold:
+                entries.move_to_end(best_id)
+                self._users.move_to_end((user, scope))
+                self.hits += 1
+                cache_result("answer", hits=1)
+                return entries[best_id]
+
+            self.misses += 1
+            cache_result("answer", misses=1)
+            return None
+
+    def store(
+        self,
+        user: str,
+        scope: Any,
+        question: str,
+        vector,
+        corpus_version: int,
+        answer: str,
+        citations: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        entry = CachedAnswer(
+            question=question,
+            vector=self._unit(vector),
+            corpus_version=corpus_version,
+            answer=answer,
+            citations=citations or [],
+        )
+        with self._lock:
+            key = (user, scope)
+            entries = self._users.setdefault(key, OrderedDict())
+            self._users.move_to_end(key)
+            self._next_id += 1
+            entries[self._next_id] = entry
+
+            while len(entries) > self.max_per_user:
+                entries.popitem(last=False)
+                self.evictions += 1
+            while len(self._users) > self.max_users:
+                _, dropped = self._users.popitem(last=False)
+                self.evictions += len(dropped)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        with self._lock:
+            size = sum(len(e) for e in self._users.values())
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "size": size,
+        }
+
+
+# Shared instance for this process
+answer_cache = AnswerCache()
@@ -0,0 +1,313 @@
+# backend/rag/bm25.py
+"""
+Per-user BM25 inverted index, kept next to the Chroma collections.
+
+Dense retrieval misses exact tokens (invoice numbers, emails, acronyms);
+this index finds them over the whole corpus. Postings live in one SQLite
+file per user so the API and the ingestion workers can share them.
+
+Backfill documents ingested before the index existed with:
+    python -m backend.rag.bm25 --rebuild user@example.com
+"""
+import argparse
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+# =========================
+# CONFIG
+# =========================
+BM25_DIR = Path(os.getenv("BM25_DIR", "bm25_index"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# Postings scored per query term: a term in more chunks than this (e.g.
+# "invoice" across a whole invoice corpus) is scored only on its
+# highest-tf postings, so common words don't make every query a full scan
+BM25_MAX_POSTINGS = int(os.getenv("BM25_MAX_POSTINGS", "5000"))
+
+_SQL_BATCH = 500
+
+# Words too common to be worth a posting list
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have he her his i in is it its of on or "
+    "our she that the their them they this to was we were will with you your".split()
+)
+
+# Keeps compound tokens like "inv-2024-001", "jane.doe@acme.com", "v1.2"
+_TOKEN = re.compile(r"[a-z0-9]+(?:[@._\-/][a-z0-9]+)*")
+_PART = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word tokens. Compound tokens are indexed whole *and* by their
+    parts, so both "inv-2024-001" and "2024" match.
+    """
+    tokens = []
+    for match in _TOKEN.findall((text or "").lower()):
+        parts = _PART.findall(match)
+        if len(parts) > 1:
+            tokens.append(match)
+        tokens.extend(p for p in parts if p not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """Inverted index over one user's chunks, scored with Okapi BM25."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS chunks (
+                    chunk_id TEXT PRIMARY KEY,
+                    document_id INTEGER,
+                    length INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS ix_chunks_document ON chunks (document_id);
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, chunk_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS ix_postings_chunk ON postings (chunk_id);
+                CREATE INDEX IF NOT EXISTS ix_postings_impact ON postings (term, tf DESC);
+                -- Document frequency per term, kept in step with postings
+                CREATE TABLE IF NOT EXISTS terms (
+                    term TEXT PRIMARY KEY,
+                    df INTEGER NOT NULL
+                ) WITHOUT ROWID;
+                -- Corpus size and total length, so a query never scans chunks
+                CREATE TABLE IF NOT EXISTS stats (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    n INTEGER NOT NULL,
+                    total_length INTEGER NOT NULL
+                );
+                """
+            )
+            if conn.execute("SELECT 1 FROM stats").fetchone() is None:
+                # Index written before the stats existed: count once
+                conn.execute("DELETE FROM terms")
+                conn.execute("INSERT INTO terms (term, df) SELECT term, COUNT(*) FROM postings GROUP BY term")
+                conn.execute(
+                    "INSERT INTO stats (id, n, total_length) SELECT 1, COUNT(*), COALESCE(SUM(length), 0) FROM chunks"
+                )
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    # -------------------------
+    # WRITES
+    # -------------------------
+    def add(self, ids: List[str], texts: List[str], document_ids: List[Optional[int]]) -> None:
+        """Index chunks. Re-adding an existing id replaces its postings."""
+        if not ids:
+            return
+        with self._lock:
+            conn = self._connect()
+            self._delete_ids(conn, ids)
+            chunk_rows, posting_rows = [], []
+            df: Counter = Counter()
+            for chunk_id, text, document_id in zip(ids, texts, document_ids):
+                terms = Counter(tokenize(text))
+                chunk_rows.append((chunk_id, document_id, sum(terms.values())))
+                posting_rows.extend((term, chunk_id, tf) for term, tf in terms.items())
+                df.update(terms.keys())
+            conn.executemany("INSERT INTO chunks (chunk_id, document_id, length) VALUES (?, ?, ?)", chunk_rows)
+            conn.executemany("INSERT INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)", posting_rows)
+            conn.executemany(
+                "INSERT INTO terms (term, df) VALUES (?, ?) ON CONFLICT (term) DO UPDATE SET df = df + excluded.df",
+                df.items(),
+            )
+            conn.execute(
+                "UPDATE stats SET n = n + ?, total_length = total_length + ?",
+                (len(chunk_rows), sum(row[2] for row in chunk_rows)),
+            )
+            conn.commit()
+
+    def delete_ids(self, ids: List[str]) -> None:
+        with self._lock:
+            conn = self._connect()
+            self._delete_ids(conn, ids)
+            conn.commit()
+
+    def delete_document(self, document_id: int) -> None:
+        """Drop every chunk of a document from the index."""
+        with self._lock:
+            conn = self._connect()
+            ids = [row[0] for row in conn.execute("SELECT chunk_id FROM chunks WHERE document_id = ?", (document_id,))]
+            self._delete_ids(conn, ids)
+            conn.commit()
+
+    @staticmethod
+    def _delete_ids(conn: sqlite3.Connection, ids: List[str]) -> None:
+        """Delete chunks and their postings, keeping terms and stats in step."""
+        for i in range(0, len(ids), _SQL_BATCH):
+            batch = ids[i:i + _SQL_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            removed, removed_length = conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks WHERE chunk_id IN ({placeholders})", batch
+            ).fetchone()
+            if not removed:
+                continue
+            df = conn.execute(
+                f"SELECT term, COUNT(*) FROM postings WHERE chunk_id IN ({placeholders}) GROUP BY term", batch
+            ).fetchall()
+            conn.executemany("UPDATE terms SET df = df - ? WHERE term = ?", [(count, term) for term, count in df])
+            conn.executemany("DELETE FROM terms WHERE term = ? AND df <= 0", [(term,) for term, _ in df])
+            conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({placeholders})", batch)
+            conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({placeholders})", batch)
+            conn.execute(
+                "UPDATE stats SET n = n - ?, total_length = total_length - ?", (removed, removed_length)
+            )
+
+    # -------------------------
+    # QUERY
+    # -------------------------
+    def search(self, query: str, k: int = 50, document_id: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Top-k chunk ids by BM25 score.
+
+        Args:
+            query: Free-text query.
+            k: Number of results.
+            document_id: Optional filter to a single document.
+
+        Returns:
+            List of (chunk_id, score), best first.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            conn = self._connect()
+            n, total_len = conn.execute("SELECT n, total_length FROM stats").fetchone()
+            if not n:
+                return []
+            avgdl = (total_len / n) or 1.0
+
+            placeholders = ",".join("?" * len(terms))
+            df: Dict[str, int] = dict(
+                conn.execute(f"SELECT term, df FROM terms WHERE term IN ({placeholders})", terms).fetchall()
+            )
+            weights = [
+                (term, math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5)))
+                for term in terms if term in df
+            ]
+            if not weights:
+                return []
+
+            # Score entirely inside SQLite — one pass over the matching postings
+            values = ",".join("(?, ?)" for _ in weights)
+            params: list = [x for pair in weights for x in pair]
+            if document_id is not None:
+                # One document: walk its chunks and look each term up by key
+                matches = """
+                    SELECT p.term, p.chunk_id, p.tf FROM chunks c
+                    JOIN postings p ON p.chunk_id = c.chunk_id
+                    WHERE c.document_id = ? AND p.term IN (SELECT term FROM q)
+                """
+                params.append(document_id)
+            else:
+                # Whole corpus: high-df terms contribute only their top-tf postings
+                parts = []
+                for term, _ in weights:
+                    if df[term] > BM25_MAX_POSTINGS:
+                        parts.append(
+                            "SELECT * FROM (SELECT term, chunk_id, tf FROM postings "
+                            "WHERE term = ? ORDER BY tf DESC LIMIT ?)"
+                        )
+                        params += [term, BM25_MAX_POSTINGS]
+                    else:
+                        parts.append("SELECT term, chunk_id, tf FROM postings WHERE term = ?")
+                        params.append(term)
+                matches = " UNION ALL ".join(parts)
+            sql = f"""
+                WITH q(term, idf) AS (VALUES {values}),
+                     m(term, chunk_id, tf) AS ({matches})
+                SELECT m.chunk_id,
+                       SUM(q.idf * m.tf * (? + 1.0) / (m.tf + ? * (1 - ? + ? * c.length / ?))) AS score
+                FROM m
+                JOIN q ON q.term = m.term
+                JOIN chunks c ON c.chunk_id = m.chunk_id
+                GROUP BY m.chunk_id ORDER BY score DESC LIMIT ?
+            """
+            params += [BM25_K1, BM25_K1, BM25_B, BM25_B, avgdl, k]
+            return [(chunk_id, score) for chunk_id, score in conn.execute(sql, params).fetchall()]
+
+    def rebuild(self, collection, page_size: int = 1000) -> int:
+        """Re-index every chunk stored in a Chroma collection."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM postings")
+            conn.execute("DELETE FROM chunks")
+            conn.execute("DELETE FROM terms")
+            conn.execute("UPDATE stats SET n = 0, total_length = 0")
+            conn.commit()
+
+        offset, total = 0, 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            self.add(
+                page["ids"],
+                page["documents"],
+                [(m or {}).get("document_id") for m in page["metadatas"]],
+            )
+            total += len(page["ids"])
+            offset += page_size
+        return total
+
+
+# Open index handles, one per user
+_indexes: Dict[str, BM25Index] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_bm25_index(user_email: str) -> BM25Index:
+    """
+    Each user gets their own index file, named like their Chroma collection.
+    Example:
+      k@gmail.com → bm25_index/docs_k_gmail_com.sqlite3
+    """
+    name = f"docs_{user_email.replace('@', '_').replace('.', '_')}"
+    with _indexes_lock:
+        index = _indexes.get(name)
+        if index is None:
+            index = _indexes[name] = BM25Index(BM25_DIR / f"{name}.sqlite3")
+        return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild a user's BM25 index from their Chroma collection")
+    parser.add_argument("--rebuild", metavar="EMAIL", required=True, help="user email to re-index")
+    args = parser.parse_args()
+
+    from backend.db.database import SessionLocal
+    from backend.models.models import User
+    from backend.rag.vector_store import get_or_create_collection
+
+    with SessionLocal() as db:
+        user_id = db.query(User.id).filter(User.email == args.rebuild).scalar()
+    count = get_bm25_index(args.rebuild).rebuild(get_or_create_collection(args.rebuild, user_id=user_id))
+    print(f"✅ Indexed {count} chunks for {args.rebuild}")
@@ -0,0 +1,141 @@
+# backend/rag/chunk_store.py
+"""
+Chunk-id bookkeeping: which vector/keyword ids belong to which document.
+
+Ids are recorded as chunks are stored, so deleting a document is a bulk
+delete by id list rather than a metadata scan, and every deleted vector is
+counted against its collection for `backend.rag.maintenance`.
+"""
+import os
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.models.chunk import CollectionStats, DocumentChunk
+from backend.models.document import Document
+from backend.rag.embedding_cache import text_hash
+
+# Ids per Chroma delete call
+DELETE_BATCH_SIZE = int(os.getenv("DELETE_BATCH_SIZE", "500"))
+
+
+def chunk_rows(document_id: int, ids: List[str], texts: List[str], indexes: List[int], pages: List[int]) -> List[dict]:
+    """DocumentChunk rows for one stored batch."""
+    return [
+        {
+            "id": cid,
+            "document_id": document_id,
+            "chunk_index": index,
+            "page": page,
+            "content_hash": text_hash(text),
+        }
+        for cid, text, index, page in zip(ids, texts, indexes, pages)
+    ]
+
+
+def record_chunks(db: Session, rows: List[dict]) -> None:
+    """Insert chunk rows, replacing any left by a failed earlier attempt (caller commits)."""
+    if not rows:
+        return
+    db.execute(delete(DocumentChunk).where(DocumentChunk.id.in_([r["id"] for r in rows])))
+    db.execute(insert(DocumentChunk), rows)
+
+
+def replace_chunks(db: Session, document_id: int, rows: List[dict]) -> None:
+    """Swap a document's whole chunk list for `rows` (caller commits)."""
+    db.execute(delete(DocumentChunk).where(DocumentChunk.document_id == document_id))
+    if rows:
+        db.execute(insert(DocumentChunk), rows)
+
+
+def stored_chunks(db: Session, document_id: int) -> List[tuple]:
+    """(id, content_hash, chunk_index, page) of every stored chunk, in order."""
+    return db.execute(
+        select(DocumentChunk.id, DocumentChunk.content_hash, DocumentChunk.chunk_index, DocumentChunk.page)
+        .where(DocumentChunk.document_id == document_id)
+        .order_by(DocumentChunk.chunk_index)
+    ).all()
+
+
+def user_chunk_count(db: Session, user_id: int) -> int:
+    """
+    Recorded chunks across a user's documents: an index-only count, where
+    asking Chroma would fetch every one of the user's ids. Chunks stored
+    before ids were recorded are not included.
+    """
+    return db.scalar(
+        select(func.count())
+        .select_from(DocumentChunk)
+        .join(Document, Document.id == DocumentChunk.document_id)
+        .where(Document.user_id == user_id)
+    )
+
+
+async def get_chunk_ids(db: AsyncSession, document_id: int) -> List[str]:
+    return list(await db.scalars(select(DocumentChunk.id).where(DocumentChunk.document_id == document_id)))
+
+
+def delete_vectors(collection, ids: List[str]) -> int:
+    """Bulk-delete vectors by id, in batches. Returns how many were deleted."""
+    for start in range(0, len(ids), DELETE_BATCH_SIZE):
+        collection.delete(ids=ids[start:start + DELETE_BATCH_SIZE])
+    return len(ids)
+
+
+def legacy_chunks(collection, document_id: int, filename: str, user_email: str, with_text: bool = False) -> List[tuple]:
+    """
+    (id, text, metadata) of a document ingested before chunk ids were
+    recorded (text is None unless `with_text`). The oldest chunks carry no
+    document_id at all, only filename and user_email; of those, rows that
+    belong to a newer document (have a document_id) are left out.
+    """
+    include = ["metadatas", "documents"] if with_text else ["metadatas"]
+    page = collection.get(where={"document_id": document_id}, include=include)
+    tagged = bool(page["ids"])
+    if not tagged:
+        page = collection.get(
+            where={"$and": [{"filename": filename}, {"user_email": user_email}]},
+            include=include,
+        )
+    texts = page.get("documents") or [None] * len(page["ids"])
+    return [
+        (chunk_id, text, meta or {})
+        for chunk_id, text, meta in zip(page["ids"], texts, page["metadatas"])
+        if tagged or (meta or {}).get("document_id") is None
+    ]
+
+
+def legacy_chunk_ids(collection, document_id: int, filename: str, user_email: str) -> List[str]:
+    """Ids of a document ingested before chunk ids were recorded."""
+    return [chunk_id for chunk_id, _, _ in legacy_chunks(collection, document_id, filename, user_email)]
+
+
+def _tombstones(name: str, count: int):
+    return (
+        update(CollectionStats)
+        .where(CollectionStats.name == name)
+        .values(deleted=CollectionStats.deleted + count, updated_at=datetime.utcnow())
+    )
+
+
+async def add_tombstones(db: AsyncSession, name: str, count: int) -> None:
+    """Count deleted vectors against a collection (caller commits)."""
+    if count <= 0:
+        return
+    result = await db.execute(_tombstones(name, count))
+    if not result.rowcount:
+        db.add(CollectionStats(name=name, deleted=count))
+        await db.flush()
+
+
+def add_tombstones_sync(db: Session, name: str, count: int) -> None:
+    """Sync twin of `add_tombstones` for the worker (caller commits)."""
+    if count <= 0:
+        return
+    result = db.execute(_tombstones(name, count))
+    if not result.rowcount:
+        db.add(CollectionStats(name=name, deleted=count))
+        db.flush()
@@ -0,0 +1,31 @@
+# backend/rag/corpus.py
+"""
+Per-user corpus version: a counter bumped whenever a user's searchable
+content changes (ingest, delete). Caches key on it so they never serve
+answers computed against an older set of documents.
+"""
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.models.models import User
+
+
+def corpus_version_bump(user_id: int):
+    """UPDATE statement incrementing a user's corpus version."""
+    return (
+        update(User)
+        .where(User.id == user_id)
+        .values(corpus_version=User.corpus_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def bump_corpus_version(db: Session, user_id: int) -> None:
+    """Increment the user's corpus version (caller commits)."""
+    db.execute(corpus_version_bump(user_id))
+
+
+async def get_corpus_version(db: AsyncSession, user_email: str) -> int:
+    version = await db.scalar(select(User.corpus_version).where(User.email == user_email))
+    return version or 0
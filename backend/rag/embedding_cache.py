@@ -0,0 +1,207 @@
+# backend/rag/embedding_cache.py
+import os
+import sqlite3
+import threading
+import time
+import hashlib
+from array import array
+from pathlib import Path
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from backend.utils.metrics import EMBED_BATCH_SIZE, cache_result
+
+
+# =========================
+# CONFIG
+# =========================
+# On-disk cache of chunk embeddings, shared by every ingestion run
+EMBEDDING_CACHE_DIR = Path(os.getenv("EMBEDDING_CACHE_DIR", "embedding_cache"))
+# Max number of cached vectors before the least recently used ones are evicted
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+# Seconds between exact row counts (other processes' inserts are only seen then)
+EMBEDDING_CACHE_RECOUNT_SECONDS = float(os.getenv("EMBEDDING_CACHE_RECOUNT_SECONDS", "60"))
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+
+def text_hash(text: str) -> str:
+    """SHA-256 of a chunk's text, used as the content address."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding store keyed by (model name, chunk-text hash).
+
+    Vectors are stored as float32 blobs in a single SQLite file so every
+    process (API, ingestion workers) shares the same cache. When the cache
+    grows past `max_entries` the least recently used rows are evicted.
+    """
+
+    def __init__(self, path: Path, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        # Rows at the last COUNT(*) plus this process's inserts since (an
+        # upper bound for our own writes: replaced rows are counted too)
+        self._count: Optional[int] = None
+        self._counted_at = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Never reuse a connection inherited across fork()
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings (last_used)")
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+            self._count = None
+        return self._conn
+
+    def get_many(self, model: str, hashes: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up vectors for a list of text hashes.
+
+        Args:
+            model: Embedding model name the vectors were produced with.
+            hashes: Text hashes (see `text_hash`).
+
+        Returns:
+            One entry per hash — the cached vector, or None on a miss.
+        """
+        found = {}
+        with self._lock:
+            conn = self._connect()
+            for i in range(0, len(hashes), _SQL_BATCH):
+                batch = hashes[i:i + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = array("f", blob).tolist()
+
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, h) for h in found],
+                )
+                conn.commit()
+
+            results = [found.get(h) for h in hashes]
+            hit_count = sum(1 for r in results if r is not None)
+            self.hits += hit_count
+            self.misses += len(results) - hit_count
+        cache_result("embedding", hit_count, len(results) - hit_count)
+        return results
+
+    def put_many(self, model: str, hashes: List[str], vectors: List[List[float]]) -> None:
+        """Store vectors and evict the oldest rows if the cache is over its limit."""
+        if not hashes:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(model, h, array("f", v).tobytes(), now) for h, v in zip(hashes, vectors)],
+            )
+            conn.commit()
+            if self._count is not None:
+                self._count += len(hashes)
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """
+        Evict LRU rows once over the limit. COUNT(*) scans the table, so it
+        only runs when the running count says we may be over, or every
+        EMBEDDING_CACHE_RECOUNT_SECONDS to pick up other processes' inserts.
+        """
+        now = time.monotonic()
+        if (
+            self._count is None
+            or self._count > self.max_entries
+            or now - self._counted_at >= EMBEDDING_CACHE_RECOUNT_SECONDS
+        ):
+            (self._count,) = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            self._counted_at = now
+        if self._count <= self.max_entries:
+            return
+        # Drop down to 90% so we don't evict on every single insert
+        to_remove = self._count - int(self.max_entries * 0.9)
+        conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+            (to_remove,),
+        )
+        conn.commit()
+        self._count -= to_remove
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps any LangChain `Embeddings` and checks the on-disk cache before
+    calling the model. Only chunks never embedded by `model_name` reach it.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        EMBED_BATCH_SIZE.labels("requested").observe(len(texts))
+        hashes = [text_hash(t) for t in texts]
+        vectors = self.cache.get_many(self.model_name, hashes)
+
+        # Embed each missing text once, even if it appears several times
+        missing = {}
+        for h, t, v in zip(hashes, texts, vectors):
+            if v is None and h not in missing:
+                missing[h] = t
+
+        if missing:
+            EMBED_BATCH_SIZE.labels("model").observe(len(missing))
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), new_vectors))
+            self.cache.put_many(self.model_name, list(computed.keys()), list(computed.values()))
+            vectors = [v if v is not None else computed[h] for h, v in zip(hashes, vectors)]
+
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+
+# Shared cache instance for this process
+embedding_cache = EmbeddingCache(EMBEDDING_CACHE_DIR / "embeddings.sqlite3")
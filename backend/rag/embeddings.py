@@ -0,0 +1,177 @@
+# backend/rag/embeddings.py
+"""
+Pluggable local embedding backends for the same sentence-transformers model.
+
+EMBEDDING_BACKEND:
+  torch      — PyTorch, full precision (default)
+  onnx       — ONNX Runtime, fp32
+  onnx-int8  — ONNX Runtime with int8 dynamic quantization; the quantized
+               model is exported once into EMBEDDING_ONNX_DIR and reused
+
+The ONNX backends need `pip install "sentence-transformers[onnx]"`.
+"""
+import os
+from pathlib import Path
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from backend.utils.lazy import Lazy
+from backend.rag.embedding_cache import CachedEmbeddings, embedding_cache
+
+
+# =========================
+# CONFIG
+# =========================
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# Intra-op threads for the model (0 = library default)
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+# Texts per forward pass
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+# Where quantized ONNX exports are kept
+EMBEDDING_ONNX_DIR = Path(os.getenv("EMBEDDING_ONNX_DIR", "onnx_models"))
+# Target for int8 quantization: arm64 | avx2 | avx512 | avx512_vnni
+EMBEDDING_QUANT_CONFIG = os.getenv("EMBEDDING_QUANT_CONFIG", "avx2")
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def cache_model_key(model_name: str, backend: str) -> str:
+    """
+    Embedding-cache namespace for a model/backend pair. ONNX and int8
+    vectors differ slightly from PyTorch ones, so each backend caches its
+    own; torch keeps the bare model name so existing entries stay valid.
+    """
+    if backend == "torch":
+        return model_name
+    if backend == "onnx-int8":
+        return f"{model_name}@{backend}-{EMBEDDING_QUANT_CONFIG}"
+    return f"{model_name}@{backend}"
+
+
+def _onnx_session_options(threads: int):
+    import onnxruntime
+    options = onnxruntime.SessionOptions()
+    if threads:
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+    return options
+
+
+def _quantized_model_path(model_name: str) -> str:
+    """Export (once) and return the local path of the int8 ONNX model."""
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    target = EMBEDDING_ONNX_DIR / model_name.replace("/", "__")
+    file_name = f"model_qint8_{EMBEDDING_QUANT_CONFIG}.onnx"
+    if not (target / "onnx" / file_name).exists():
+        print(f"⚙️ Exporting int8 ONNX model for {model_name} ({EMBEDDING_QUANT_CONFIG})...")
+        model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+        model.save_pretrained(str(target))
+        export_dynamic_quantized_onnx_model(model, EMBEDDING_QUANT_CONFIG, str(target))
+    return str(target)
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """
+    LangChain `Embeddings` over a SentenceTransformer with a selectable
+    backend. Produces the same (unnormalized) vectors as HuggingFaceEmbeddings.
+    """
+
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL,
+        backend: str = EMBEDDING_BACKEND,
+        threads: int = EMBEDDING_THREADS,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"EMBEDDING_BACKEND must be one of {BACKENDS}, got {backend!r}")
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.backend = backend
+        self.batch_size = batch_size
+
+        if backend == "torch":
+            if threads:
+                import torch
+                torch.set_num_threads(threads)
+            self.model = SentenceTransformer(model_name, device="cpu")
+        elif backend == "onnx":
+            self.model = SentenceTransformer(
+                model_name,
+                device="cpu",
+                backend="onnx",
+                model_kwargs={"session_options": _onnx_session_options(threads)},
+            )
+        else:
+            self.model = SentenceTransformer(
+                _quantized_model_path(model_name),
+                device="cpu",
+                backend="onnx",
+                model_kwargs={
+                    "file_name": f"onnx/model_qint8_{EMBEDDING_QUANT_CONFIG}.onnx",
+                    "session_options": _onnx_session_options(threads),
+                },
+            )
+
+    @property
+    def cache_key(self) -> str:
+        return cache_model_key(self.model_name, self.backend)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        vectors = self.model.encode(
+            [t.replace("\n", " ") for t in texts],
+            batch_size=self.batch_size,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+        )
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def build_embeddings(
+    model_name: str = EMBEDDING_MODEL,
+    backend: str = EMBEDDING_BACKEND,
+    threads: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> SentenceTransformerEmbeddings:
+    """Embedding model for `backend`, with thread/batch settings from config by default."""
+    print(f"🧮 Loading embeddings: {model_name} ({backend})")
+    return SentenceTransformerEmbeddings(
+        model_name,
+        backend,
+        EMBEDDING_THREADS if threads is None else threads,
+        EMBEDDING_BATCH_SIZE if batch_size is None else batch_size,
+    )
+
+
+# Process-wide model, loaded on first use (or during warm-up)
+_embeddings = Lazy("embeddings", build_embeddings)
+_cached_embeddings = Lazy(
+    "cached_embeddings",
+    lambda: CachedEmbeddings(get_embeddings(), get_embeddings().cache_key, embedding_cache),
+)
+
+
+def get_embeddings() -> SentenceTransformerEmbeddings:
+    """The configured embedding model (EMBEDDING_MODEL / EMBEDDING_BACKEND)."""
+    return _embeddings.get()
+
+
+def get_cached_embeddings() -> CachedEmbeddings:
+    """The embedding model behind the on-disk chunk cache, for ingest."""
+    return _cached_embeddings.get()
+
+
+def set_embeddings(model: Embeddings, cache_key: str) -> None:
+    """Use `model` instead of the configured one (e.g. a fake in benchmarks)."""
+    model.cache_key = cache_key
+    _embeddings.set(model)
+    _cached_embeddings.set(CachedEmbeddings(model, cache_key, embedding_cache))
@@ -0,0 +1,27 @@
+# backend/rag/llm.py
+"""Chat model used by /api/chat, created on first use."""
+import os
+
+from backend.utils.lazy import Lazy
+
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2:3b")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.3"))
+
+
+def _build_llm():
+    # ChatOllama → supports tool calling
+    from langchain_ollama import ChatOllama
+    return ChatOllama(model=OLLAMA_MODEL, temperature=LLM_TEMPERATURE)
+
+
+_llm = Lazy("llm", _build_llm)
+
+
+def get_llm():
+    """The local chat model (Ollama)."""
+    return _llm.get()
+
+
+def set_llm(model) -> None:
+    """Use `model` instead of Ollama (e.g. a scripted fake in benchmarks)."""
+    _llm.set(model)
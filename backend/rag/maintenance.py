@@ -0,0 +1,247 @@
+# backend/rag/maintenance.py
+"""
+Vector index maintenance: compact collections with many deleted vectors.
+
+Chroma's HNSW index only marks deleted vectors, so collections that see a
+lot of deletes keep their old size and slow down. Deletes are counted per
+collection in `collection_stats`; once tombstones pass COMPACT_TOMBSTONE_RATIO
+of a collection, this rebuilds it from its live vectors.
+
+Usage:
+    python -m backend.rag.maintenance                # compact what's over the threshold
+    python -m backend.rag.maintenance --dry-run      # report only
+    python -m backend.rag.maintenance --collection docs_k_gmail_com --force
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from backend.db.database import SessionLocal
+from backend.models.chunk import CollectionStats
+from backend.rag.vector_store import (
+    get_client,
+    CHROMA_DIR,
+    HANDLE_EPOCH_CHECK_SECONDS,
+    bump_handle_epoch,
+    collection_lock,
+)
+
+# Compact once deleted / (live + deleted) reaches this
+COMPACT_TOMBSTONE_RATIO = float(os.getenv("COMPACT_TOMBSTONE_RATIO", "0.2"))
+# Vectors copied per page while rebuilding
+COMPACT_PAGE_SIZE = int(os.getenv("COMPACT_PAGE_SIZE", "1000"))
+# Sample queries used to measure latency before/after
+COMPACT_LATENCY_SAMPLES = int(os.getenv("COMPACT_LATENCY_SAMPLES", "50"))
+
+
+def _dir_size_mb(path: Path) -> float:
+    total = sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+    return round(total / (1024 * 1024), 2)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)], 3)
+
+
+def collection_health() -> List[dict]:
+    """Live count, tombstones and tombstone ratio for every collection."""
+    with SessionLocal() as db:
+        deleted = {s.name: s.deleted for s in db.query(CollectionStats).all()}
+
+    client = get_client()
+    report = []
+    for collection in client.list_collections():
+        name = collection if isinstance(collection, str) else collection.name
+        live = client.get_collection(name=name).count()
+        tombstones = deleted.get(name, 0)
+        total = live + tombstones
+        report.append({
+            "collection": name,
+            "live": live,
+            "deleted": tombstones,
+            "tombstone_ratio": round(tombstones / total, 3) if total else 0.0,
+        })
+    return report
+
+
+def _sample_queries(collection, n: int) -> list:
+    count = collection.count()
+    if not count:
+        return []
+    offset = random.randrange(max(count - n, 0) + 1)
+    return list(collection.get(limit=n, offset=offset, include=["embeddings"])["embeddings"])
+
+
+def _query_latency(collection, queries: list) -> dict:
+    latencies = []
+    for vector in queries:
+        start = time.perf_counter()
+        collection.query(query_embeddings=[vector], n_results=8, include=[])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": _percentile(latencies, 0.50), "p95_ms": _percentile(latencies, 0.95)}
+
+
+def vacuum_chroma() -> None:
+    """Return free pages in Chroma's SQLite store to the filesystem."""
+    db_path = CHROMA_DIR / "chroma.sqlite3"
+    if not db_path.exists():
+        return
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def _reset_stats(name: str) -> None:
+    with SessionLocal() as db:
+        stats = db.get(CollectionStats, name)
+        if stats is None:
+            stats = CollectionStats(name=name, deleted=0, compactions=0)
+            db.add(stats)
+        stats.deleted = 0
+        stats.compactions = (stats.compactions or 0) + 1
+        stats.last_compacted_at = datetime.utcnow()
+        db.commit()
+
+
+def _all_ids(collection) -> set:
+    ids, offset = set(), 0
+    while True:
+        page = collection.get(limit=COMPACT_PAGE_SIZE, offset=offset, include=[])
+        if not page["ids"]:
+            return ids
+        ids.update(page["ids"])
+        offset += len(page["ids"])
+
+
+def _drop_collection(client, name: str) -> None:
+    try:
+        client.delete_collection(name=name)
+    except Exception:
+        pass  # not there
+
+
+def compact_collection(name: str, vacuum: bool = True) -> dict:
+    """
+    Rebuild one collection from its live vectors and swap it in.
+
+    The copy and the swap run under the collection's exclusive lock, so
+    writes (which take it shared) wait until the new collection is in
+    place and then re-open their handle onto it. API processes pick up the
+    new collection for reads through the handle epoch (see
+    vector_store.bump_handle_epoch); the retired copy is dropped only after
+    they have had time to do so.
+
+    Returns:
+        Disk size and query latency before/after.
+    """
+    client = get_client()
+    # Leftovers from an interrupted run
+    tmp_name, retired_name = f"{name}_compacting", f"{name}_retired"
+    try:
+        client.get_collection(name=name)
+    except Exception:
+        # Stopped between the two renames: the retired copy is the data
+        client.get_collection(name=retired_name).modify(name=name)
+    _drop_collection(client, tmp_name)
+    _drop_collection(client, retired_name)
+
+    with collection_lock(name, exclusive=True):
+        old = client.get_collection(name=name)
+        live = old.count()
+        queries = _sample_queries(old, COMPACT_LATENCY_SAMPLES)
+        before = {"disk_mb": _dir_size_mb(CHROMA_DIR), **_query_latency(old, queries)}
+
+        print(f"🧹 Compacting {name} ({live} live vectors, writes paused)...")
+        rebuilt = client.create_collection(name=tmp_name, metadata=old.metadata or None)
+        offset = 0
+        while True:
+            page = old.get(
+                limit=COMPACT_PAGE_SIZE, offset=offset,
+                include=["embeddings", "documents", "metadatas"],
+            )
+            if not page["ids"]:
+                break
+            rebuilt.add(
+                ids=page["ids"],
+                embeddings=page["embeddings"],
+                documents=page["documents"],
+                metadatas=page["metadatas"],
+            )
+            offset += len(page["ids"])
+
+        # Same ids on both sides — catches a writer that bypassed the lock
+        if _all_ids(old) != _all_ids(rebuilt):
+            client.delete_collection(name=tmp_name)
+            raise RuntimeError(f"{name} changed while compacting — try again when ingestion is idle")
+
+        # Swap: old → retired, rebuilt → name
+        old.modify(name=retired_name)
+        rebuilt.modify(name=name)
+        bump_handle_epoch()
+
+    # Readers in other processes may hold the old handle until their next
+    # epoch check; drop the retired copy only once they've moved on
+    time.sleep(2 * HANDLE_EPOCH_CHECK_SECONDS)
+    _drop_collection(client, retired_name)
+    _reset_stats(name)
+    if vacuum:
+        vacuum_chroma()
+
+    after = {"disk_mb": _dir_size_mb(CHROMA_DIR), **_query_latency(client.get_collection(name=name), queries)}
+    return {
+        "collection": name,
+        "live": live,
+        "before": before,
+        "after": after,
+        "disk_recovered_mb": round(before["disk_mb"] - after["disk_mb"], 2),
+        "p50_recovered_ms": round(before["p50_ms"] - after["p50_ms"], 3),
+    }
+
+
+def compact(threshold: float = COMPACT_TOMBSTONE_RATIO, only: Optional[str] = None,
+            force: bool = False, dry_run: bool = False, vacuum: bool = True) -> dict:
+    """Compact every collection over the tombstone threshold."""
+    health = collection_health()
+    due = [
+        h for h in health
+        if (only is None or h["collection"] == only)
+        and (force or (h["deleted"] and h["tombstone_ratio"] >= threshold))
+    ]
+    if dry_run:
+        return {"threshold": threshold, "collections": health, "due": [h["collection"] for h in due]}
+
+    results = []
+    for h in due:
+        try:
+            results.append(compact_collection(h["collection"], vacuum=vacuum))
+        except Exception as e:
+            print(f"❌ {h['collection']}: {e}")
+            results.append({"collection": h["collection"], "error": str(e)})
+    return {"threshold": threshold, "compacted": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact Chroma collections with many deleted vectors")
+    parser.add_argument("--threshold", type=float, default=COMPACT_TOMBSTONE_RATIO,
+                        help="tombstone ratio that triggers a rebuild")
+    parser.add_argument("--collection", help="only this collection")
+    parser.add_argument("--force", action="store_true", help="compact even below the threshold")
+    parser.add_argument("--dry-run", action="store_true", help="report tombstone ratios only")
+    parser.add_argument("--no-vacuum", action="store_true", help="skip VACUUM of Chroma's SQLite store")
+    args = parser.parse_args()
+
+    print(json.dumps(
+        compact(args.threshold, args.collection, args.force, args.dry_run, vacuum=not args.no_vacuum),
+        indent=2,
+    ))
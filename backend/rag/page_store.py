@@ -0,0 +1,197 @@
+# backend/rag/page_store.py
+"""
+Persisted per-page text, written once at ingest.
+
+Each document's extracted pages go to one file, PAGE_STORE_DIR/<id>.pages.
+Pages are compressed independently, so a single page is read with three
+small seeks (trailer → index entry → record) without touching the rest
+of the file. Re-chunking, summarizing and the page-text endpoint read
+from here instead of re-parsing the original upload.
+
+File layout (integers little-endian):
+
+    b"RAGPAGE1"                              header
+    zlib(page meta JSON + b"\\n" + text)      one record per page, in order
+    zlib(document meta JSON)                 metadata shared by all pages
+    (offset u64, length u32) × pages         index
+    index offset u64, pages u32,
+    meta offset u64, meta length u32,
+    b"RAGPAGE1"                              trailer (32 bytes)
+
+Files are written to a temp name and renamed into place on commit, so a
+reader never sees a half-written store.
+"""
+import json
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, Optional
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document as LCDocument
+
+
+# =========================
+# CONFIG
+# =========================
+PAGE_STORE_DIR = Path(os.getenv("PAGE_STORE_DIR", "page_store"))
+# zlib level: 6 is ~3-4x on extracted text at a fraction of level 9's cost
+PAGE_STORE_LEVEL = int(os.getenv("PAGE_STORE_LEVEL", "6"))
+
+MAGIC = b"RAGPAGE1"
+INDEX_ENTRY = struct.Struct("<QI")
+TRAILER = struct.Struct("<QIQI8s")
+
+
+def store_path(document_id: int) -> Path:
+    return PAGE_STORE_DIR / f"{document_id}.pages"
+
+
+def has_pages(document_id: int) -> bool:
+    return store_path(document_id).exists()
+
+
+def delete_pages(document_id: int) -> None:
+    """Remove a document's page store (and any unfinished write)."""
+    for path in (store_path(document_id), store_path(document_id).with_suffix(".tmp")):
+        if path.exists():
+            path.unlink()
+
+
+# =========================
+# WRITE
+# =========================
+class PageStoreWriter:
+    """
+    Streams pages to a new store as they are extracted.
+
+    Usage:
+        writer = PageStoreWriter(document_id)
+        for page in pages:
+            writer.add(page)
+        writer.commit()      # or writer.abort() on failure
+    """
+
+    def __init__(self, document_id: int):
+        PAGE_STORE_DIR.mkdir(parents=True, exist_ok=True)
+        self.path = store_path(document_id)
+        self.tmp_path = self.path.with_suffix(".tmp")
+        self.file = open(self.tmp_path, "wb")
+        self.file.write(MAGIC)
+        self.index: list = []
+        self.meta: Optional[dict] = None
+
+    def add(self, page: "LCDocument") -> None:
+        metadata = page.metadata or {}
+        if self.meta is None:
+            # Document-level metadata comes from the first page; each record
+            # keeps only what differs (page number, label, flags)
+            self.meta = {k: v for k, v in metadata.items() if k not in ("page", "page_label", "extract_timeout")}
+        own = {k: v for k, v in metadata.items() if k not in self.meta or self.meta[k] != v}
+        record = zlib.compress(
+            json.dumps(own, default=str).encode() + b"\n" + page.page_content.encode("utf-8"),
+            PAGE_STORE_LEVEL,
+        )
+        self.index.append((self.file.tell(), len(record)))
+        self.file.write(record)
+
+    def commit(self) -> Path:
+        """Write meta, index and trailer and move the store into place."""
+        meta = zlib.compress(json.dumps(self.meta or {}, default=str).encode(), PAGE_STORE_LEVEL)
+        meta_offset = self.file.tell()
+        self.file.write(meta)
+        index_offset = self.file.tell()
+        self.file.write(b"".join(INDEX_ENTRY.pack(*entry) for entry in self.index))
+        self.file.write(TRAILER.pack(index_offset, len(self.index), meta_offset, len(meta), MAGIC))
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        self.file.close()
+        if self.tmp_path.exists():
+            self.tmp_path.unlink()
+
+
+# =========================
+# READ
+# =========================
+class PageStore:
+    """Random-access reader over one document's page store."""
+
+    def __init__(self, document_id: int):
+        self.document_id = document_id
+        # FileNotFoundError if the document was never stored
+        self.file = open(store_path(document_id), "rb")
+        self.file.seek(-TRAILER.size, os.SEEK_END)
+        self.index_offset, self.page_count, meta_offset, meta_length, magic = TRAILER.unpack(
+            self.file.read(TRAILER.size)
+        )
+        if magic != MAGIC:
+            self.file.close()
+            raise ValueError(f"Corrupt page store for document {document_id}")
+        self._meta_at = (meta_offset, meta_length)
+        self._meta: Optional[dict] = None
+
+    def __enter__(self) -> "PageStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __len__(self) -> int:
+        return self.page_count
+
+    @property
+    def meta(self) -> dict:
+        """Document-level metadata (read on first use)."""
+        if self._meta is None:
+            offset, length = self._meta_at
+            self.file.seek(offset)
+            self._meta = json.loads(zlib.decompress(self.file.read(length)))
+        return self._meta
+
+    def page(self, index: int) -> tuple[str, dict]:
+        """
+        (text, page-level metadata) of page `index` (0-based).
+        Raises IndexError when out of range.
+        """
+        if not 0 <= index < self.page_count:
+            raise IndexError(f"Page {index} out of range (0-{self.page_count - 1})")
+        self.file.seek(self.index_offset + index * INDEX_ENTRY.size)
+        offset, length = INDEX_ENTRY.unpack(self.file.read(INDEX_ENTRY.size))
+        self.file.seek(offset)
+        header, _, text = zlib.decompress(self.file.read(length)).partition(b"\n")
+        return text.decode("utf-8"), json.loads(header)
+
+    def iter_pages(self) -> Iterator["LCDocument"]:
+        """Every page as an LCDocument with the metadata it was extracted with."""
+        from langchain_core.documents import Document as LCDocument
+
+        for index in range(self.page_count):
+            text, own = self.page(index)
+            yield LCDocument(page_content=text, metadata={**self.meta, **own})
+
+
+def read_page(document_id: int, index: int) -> dict:
+    """
+    One page's text without loading the rest of the document.
+
+    Returns:
+        {"text", "metadata", "total_pages"}. Raises FileNotFoundError when
+        the document has no store, IndexError when the page doesn't exist.
+    """
+    with PageStore(document_id) as store:
+        text, own = store.page(index)
+        return {"text": text, "metadata": own, "total_pages": len(store)}
+
+
+def iter_stored_pages(document_id: int) -> Iterator["LCDocument"]:
+    """Stream a document's stored pages (drop-in for pipeline.iter_pages)."""
+    with PageStore(document_id) as store:
+        print(f"📚 Reading {len(store)} stored page(s) of document {document_id}")
+        yield from store.iter_pages()
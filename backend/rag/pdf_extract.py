@@ -0,0 +1,225 @@
+# backend/rag/pdf_extract.py
+"""
+PDF text extraction, parallel across page ranges for large files.
+
+Below PDF_PARALLEL_MIN_PAGES pages a PDF is read serially, page by page.
+Above it, the pages are cut into ranges of PDF_PAGES_PER_RANGE, each
+range is extracted in a process pool, and results are yielded back in
+page order, so `page` metadata is the same as a serial read. Only a
+bounded window of ranges is in flight, keeping memory flat for very long
+files.
+
+Each page gets PDF_PAGE_TIMEOUT seconds, enforced with SIGALRM, which
+only a process's main thread can use. Pool workers run their tasks on
+their main thread; a serial read started from any other thread (the
+ingest pipeline extracts on a background thread) is handed to one
+long-lived extraction process for the same reason. A page that runs over
+is yielded with empty text and flagged `extract_timeout` instead of
+stalling the whole job.
+"""
+import os
+import signal
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    # Imported lazily: spawned pool workers only need pypdf
+    from langchain_core.documents import Document as LCDocument
+
+
+# =========================
+# CONFIG
+# =========================
+# PDFs with fewer pages than this are extracted serially
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "50"))
+# Pages handed to one pool task
+PDF_PAGES_PER_RANGE = int(os.getenv("PDF_PAGES_PER_RANGE", "25"))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Per-page extraction budget in seconds (0 disables)
+PDF_PAGE_TIMEOUT = float(os.getenv("PDF_PAGE_TIMEOUT", "30"))
+# "spawn" is safe to start from the ingest pipeline's background thread
+PDF_MP_CONTEXT = os.getenv("PDF_MP_CONTEXT", "spawn")
+
+
+class PageTimeout(Exception):
+    """A single page took longer than PDF_PAGE_TIMEOUT to extract."""
+
+
+def _on_alarm(signum, frame):
+    raise PageTimeout()
+
+
+def _can_use_alarm() -> bool:
+    # SIGALRM handlers can only be installed from the main thread
+    return (
+        PDF_PAGE_TIMEOUT > 0
+        and hasattr(signal, "setitimer")
+        and threading.current_thread() is threading.main_thread()
+    )
+
+
+def _extract_page(page, use_alarm: bool) -> Tuple[str, bool]:
+    """(text, timed_out) for one pypdf page."""
+    if not use_alarm:
+        return page.extract_text().strip(), False
+    try:
+        signal.setitimer(signal.ITIMER_REAL, PDF_PAGE_TIMEOUT)
+        text = page.extract_text().strip()
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        return text, False
+    except PageTimeout:
+        return "", True
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _open(path: str):
+    import pypdf
+
+    return pypdf.PdfReader(path)
+
+
+# Pool workers keep the last PDF open across tasks: parsing the xref table
+# and page labels once per process instead of once per range
+_worker_reader: dict = {}
+
+
+def _cached_reader(path: str):
+    if _worker_reader.get("path") != path:
+        reader = _open(path)
+        _worker_reader.update(path=path, reader=reader, labels=reader.page_labels)
+    return _worker_reader["reader"], _worker_reader["labels"]
+
+
+def _base_metadata(reader, source: str) -> dict:
+    """Document-level metadata, matching what PyPDFLoader attaches."""
+    meta = {"producer": "PyPDF", "creator": "PyPDF", "creationdate": ""}
+    for key, value in (reader.metadata or {}).items():
+        if isinstance(value, (str, int, float)):
+            meta[key.lstrip("/").lower()] = value
+    meta.update({"source": source, "total_pages": len(reader.pages)})
+    return meta
+
+
+def extract_pages(reader, labels: List[str], start: int, end: int) -> List[Tuple[int, str, str, bool]]:
+    """
+    Extract pages [start, end) of an open PDF.
+
+    Returns:
+        (page index, text, page label, timed out) per page.
+    """
+    use_alarm = _can_use_alarm()
+    previous = signal.signal(signal.SIGALRM, _on_alarm) if use_alarm else None
+    try:
+        out = []
+        for index in range(start, end):
+            text, timed_out = _extract_page(reader.pages[index], use_alarm)
+            out.append((index, text, labels[index], timed_out))
+        return out
+    finally:
+        if use_alarm:
+            signal.signal(signal.SIGALRM, previous)
+
+
+def extract_range(path: str, start: int, end: int) -> List[Tuple[int, str, str, bool]]:
+    """Pool task: extract pages [start, end) of the PDF at `path`."""
+    reader, labels = _cached_reader(path)
+    return extract_pages(reader, labels, start, end)
+
+
+# One extraction process shared by serial reads that can't time pages
+# themselves (started lazily, reused across documents)
+_serial_pool: dict = {"pool": None}
+_serial_lock = threading.Lock()
+
+
+def _serial_executor() -> ProcessPoolExecutor:
+    with _serial_lock:
+        if _serial_pool["pool"] is None:
+            _serial_pool["pool"] = ProcessPoolExecutor(max_workers=1, mp_context=get_context(PDF_MP_CONTEXT))
+        return _serial_pool["pool"]
+
+
+def _drop_serial_executor(pool: ProcessPoolExecutor) -> None:
+    """Forget a worker that died (e.g. killed on a hostile PDF); the next read starts a new one."""
+    with _serial_lock:
+        if _serial_pool["pool"] is pool:
+            _serial_pool["pool"] = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _page_document(meta: dict, index: int, text: str, label: str, timed_out: bool) -> "LCDocument":
+    from langchain_core.documents import Document as LCDocument
+
+    metadata = {**meta, "page": index, "page_label": label}
+    if timed_out:
+        metadata["extract_timeout"] = True
+        print(f"⏱️ Page {index + 1} exceeded {PDF_PAGE_TIMEOUT}s — skipped")
+    return LCDocument(page_content=text, metadata=metadata)
+
+
+def iter_pdf_pages(file_path: Path, workers: Optional[int] = None) -> Iterator["LCDocument"]:
+    """
+    Yield a PDF's pages in order, one LCDocument per page.
+
+    Args:
+        file_path: The PDF.
+        workers: Pool size (default PDF_WORKERS); 1 forces a serial read.
+    """
+    source = str(file_path)
+    reader = _open(source)
+    meta = _base_metadata(reader, source)
+    total = meta["total_pages"]
+    workers = workers or PDF_WORKERS
+
+    if total < PDF_PARALLEL_MIN_PAGES or workers <= 1:
+        if PDF_PAGE_TIMEOUT <= 0 or _can_use_alarm():
+            labels = reader.page_labels
+            for index in range(total):
+                for row in extract_pages(reader, labels, index, index + 1):
+                    yield _page_document(meta, *row)
+            return
+        # Off the main thread: pages can only be timed in another process
+        del reader
+        pool = _serial_executor()
+        try:
+            yield from _iter_ranges(pool, source, meta, total, window=1)
+        except BrokenProcessPool:
+            _drop_serial_executor(pool)
+            raise
+        return
+    del reader
+
+    print(f"📚 Extracting {total} pages across {workers} processes")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context(PDF_MP_CONTEXT)) as pool:
+        yield from _iter_ranges(pool, source, meta, total, window=workers * 2)
+
+
+def _iter_ranges(pool: ProcessPoolExecutor, source: str, meta: dict, total: int, window: int) -> Iterator["LCDocument"]:
+    """
+    Extract page ranges of PDF_PAGES_PER_RANGE in `pool`, keeping at most
+    `window` in flight, and yield the pages strictly in page order.
+    """
+    ranges = iter([(start, min(start + PDF_PAGES_PER_RANGE, total)) for start in range(0, total, PDF_PAGES_PER_RANGE)])
+    pending = deque()
+    try:
+        for start, end in ranges:
+            pending.append(pool.submit(extract_range, source, start, end))
+            if len(pending) >= window:
+                break
+        while pending:
+            rows = pending.popleft().result()
+            next_range = next(ranges, None)
+            if next_range is not None:
+                pending.append(pool.submit(extract_range, source, *next_range))
+            for row in rows:
+                yield _page_document(meta, *row)
+    finally:
+        # Consumer stopped early (error / cancelled job): drop queued ranges
+        for future in pending:
+            future.cancel()
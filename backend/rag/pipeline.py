@@ -1,171 +1,904 @@
 # backend/rag/pipeline.py
 import os
-import uuid
+import queue
+import threading
+import time
 from pathlib import Path
+from collections import defaultdict, deque
+from contextlib import closing
+from typing import Callable, Iterable, Iterator, Optional
 
-import chromadb
 # Splits long text into smaller overlapping chunks
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, TextLoader
+from langchain_core.documents import Document as LCDocument
 
 # FREE LOCAL EMBEDDINGS — no API key needed!
-from langchain_huggingface import HuggingFaceEmbeddings
+from backend.rag.embeddings import get_cached_embeddings
 from backend.db.database import SessionLocal
 from backend.models.document import Document
 from backend.models.models import User
+from backend.rag.embedding_cache import embedding_cache
+from backend.rag.bm25 import get_bm25_index
+from backend.rag.corpus import bump_corpus_version
+from backend.rag.chunk_store import (
+    chunk_rows,
+    record_chunks,
+    replace_chunks,
+    stored_chunks,
+    delete_vectors,
+    legacy_chunks,
+    add_tombstones_sync,
+)
+from backend.rag.embedding_cache import text_hash
+from backend.rag.pdf_extract import iter_pdf_pages
+from backend.rag.page_store import PageStoreWriter, delete_pages, has_pages, iter_stored_pages
+from backend.utils.metrics import span, record_span
+from backend.rag.vector_store import get_or_create_collection
 
 
 # =========================
 # CONFIG
 # =========================
-# Directory where ChromaDB data will be stored on disk
-CHROMA_DIR = Path("chroma_db")
-CHROMA_DIR.mkdir(exist_ok=True)  # Create folder if not exists
+# Local embeddings (EMBEDDING_MODEL / EMBEDDING_BACKEND) are loaded on first
+# use via get_cached_embeddings(), so importing this module stays cheap
+
+# Splits text into chunks of 1000 characters
+# with 200-character overlap to preserve context.
+# After changing these, re-chunk existing documents from their stored
+# pages (POST /api/documents/{id}/rechunk) — no re-parsing needed
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+text_splitter = RecursiveCharacterTextSplitter(
+    chunk_size=CHUNK_SIZE,
+    chunk_overlap=CHUNK_OVERLAP,
+    length_function=len,
+)
+
+# Chunks embedded + written to Chroma per batch
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+# Max batches buffered between the extract/split thread and the embedder
+INGEST_QUEUE_DEPTH = int(os.getenv("INGEST_QUEUE_DEPTH", "4"))
+
+
+# =========================
+# STREAMING STAGES
+# =========================
+SUPPORTED_SUFFIXES = {".pdf", ".docx", ".doc", ".txt", ".md"}
+
 
-# Persistent Chroma client (data survives server restart)
-client = chromadb.PersistentClient(path=str(CHROMA_DIR))
+def get_loader(file_path: Path):
+    """Pick the LangChain loader for a file type."""
+    suffix = file_path.suffix.lower()
+    if suffix == ".pdf":
+        print("📄 Extracting PDF...")
+        return PyPDFLoader(str(file_path))
+    if suffix in {".docx", ".doc"}:
+        print("📝 Extracting DOCX...")
+        return Docx2txtLoader(str(file_path))
+    if suffix in {".txt", ".md"}:
+        print("📄 Extracting TXT/MD...")
+        return TextLoader(str(file_path), encoding="utf-8")
+    raise ValueError(f"Unsupported type: {file_path.suffix}")
 
-def get_or_create_collection(user_email: str):
+
+def iter_pages(file_path: Path) -> Iterator[LCDocument]:
+    """
+    Yield pages/sections one at a time instead of loading them all.
+    Large PDFs are extracted in parallel page ranges (see pdf_extract).
+    """
+    if file_path.suffix.lower() == ".pdf":
+        print("📄 Extracting PDF...")
+        yield from iter_pdf_pages(file_path)
+        return
+    yield from get_loader(file_path).lazy_load()
+
+
+def iter_chunks(pages: Iterable[LCDocument], timings: Optional[dict] = None) -> Iterator[LCDocument]:
     """
-    Each user gets their own vector collection.
-    Example:
-      k@gmail.com → docs_k_gmail_com
+    Split each page as it arrives. Same chunks as `split_documents(pages)`,
+    which also splits page by page. Splitting time is added to
+    `timings["split"]` when given.
     """
-    collection_name = f"docs_{user_email.replace('@', '_').replace('.', '_')}"
+    for page in pages:
+        start = time.perf_counter()
+        chunks = text_splitter.split_documents([page])
+        if timings is not None:
+            timings["split"] += time.perf_counter() - start
+        yield from chunks
+
+
+def timed_iter(items: Iterable, timings: dict, key: str) -> Iterator:
+    """Yield from `items`, adding the time spent producing them to `timings[key]`."""
+    iterator = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            timings[key] += time.perf_counter() - start
+            return
+        timings[key] += time.perf_counter() - start
+        yield item
+
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[list]:
+    """Group an iterator into lists of at most `batch_size` items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+_DONE = object()
+
+
+def prefetch(items: Iterable, depth: int) -> Iterator:
+    """
+    Produce `items` on a background thread through a bounded queue, so
+    extraction/splitting overlaps with embedding but never runs more than
+    `depth` items ahead. Producer errors are re-raised in the consumer.
+
+    A consumer that stops early must close() the generator (or wrap it in
+    contextlib.closing) to stop and join the producer thread.
+    """
+    q: queue.Queue = queue.Queue(maxsize=max(depth, 1))
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # Never block forever on a full queue nobody reads any more
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(e)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
     try:
-        return client.get_collection(name=collection_name)
-    except:
-        return client.create_collection(name=collection_name)
-
-# HuggingFace Embeddings 
-embeddings = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2",  # Fast & accurate (384 dims)
-    model_kwargs={'device': 'cpu'},  
-)
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # Runs on exhaustion, error or close(): once this returns the
+        # producer has stopped, so its sinks (page store) can be closed
+        stop.set()
+        thread.join()
 
-# Splits text into chunks of 1000 characters
-# with 200-character overlap to preserve context
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=1000,
-    chunk_overlap=200,
-    length_function=len,
-)
 
 # =========================
 # MAIN PIPELINE
 # =========================
+def _get_or_create_document(
+    user_email: str,
+    original_filename: str,
+    file_path: Path,
+    file_hash: str,
+    user_id: Optional[int] = None,
+) -> tuple[int, int]:
+    """
+    Create the Document row up front so chunks can carry its id.
+    A retried job reuses the row left by the failed attempt.
+    """
+    db = SessionLocal()
+    try:
+        if user_id is None:
+            # Only callers that don't know the id pay for this lookup
+            user_id = db.query(User.id).filter(User.email == user_email).scalar()
+            if user_id is None:
+                raise ValueError(f"User not found: {user_email}")
+
+        doc_record = db.query(Document).filter(
+            Document.file_hash == file_hash,
+            Document.user_id == user_id
+        ).first()
+
+        if not doc_record:
+            doc_record = Document(
+                filename=original_filename,
+                file_path=str(file_path),
+                user_id=user_id,
+                page_count=0,
+                chunk_count=0,
+                file_hash=file_hash,
+            )
+            db.add(doc_record)
+            db.commit()
+            db.refresh(doc_record)
+
+        return doc_record.id, user_id
+
+    except Exception as e:
+        print(f"❌ DB error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
 def process_uploaded_file(
     file_path: str,
     original_filename: str,
     user_email: str,
-    file_hash: str
-) -> None:
+    file_hash: str,
+    progress: Optional[Callable[..., None]] = None,
+    user_id: Optional[int] = None,
+) -> int:
     """
-    Background job: PDF/TXT/DOCX → text → chunks → embeddings → ChromaDB
+    Ingestion job: PDF/TXT/DOCX → text → chunks → embeddings → ChromaDB
+
+    Pages stream from the loader into the splitter; chunks are embedded and
+    written to Chroma in batches of INGEST_BATCH_SIZE, so peak memory is
+    bounded by a few batches rather than the whole document. Chunk ids are
+    deterministic, so a retried job overwrites instead of duplicating.
+
+    Args:
+        progress: Optional callback `progress(stage, fraction)` used by the
+            job queue to record per-stage progress.
+        user_id: Owner's id when already known (skips the User lookup).
+
+    Returns:
+        The id of the created Document row. Raises on failure so the
+        worker can mark the job as failed.
     """
     print(f"🚀 Starting RAG processing: {original_filename} for {user_email}")
+    report = progress or (lambda *args, **kwargs: None)
 
     file_path = Path(file_path)
     if not file_path.exists():
-        print(f"❌ File not found: {file_path}")
-        return
+        raise FileNotFoundError(f"File not found: {file_path}")
 
+    document_id = pages_out = batches = None
     try:
-        # load document
-        # 1. Extract text
-        if file_path.suffix.lower() == ".pdf":
-            loader = PyPDFLoader(str(file_path))
-            print("📄 Extracting PDF...")
-        elif file_path.suffix.lower() in {".docx", ".doc"}:
-            loader = Docx2txtLoader(str(file_path))
-            print("📝 Extracting DOCX...")
-        elif file_path.suffix.lower() in {".txt", ".md"}:
-            loader = TextLoader(str(file_path), encoding="utf-8")
-            print("📄 Extracting TXT/MD...")
-        else:
-            print(f"❌ Unsupported type: {file_path.suffix}")
-            return
-        
-        
-        # documents = [page1_text, page2_text, ...]
-        documents = loader.load()
-        print(f"✅ Extracted {len(documents)} page(s)/section(s)")
-
-        # Split large text into overlapping chunks
-        chunks = text_splitter.split_documents(documents)
-        print(f"✂️ Split into {len(chunks)} chunks (1000 chars each)")
-
-        if not chunks:
-            print("⚠️ No text extracted — skipping")
-            return
-        
+        # Fail fast on unsupported types before touching the DB
+        if file_path.suffix.lower() not in SUPPORTED_SUFFIXES:
+            raise ValueError(f"Unsupported type: {file_path.suffix}")
+
         # === SAVE METADATA TO MYSQL ===
-        db = SessionLocal()
-        try:
-            user = db.query(User).filter(User.email == user_email).first()
-            if not user:
-                print(f"⚠️ User not found: {user_email}")
-                return
+        document_id, user_id = _get_or_create_document(
+            user_email, original_filename, file_path, file_hash, user_id=user_id
+        )
+        report("saving", 1.0, document_id=document_id)
+        print(f"💾 Document saved with ID: {document_id}")
 
-            doc_record = Document(
-                filename=original_filename,
-                file_path=str(file_path),
-                user_id=user.id,
-                page_count=len(documents),
-                chunk_count=len(chunks),
-                file_hash=file_hash,
-            )
+        collection = get_or_create_collection(user_email, user_id=user_id)
+        keyword_index = get_bm25_index(user_email)
 
-            db.add(doc_record)
-            db.commit()
-            db.refresh(doc_record)
+        # Shared with the producer thread
+        state = {"pages": 0, "total_pages": None}
 
-            document_id = doc_record.id
-            print(f"💾 Document saved with ID: {document_id}")
+        timings = {"load": 0.0, "split": 0.0}
+        # Extracted text is kept, so nothing has to parse this file again
+        pages_out = PageStoreWriter(document_id)
 
-        except Exception as e:
-            print(f"❌ DB error: {e}")
-            db.rollback()
-            return
-        finally:
-            db.close()
-            
-    # 4. PREPARE CHROMA DATA
-        # Metadata helps with citations & debugging
-        collection = get_or_create_collection(user_email)
-        
-        # Generate unique IDs for each chunk
-        ids = [str(uuid.uuid4()) for _ in chunks]
-        
-        # Extract actual text from each chunk
-        texts = [chunk.page_content for chunk in chunks]
-
-        metadatas = []
-        for i, chunk in enumerate(chunks):
-            metadatas.append({
-                # "document_id": document_id,
-                "filename": original_filename,
-                "chunk_index": i,
-                "page": chunk.metadata.get("page", 0),
-                "user_email": user_email,
-            })
+        def tracked_pages():
+            for page in timed_iter(iter_pages(file_path), timings, "load"):
+                state["pages"] += 1
+                state["total_pages"] = page.metadata.get("total_pages", state["total_pages"])
+                pages_out.add(page)
+                yield page
+
+        # 1-3. EXTRACT → SPLIT → BATCH (background thread, bounded queue)
+        report("extracting", 0.0)
+        batches = prefetch(
+            iter_batches(enumerate(iter_chunks(tracked_pages(), timings)), INGEST_BATCH_SIZE),
+            INGEST_QUEUE_DEPTH,
+        )
 
         # -----------------------
-        # 5. EMBED & STORE
+        # 4-5. EMBED & STORE, batch by batch
         # -----------------------
-        # Create embeddings locally and store everything in Chroma
-        collection.add(
-            ids=ids,
-            documents=texts,
-            metadatas=metadatas,
-            embeddings=embeddings.embed_documents(texts),
-        )
+        chunk_count = 0
+        for batch in batches:
+            ids = [f"{document_id}-{i}" for i, _ in batch]
+            texts = [chunk.page_content for _, chunk in batch]
+            # Metadata helps with citations & debugging
+            metadatas = [
+                {
+                    "document_id": document_id,
+                    "filename": original_filename,
+                    "chunk_index": i,
+                    "page": chunk.metadata.get("page", 0),
+                    "user_email": user_email,
+                }
+                for i, chunk in batch
+            ]
+
+            # Create embeddings locally (cache first) and store in Chroma
+            with span("ingest.embed", document_id=document_id, batch=len(texts)):
+                embeddings = get_cached_embeddings().embed_documents(texts)
+            with span("ingest.store", document_id=document_id, batch=len(texts)):
+                collection.upsert(
+                    ids=ids,
+                    documents=texts,
+                    metadatas=metadatas,
+                    embeddings=embeddings,
+                )
+                # Keep the keyword index in step with the vectors
+                keyword_index.add(ids, texts, [document_id] * len(ids))
+            # Record the ids so delete/update can target them exactly
+            with span("ingest.db_commit", document_id=document_id, batch=len(texts)):
+                db = SessionLocal()
+                try:
+                    record_chunks(db, chunk_rows(
+                        document_id, ids, texts,
+                        [m["chunk_index"] for m in metadatas], [m["page"] for m in metadatas],
+                    ))
+                    db.commit()
+                finally:
+                    db.close()
+            chunk_count += len(batch)
+
+            if state["total_pages"]:
+                report("embedding", state["pages"] / state["total_pages"])
+            else:
+                report("embedding", 0.0)
+
+        report("extracting", 1.0)
+        report("embedding", 1.0)
+        # Extract/split ran interleaved on the producer thread: one span each with the totals
+        record_span("ingest.load", timings["load"], document_id=document_id, pages=state["pages"])
+        record_span("ingest.split", timings["split"], document_id=document_id, chunks=chunk_count)
+        print(f"✅ Extracted {state['pages']} page(s)/section(s)")
+        print(f"✂️ Split into {chunk_count} chunks ({CHUNK_SIZE} chars each)")
+
+        # Final counts once the whole stream has been stored
+        with span("ingest.db_commit", document_id=document_id, final=True):
+            db = SessionLocal()
+            try:
+                doc_query = db.query(Document).filter(Document.id == document_id)
+                if not chunk_count:
+                    # Nothing to search — the row is removed below
+                    raise ValueError("No text extracted")
+                pages_out.commit()
+                doc_query.update(
+                    {Document.page_count: state["pages"], Document.chunk_count: chunk_count},
+                    synchronize_session=False,
+                )
+                # New content is searchable — invalidate cached answers
+                bump_corpus_version(db, user_id)
+                db.commit()
+            finally:
+                db.close()
 
-        print(f"🎉 Stored {len(chunks)} chunks in Chroma")
+        print(f"🎉 Stored {chunk_count} chunks in Chroma")
+        print(f"🧠 Embedding cache: {embedding_cache.stats()}")
+        return document_id
 
     except Exception as e:
         print(f"💥 Processing failed: {e}")
+        if batches is not None:
+            # Stop and join the extract thread before closing its page sink
+            batches.close()
+        if pages_out is not None:
+            pages_out.abort()
+        if document_id is not None:
+            # Failed jobs aren't retried: don't leave a half-ingested document behind
+            try:
+                discard_document(document_id, user_email, user_id)
+            except Exception as cleanup_error:
+                print(f"⚠️ Cleanup of document {document_id} failed: {cleanup_error}")
+        raise
+
+
+def discard_document(document_id: int, user_email: str, user_id: int) -> None:
+    """
+    Remove everything a failed ingest stored for a document that never
+    became ready: vectors, keyword postings, chunk rows, page text and the
+    Document row, so it neither shows up in listings nor blocks a re-upload
+    as a duplicate. Bumps the corpus version so listing ETags and cached
+    answers move on. A document that completed an earlier ingest
+    (chunk_count > 0) is left alone.
+    """
+    db = SessionLocal()
+    try:
+        chunk_count = db.query(Document.chunk_count).filter(Document.id == document_id).scalar()
+        if chunk_count is None or chunk_count > 0:
+            return
+        collection = get_or_create_collection(user_email, user_id=user_id)
+        ids = [row[0] for row in stored_chunks(db, document_id)]
+        if ids:
+            delete_vectors(collection, ids)
+            get_bm25_index(user_email).delete_ids(ids)
+        replace_chunks(db, document_id, [])
+        db.query(Document).filter(Document.id == document_id).delete(synchronize_session=False)
+        add_tombstones_sync(db, collection.name, len(ids))
+        bump_corpus_version(db, user_id)
+        db.commit()
+    finally:
+        db.close()
+    delete_pages(document_id)
+    print(f"🧹 Removed incomplete document {document_id}")
+
+
+# =========================
+# INCREMENTAL UPDATE
+# =========================
+def _stored_chunk_map(collection, document_id: int, filename: str, user_email: str) -> tuple[dict, dict]:
+    """
+    content hash → ids of the document's stored chunks (a multiset: the
+    same text can appear more than once).
+
+    Returns:
+        (stored, legacy): `legacy` maps id → text for chunks found through
+        their Chroma metadata because no chunk ids were recorded; a kept
+        one still needs its metadata and keyword postings re-tagged.
+    """
+    db = SessionLocal()
+    try:
+        rows = stored_chunks(db, document_id)
+    finally:
+        db.close()
+
+    stored = defaultdict(deque)
+    if rows:
+        for chunk_id, content_hash, chunk_index, page in rows:
+            stored[content_hash].append((chunk_id, chunk_index, page))
+        return stored, {}
+
+    # Ingested before chunk ids were recorded: hash the stored text instead
+    legacy = {}
+    for chunk_id, text, meta in legacy_chunks(collection, document_id, filename, user_email, with_text=True):
+        stored[text_hash(text or "")].append((chunk_id, meta.get("chunk_index"), meta.get("page")))
+        legacy[chunk_id] = text or ""
+    return stored, legacy
+
+
+def _new_chunk_id(document_id: int, content_hash: str, taken: set) -> str:
+    """
+    Id for an added chunk, derived from its content so a retried job
+    upserts the same ids instead of leaving duplicates behind.
+    """
+    n = 0
+    while f"{document_id}-{content_hash[:16]}-{n}" in taken:
+        n += 1
+    chunk_id = f"{document_id}-{content_hash[:16]}-{n}"
+    taken.add(chunk_id)
+    return chunk_id
+
+
+def update_document(
+    document_id: int,
+    file_path: str,
+    original_filename: str,
+    user_email: str,
+    file_hash: str,
+    progress: Optional[Callable[..., None]] = None,
+    user_id: Optional[int] = None,
+    from_store: bool = False,
+) -> int:
+    """
+    Re-index a new version of an existing document by chunk diff.
+
+    The new file is re-split and each chunk's content hash is matched
+    against the stored chunks: matches keep their vectors (only metadata
+    is refreshed if the chunk moved), new text is embedded and stored, and
+    stored chunks with no match are deleted. The Document row's counts,
+    hash and path are then updated in one transaction.
+
+    Safe to retry: added chunk ids are content-derived and stale deletes
+    are idempotent, so a re-run converges on the same state.
+
+    Args:
+        from_store: Re-chunk the current version from its stored page
+            text (see page_store) instead of parsing `file_path`; used
+            after the chunking settings change. Falls back to the file
+            for documents ingested before pages were stored.
+
+    Returns:
+        The document id. Raises on failure.
+    """
+    print(f"🔁 Updating document {document_id}: {original_filename} for {user_email}")
+    report = progress or (lambda *args, **kwargs: None)
+
+    file_path = Path(file_path)
+    from_store = from_store and has_pages(document_id)
+    if not from_store:
+        if not file_path.exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+        if file_path.suffix.lower() not in SUPPORTED_SUFFIXES:
+            raise ValueError(f"Unsupported type: {file_path.suffix}")
+
+    db = SessionLocal()
+    try:
+        doc = db.query(Document).filter(Document.id == document_id).first()
+        if doc is None:
+            raise ValueError(f"Document not found: {document_id}")
+        user_id = doc.user_id
+        old_file_path = doc.file_path
+        old_filename = doc.filename
+    finally:
+        db.close()
+    report("saving", 1.0, document_id=document_id)
+
+    collection = get_or_create_collection(user_email, user_id=user_id)
+    keyword_index = get_bm25_index(user_email)
+    stored, legacy = _stored_chunk_map(collection, document_id, old_filename, user_email)
+    taken = {chunk_id for entries in stored.values() for chunk_id, _, _ in entries}
+
+    state = {"pages": 0, "total_pages": None}
+
+    timings = {"load": 0.0, "split": 0.0}
+    # A new version replaces the stored pages; a re-chunk only reads them
+    pages_out = None if from_store else PageStoreWriter(document_id)
+    source = iter_stored_pages(document_id) if from_store else iter_pages(file_path)
+
+    def tracked_pages():
+        for page in timed_iter(source, timings, "load"):
+            state["pages"] += 1
+            state["total_pages"] = page.metadata.get("total_pages", state["total_pages"])
+            if pages_out is not None:
+                pages_out.add(page)
+            yield page
+
+    batches = None
+    try:
+        report("extracting", 0.0)
+        batches = prefetch(
+            iter_batches(enumerate(iter_chunks(tracked_pages(), timings)), INGEST_BATCH_SIZE),
+            INGEST_QUEUE_DEPTH,
+        )
+
+        rows = []
+        kept = added = moved = 0
+        for batch in batches:
+            new_ids, new_texts, new_metas = [], [], []
+            moved_ids, moved_metas = [], []
+            retagged_ids, retagged_texts = [], []
+            for i, chunk in batch:
+                text = chunk.page_content
+                content_hash = text_hash(text)
+                page = chunk.metadata.get("page", 0)
+                metadata = {
+                    "document_id": document_id,
+                    "filename": original_filename,
+                    "chunk_index": i,
+                    "page": page,
+                    "user_email": user_email,
+                }
+                if stored[content_hash]:
+                    # Unchanged text: keep the vector, refresh position if it moved
+                    chunk_id, old_index, old_page = stored[content_hash].popleft()
+                    kept += 1
+                    if old_index != i or old_page != page or chunk_id in legacy:
+                        moved_ids.append(chunk_id)
+                        moved_metas.append(metadata)
+                    if chunk_id in legacy:
+                        # Baseline chunk: give it a document_id everywhere
+                        retagged_ids.append(chunk_id)
+                        retagged_texts.append(legacy[chunk_id])
+                else:
+                    chunk_id = _new_chunk_id(document_id, content_hash, taken)
+                    new_ids.append(chunk_id)
+                    new_texts.append(text)
+                    new_metas.append(metadata)
+                rows.append({
+                    "id": chunk_id,
+                    "document_id": document_id,
+                    "chunk_index": i,
+                    "page": page,
+                    "content_hash": content_hash,
+                })
+
+            if new_ids:
+                # Only new/changed text is embedded
+                with span("ingest.embed", document_id=document_id, batch=len(new_texts), update=True):
+                    embeddings = get_cached_embeddings().embed_documents(new_texts)
+                with span("ingest.store", document_id=document_id, batch=len(new_texts), update=True):
+                    collection.upsert(
+                        ids=new_ids,
+                        documents=new_texts,
+                        metadatas=new_metas,
+                        embeddings=embeddings,
+                    )
+                    keyword_index.add(new_ids, new_texts, [document_id] * len(new_ids))
+                added += len(new_ids)
+            if moved_ids:
+                with span("ingest.store", document_id=document_id, batch=len(moved_ids), update=True, moved=True):
+                    collection.update(ids=moved_ids, metadatas=moved_metas)
+                    keyword_index.add(retagged_ids, retagged_texts, [document_id] * len(retagged_ids))
+                moved += len(moved_ids)
+
+            if state["total_pages"]:
+                report("embedding", state["pages"] / state["total_pages"])
+
+        if not rows:
+            raise ValueError("No text extracted")
+        report("extracting", 1.0)
+        report("embedding", 1.0)
+        record_span("ingest.load", timings["load"], document_id=document_id, pages=state["pages"], update=True)
+        record_span("ingest.split", timings["split"], document_id=document_id, chunks=len(rows), update=True)
+
+        # Stored chunks nobody matched are gone from the new version
+        stale = [chunk_id for entries in stored.values() for chunk_id, _, _ in entries]
+        if stale:
+            delete_vectors(collection, stale)
+            keyword_index.delete_ids(stale)
+
+        if pages_out is not None:
+            pages_out.commit()
+
+        # One transaction: chunk list, document row, tombstones, corpus version
+        with span("ingest.db_commit", document_id=document_id, update=True):
+            db = SessionLocal()
+            try:
+                replace_chunks(db, document_id, rows)
+                db.query(Document).filter(Document.id == document_id).update(
+                    {
+                        Document.page_count: state["pages"],
+                        Document.chunk_count: len(rows),
+                        Document.file_hash: file_hash,
+                        Document.file_path: str(file_path),
+                        Document.filename: original_filename,
+                        # A new version needs new summaries (the worker queues them)
+                        **({} if from_store else {Document.summary: None, Document.section_summaries: None}),
+                    },
+                    synchronize_session=False,
+                )
+                add_tombstones_sync(db, collection.name, len(stale))
+                bump_corpus_version(db, user_id)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+        # The previous version's file is no longer referenced
+        if old_file_path and Path(old_file_path) != file_path and Path(old_file_path).exists():
+            Path(old_file_path).unlink()
+
+        print(f"✅ Updated document {document_id}: {kept} kept ({moved} moved), {added} embedded, {len(stale)} removed")
+        return document_id
+    except Exception:
+        if batches is not None:
+            batches.close()
+        if pages_out is not None:
+            pages_out.abort()
+        raise
+
+
+# =========================
+# BATCH INGEST
+# =========================
+class EmbeddingBatcher:
+    """
+    Collects chunks from many documents of one user and embeds + stores
+    them in full INGEST_BATCH_SIZE batches, so a run of small files shares
+    model calls instead of each sending a nearly empty batch.
+
+    A document handed to `close()` is finalized (counts, corpus version)
+    by the next `flush()`, once all of its chunks are stored.
+    """
+
+    def __init__(self, collection, keyword_index, user_email: str, user_id: int, batch_size: int = INGEST_BATCH_SIZE):
+        self.collection = collection
+        self.keyword_index = keyword_index
+        self.user_email = user_email
+        self.user_id = user_id
+        self.batch_size = batch_size
+        # (document_id, filename, chunk_index, chunk)
+        self.pending: list = []
+        # (document_id, pages, chunk_count, on_done)
+        self.closing: list = []
+
+    def add(self, document_id: int, filename: str, index: int, chunk: LCDocument) -> None:
+        self.pending.append((document_id, filename, index, chunk))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def close(self, document_id: int, pages: int, chunk_count: int, on_done: Optional[Callable[[], None]] = None) -> None:
+        self.closing.append((document_id, pages, chunk_count, on_done))
+
+    def discard(self, document_id: int) -> None:
+        """Drop a failed document's buffered chunks and everything already stored for it."""
+        self.pending = [item for item in self.pending if item[0] != document_id]
+        self.closing = [item for item in self.closing if item[0] != document_id]
+        discard_document(document_id, self.user_email, self.user_id)
+
+    def flush(self) -> None:
+        if self.pending:
+            batch, self.pending = self.pending, []
+            ids = [f"{document_id}-{i}" for document_id, _, i, _ in batch]
+            texts = [chunk.page_content for _, _, _, chunk in batch]
+            metadatas = [
+                {
+                    "document_id": document_id,
+                    "filename": filename,
+                    "chunk_index": i,
+                    "page": chunk.metadata.get("page", 0),
+                    "user_email": self.user_email,
+                }
+                for document_id, filename, i, chunk in batch
+            ]
+            documents = len({m["document_id"] for m in metadatas})
+
+            # One model call and one Chroma write for chunks of several files
+            with span("ingest.embed", batch=len(texts), documents=documents):
+                embeddings = get_cached_embeddings().embed_documents(texts)
+            with span("ingest.store", batch=len(texts), documents=documents):
+                self.collection.upsert(ids=ids, documents=texts, metadatas=metadatas, embeddings=embeddings)
+                self.keyword_index.add(ids, texts, [m["document_id"] for m in metadatas])
+            with span("ingest.db_commit", batch=len(texts), documents=documents):
+                db = SessionLocal()
+                try:
+                    record_chunks(db, [
+                        row
+                        for cid, text, m in zip(ids, texts, metadatas)
+                        for row in chunk_rows(m["document_id"], [cid], [text], [m["chunk_index"]], [m["page"]])
+                    ])
+                    db.commit()
+                finally:
+                    db.close()
+
+        if self.closing:
+            closing, self.closing = self.closing, []
+            db = SessionLocal()
+            try:
+                for document_id, pages, chunk_count, _ in closing:
+                    db.query(Document).filter(Document.id == document_id).update(
+                        {Document.page_count: pages, Document.chunk_count: chunk_count},
+                        synchronize_session=False,
+                    )
+                # One corpus bump for every document finished by this flush
+                bump_corpus_version(db, self.user_id)
+                db.commit()
+            finally:
+                db.close()
+            for _, _, _, on_done in closing:
+                if on_done:
+                    on_done()
+
+
+def _batch_events(files: list, user_email: str, user_id: int, timings: dict, opened: set) -> Iterator[tuple]:
+    """
+    Extract and split every file in turn (producer side of `process_batch`).
+
+    Yields (event, entry, document_id, payload): "start", one "chunk" per
+    chunk with payload (index, chunk), then "end" with (pages, chunks) —
+    or "failed" with the exception. Each new document id is added to
+    `opened` as soon as its row exists, before the consumer sees it.
+    """
+    for entry in files:
+        file_path = Path(entry["file_path"])
+        document_id = pages_out = None
+        try:
+            if not file_path.exists():
+                raise FileNotFoundError(f"File not found: {file_path}")
+            if file_path.suffix.lower() not in SUPPORTED_SUFFIXES:
+                raise ValueError(f"Unsupported type: {file_path.suffix}")
+            document_id, _ = _get_or_create_document(
+                user_email, entry["filename"], file_path, entry["file_hash"], user_id=user_id
+            )
+            opened.add(document_id)
+            yield ("start", entry, document_id, None)
+            pages = index = 0
+            pages_out = PageStoreWriter(document_id)
+            for page in timed_iter(iter_pages(file_path), timings, "load"):
+                pages += 1
+                pages_out.add(page)
+                for chunk in iter_chunks([page], timings):
+                    yield ("chunk", entry, document_id, (index, chunk))
+                    index += 1
+            pages_out.commit()
+        except GeneratorExit:
+            # Closed mid-file by an aborting consumer
+            if pages_out is not None:
+                pages_out.abort()
+            raise
+        except Exception as e:
+            if pages_out is not None:
+                pages_out.abort()
+            yield ("failed", entry, document_id, e)
+            continue
+        yield ("end", entry, document_id, (pages, index))
+
+
+def process_batch(
+    files: list,
+    user_email: str,
+    user_id: int,
+    progress: Optional[Callable[..., None]] = None,
+    on_file: Optional[Callable[..., None]] = None,
+) -> dict:
+    """
+    Ingest many files of one user through a shared EmbeddingBatcher.
+
+    Files are extracted and split one after another on a background
+    thread; their chunks are embedded and stored in full cross-file
+    batches. A file that fails is rolled back on its own and the rest of
+    the batch continues.
+
+    Args:
+        files: Dicts with `id` (per-file job), `file_path`, `filename`, `file_hash`.
+        progress: Optional `progress(stage, fraction)` for the batch job.
+        on_file: Optional `on_file(entry, status, document_id=None, error=None)`
+            called as each file starts ("running"), finishes ("done") or fails ("failed").
+
+    Returns:
+        Counts of done and failed files.
+    """
+    print(f"📦 Batch ingest: {len(files)} file(s) for {user_email}")
+    report = progress or (lambda *args, **kwargs: None)
+    notify = on_file or (lambda *args, **kwargs: None)
+
+    collection = get_or_create_collection(user_email, user_id=user_id)
+    keyword_index = get_bm25_index(user_email)
+    batcher = EmbeddingBatcher(collection, keyword_index, user_email, user_id)
+    timings = {"load": 0.0, "split": 0.0}
+    counts = {"done": 0, "failed": 0}
+    finished = 0
+
+    def done(entry: dict, document_id: int) -> None:
+        open_documents.discard(document_id)
+        counts["done"] += 1
+        notify(entry, "done", document_id=document_id)
+
+    def failed(entry: dict, document_id: Optional[int], error: str) -> None:
+        if document_id is not None:
+            open_documents.discard(document_id)
+            batcher.discard(document_id)
+        counts["failed"] += 1
+        print(f"❌ {entry['filename']}: {error}")
+        notify(entry, "failed", error=error)
+
+    report("extracting", 0.0)
+    # Documents created but not yet done/failed — discarded if the batch aborts
+    open_documents = set()
+    try:
+        with closing(prefetch(
+            iter_batches(_batch_events(files, user_email, user_id, timings, open_documents), INGEST_BATCH_SIZE),
+            INGEST_QUEUE_DEPTH,
+        )) as events:
+            for group in events:
+                for event, entry, document_id, payload in group:
+                    if event == "chunk":
+                        batcher.add(document_id, entry["filename"], *payload)
+                    elif event == "start":
+                        notify(entry, "running", document_id=document_id)
+                    elif event == "end":
+                        finished += 1
+                        pages, chunk_count = payload
+                        if not chunk_count:
+                            failed(entry, document_id, "No text extracted")
+                        else:
+                            batcher.close(document_id, pages, chunk_count, on_done=lambda e=entry, d=document_id: done(e, d))
+                    elif event == "failed":
+                        finished += 1
+                        failed(entry, document_id, str(payload))
+                report("embedding", finished / len(files) if files else 1.0)
+        batcher.flush()
+    except Exception:
+        # The producer has been joined by now, so the set is complete
+        for document_id in list(open_documents):
+            try:
+                batcher.discard(document_id)
+            except Exception as cleanup_error:
+                print(f"⚠️ Cleanup of document {document_id} failed: {cleanup_error}")
         raise
-    
 
-    
\ No newline at end of file
+    report("extracting", 1.0)
+    report("embedding", 1.0)
+    record_span("ingest.load", timings["load"], files=len(files))
+    record_span("ingest.split", timings["split"], files=len(files))
+    print(f"🎉 Batch finished: {counts['done']} done, {counts['failed']} failed")
+    return counts
@@ -0,0 +1,99 @@
+# backend/rag/query_embedder.py
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import List
+
+from backend.rag.embeddings import get_embeddings, EMBEDDING_MODEL
+from backend.utils.metrics import cache_result
+
+
+# =========================
+# CONFIG
+# =========================
+# How many distinct (normalized) queries to keep vectors for
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "2048"))
+
+# Models whose tokenizer lowercases its input, so lowercasing a query
+# can't change its vector
+# (sentence-transformers names, with or without the org prefix)
+UNCASED_MODELS = {
+    "all-MiniLM-L6-v2",
+    "all-MiniLM-L12-v2",
+    "paraphrase-MiniLM-L6-v2",
+    "multi-qa-MiniLM-L6-cos-v1",
+}
+# "auto" lowercases only for UNCASED_MODELS; "true"/"false" force it
+QUERY_LOWERCASE = os.getenv("QUERY_LOWERCASE", "auto").lower()
+LOWERCASE_QUERIES = (
+    EMBEDDING_MODEL.rsplit("/", 1)[-1] in UNCASED_MODELS if QUERY_LOWERCASE == "auto"
+    else QUERY_LOWERCASE == "true"
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form used as the cache key (and the text embedded).
+    Case is folded only for uncased models: for a cased model "Apple" and
+    "apple" embed differently, and documents are embedded as written.
+    """
+    query = _WHITESPACE.sub(" ", query or "").strip()
+    return query.lower() if LOWERCASE_QUERIES else query
+
+
+class QueryEmbedder:
+    """
+    Embeds search queries with the same model used at ingest time and keeps
+    an LRU cache of normalized query → vector, so repeated queries skip the
+    transformer forward pass entirely.
+    """
+
+    def __init__(self, maxsize: int = QUERY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed(self, query: str) -> List[float]:
+        key = normalize_query(query)
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                cache_result("query_embedding", hits=1)
+                return vector
+            self.misses += 1
+        cache_result("query_embedding", misses=1)
+
+        # Run the model outside the lock so other queries aren't blocked
+        vector = get_embeddings().embed_query(key)
+
+        with self._lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return vector
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "size": len(self._cache),
+        }
+
+
+# Shared instance for this process
+query_embedder = QueryEmbedder()
+
+
+def embed_query(query: str) -> List[float]:
+    """Embed a search query (cached)."""
+    return query_embedder.embed(query)
@@ -0,0 +1,121 @@
+# backend/rag/reranker.py
+"""
+Second retrieval stage: score (query, chunk) pairs with a small local
+cross-encoder and keep only the best few, so the LLM prompt carries fewer,
+more relevant chunks.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+from backend.rag.embedding_cache import text_hash
+from backend.rag.query_embedder import normalize_query
+from backend.utils.metrics import cache_result
+
+
+# =========================
+# CONFIG
+# =========================
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "true").lower() in {"1", "true", "yes"}
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+# How many candidates to over-fetch from search before reranking
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "30"))
+# How many chunks survive into the LLM context
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "4"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "20000"))
+
+
+class Reranker:
+    """
+    Cross-encoder reranker with an LRU cache of (query, chunk id) → score.
+    The model is loaded on first use.
+    """
+
+    def __init__(self, model_name: str = RERANK_MODEL, cache_size: int = RERANK_CACHE_SIZE):
+        self.model_name = model_name
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    def score(self, query: str, keys: List[str], texts: List[str]) -> List[float]:
+        """Scores for each (query, text); cached pairs skip the model."""
+        qkey = normalize_query(query)
+        scores: List[float | None] = []
+        with self._cache_lock:
+            for key in keys:
+                value = self._cache.get((qkey, key))
+                if value is not None:
+                    self._cache.move_to_end((qkey, key))
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                scores.append(value)
+
+        todo = [i for i, s in enumerate(scores) if s is None]
+        cache_result("rerank", len(scores) - len(todo), len(todo))
+        if todo:
+            # One batched forward pass for every uncached pair
+            new_scores = self.model.predict([(query, texts[i]) for i in todo])
+            with self._cache_lock:
+                for i, value in zip(todo, new_scores):
+                    scores[i] = float(value)
+                    self._cache[(qkey, keys[i])] = float(value)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return scores
+
+    def rerank(
+        self,
+        query: str,
+        docs: List[str],
+        metas: List[Dict[str, Any]],
+        top_k: int = RERANK_TOP_K,
+    ) -> tuple[List[str], List[Dict[str, Any]]]:
+        """
+        Reorder search results by cross-encoder score and keep the top_k.
+
+        Args:
+            query: The user's query.
+            docs: Candidate chunk texts from `helpers.search`.
+            metas: Matching metadata dicts (with `chunk_id` when available).
+            top_k: Number of chunks to keep.
+
+        Returns:
+            Tuple of (documents list, metadatas list), best first.
+        """
+        if not docs or not query.strip():
+            return docs[:top_k], metas[:top_k]
+
+        keys = [
+            (meta or {}).get("chunk_id") or text_hash(doc)
+            for doc, meta in zip(docs, metas)
+        ]
+        scores = self.score(query, keys, docs)
+        order = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)[:top_k]
+        return [docs[i] for i in order], [{**metas[i], "rerank_score": scores[i]} for i in order]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# Shared instance for this process
+reranker = Reranker()
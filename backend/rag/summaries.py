@@ -0,0 +1,296 @@
+# backend/rag/summaries.py
+"""
+Precomputed document summaries (map-reduce), served by `rag_summarize`.
+
+After a document is ingested, the worker runs a "summarize" job:
+
+    map     consecutive pages are grouped into sections of about
+            SUMMARY_SECTION_CHARS and each section is summarized
+    reduce  section summaries are combined, level by level, until they
+            fit one prompt, which yields the document summary
+
+Both levels are stored on the Document row. Pages come from the page
+store, so the original file is not parsed again. A new version clears the
+summaries and queues a fresh job; deleting the document drops them with
+the row.
+
+At chat time `stored_summary()` is a single indexed query: no retrieval,
+no model call. A summary across documents combines the stored ones.
+
+Upgrading an existing database: the `summary` and `section_summaries`
+columns are added to `documents` on startup if missing (see
+db.database.add_missing_columns). Then backfill documents ingested before
+summaries existed:
+    python -m backend.rag.summaries --backfill
+"""
+import argparse
+import os
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from backend.db.database import SessionLocal
+from backend.models.document import Document
+from backend.models.models import User
+from backend.rag.llm import get_llm
+from backend.rag.page_store import has_pages, iter_stored_pages
+from backend.utils.metrics import span
+
+
+# =========================
+# CONFIG
+# =========================
+SUMMARY_ENABLED = os.getenv("SUMMARY_ENABLED", "true").lower() == "true"
+# Page text per map prompt (~3k tokens, well inside llama3.2's context)
+SUMMARY_SECTION_CHARS = int(os.getenv("SUMMARY_SECTION_CHARS", "12000"))
+SUMMARY_SECTION_WORDS = int(os.getenv("SUMMARY_SECTION_WORDS", "120"))
+SUMMARY_DOCUMENT_WORDS = int(os.getenv("SUMMARY_DOCUMENT_WORDS", "250"))
+# Summary prompts in flight at once (match OLLAMA_NUM_PARALLEL)
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "2"))
+# Most recent documents combined when no document is given
+SUMMARY_COMBINED_DOCUMENTS = int(os.getenv("SUMMARY_COMBINED_DOCUMENTS", "20"))
+# Budget for the combined text handed back to the model (~4 chars per token)
+SUMMARY_COMBINED_MAX_TOKENS = int(os.getenv("SUMMARY_COMBINED_MAX_TOKENS", "2000"))
+
+MAP_PROMPT = (
+    'Summarize this section of the document "{filename}" ({pages}) in at most {words} words. '
+    "Keep names, dates, figures and decisions. Reply with the summary only.\n\n{text}"
+)
+REDUCE_PROMPT = (
+    'These are summaries of consecutive parts of the document "{filename}". '
+    "Combine them into one summary of at most {words} words, keeping the most important facts. "
+    "Reply with the summary only.\n\n{text}"
+)
+
+
+# =========================
+# MAP
+# =========================
+def iter_sections(pages: Iterable) -> Iterator[dict]:
+    """
+    Group consecutive pages into sections of about SUMMARY_SECTION_CHARS.
+    A single long page (TXT/DOCX load as one) is cut into several sections.
+
+    Yields:
+        {"start_page", "end_page", "text"} with 1-based page numbers.
+    """
+    parts: List[str] = []
+    size = 0
+    start_page = end_page = None
+    for page in pages:
+        number = page.metadata.get("page", 0) + 1
+        text = page.page_content.strip()
+        for offset in range(0, len(text), SUMMARY_SECTION_CHARS):
+            piece = text[offset:offset + SUMMARY_SECTION_CHARS]
+            if parts and size + len(piece) > SUMMARY_SECTION_CHARS:
+                yield {"start_page": start_page, "end_page": end_page, "text": "\n\n".join(parts)}
+                parts, size, start_page = [], 0, None
+            if start_page is None:
+                start_page = number
+            parts.append(piece)
+            size += len(piece)
+            end_page = number
+    if parts:
+        yield {"start_page": start_page, "end_page": end_page, "text": "\n\n".join(parts)}
+
+
+def _page_range(start: int, end: int) -> str:
+    return f"page {start}" if start == end else f"pages {start}-{end}"
+
+
+def _complete(llm, prompts: List[str]) -> List[str]:
+    """Run prompts concurrently (up to SUMMARY_CONCURRENCY) and return the texts."""
+    replies = llm.batch(prompts, config={"max_concurrency": SUMMARY_CONCURRENCY})
+    return [reply.content.strip() for reply in replies]
+
+
+def _summarize_sections(llm, filename: str, batch: List[dict], first: int) -> List[dict]:
+    texts = _complete(llm, [
+        MAP_PROMPT.format(
+            filename=filename,
+            pages=_page_range(s["start_page"], s["end_page"]),
+            words=SUMMARY_SECTION_WORDS,
+            text=s["text"],
+        )
+        for s in batch
+    ])
+    return [
+        {"section": first + i + 1, "start_page": s["start_page"], "end_page": s["end_page"], "summary": text}
+        for i, (s, text) in enumerate(zip(batch, texts))
+    ]
+
+
+# =========================
+# REDUCE
+# =========================
+def reduce_summaries(llm, filename: str, summaries: List[str]) -> str:
+    """
+    Combine section summaries into one. Levels that don't fit one prompt
+    are first combined in groups (hierarchically) until they do.
+    """
+    level = summaries
+    while len(level) > 1 and sum(len(s) for s in level) > SUMMARY_SECTION_CHARS:
+        groups, group, size = [], [], 0
+        for summary in level:
+            if group and size + len(summary) > SUMMARY_SECTION_CHARS:
+                groups.append(group)
+                group, size = [], 0
+            group.append(summary)
+            size += len(summary)
+        groups.append(group)
+        if len(groups) == len(level):
+            # Every summary is already prompt-sized: pair them up so the level shrinks
+            groups = [level[i:i + 2] for i in range(0, len(level), 2)]
+        level = _complete(llm, [
+            REDUCE_PROMPT.format(filename=filename, words=SUMMARY_DOCUMENT_WORDS, text="\n\n".join(g))
+            for g in groups
+        ])
+    if len(level) == 1:
+        # One section, or the levels above already combined everything
+        return level[0]
+    return _complete(llm, [
+        REDUCE_PROMPT.format(filename=filename, words=SUMMARY_DOCUMENT_WORDS, text="\n\n".join(level))
+    ])[0]
+
+
+def build_document_summary(
+    document_id: int,
+    file_hash: Optional[str] = None,
+    progress: Optional[Callable[..., None]] = None,
+) -> Optional[dict]:
+    """
+    Summarize one document and store the result on its row.
+
+    Args:
+        file_hash: Version the job was queued for; if the document has
+            since been replaced, nothing is written.
+        progress: Optional `progress(stage, fraction)` for the job queue.
+
+    Returns:
+        {"summary", "sections"}, or None if the document is gone or
+        superseded. Raises on failure.
+    """
+    report = progress or (lambda *args, **kwargs: None)
+    db = SessionLocal()
+    try:
+        doc = db.query(Document.filename, Document.file_path, Document.file_hash, Document.page_count).filter(
+            Document.id == document_id
+        ).first()
+    finally:
+        db.close()
+    if doc is None or (file_hash and doc.file_hash != file_hash):
+        print(f"⏭️ Document {document_id} gone or replaced — summary skipped")
+        return None
+    file_hash = doc.file_hash
+
+    if has_pages(document_id):
+        pages = iter_stored_pages(document_id)
+    else:
+        # Ingested before page text was stored
+        from backend.rag.pipeline import iter_pages
+
+        pages = iter_pages(Path(doc.file_path))
+
+    llm = get_llm()
+    sections = []
+    batch_size = max(SUMMARY_CONCURRENCY, 1) * 2
+    with span("summary.map", document_id=document_id) as info:
+        batch: List[dict] = []
+        for section in iter_sections(pages):
+            batch.append(section)
+            if len(batch) >= batch_size:
+                sections += _summarize_sections(llm, doc.filename, batch, len(sections))
+                batch = []
+                if doc.page_count:
+                    report("summarizing", 0.5 * min(sections[-1]["end_page"] / doc.page_count, 1.0))
+        if batch:
+            sections += _summarize_sections(llm, doc.filename, batch, len(sections))
+        info["sections"] = len(sections)
+    if not sections:
+        raise ValueError("No text to summarize")
+    report("summarizing", 0.5)
+
+    with span("summary.reduce", document_id=document_id, sections=len(sections)):
+        summary = reduce_summaries(llm, doc.filename, [s["summary"] for s in sections])
+    report("summarizing", 1.0)
+
+    db = SessionLocal()
+    try:
+        # Only the version that was summarized gets the summary
+        written = db.query(Document).filter(
+            Document.id == document_id, Document.file_hash == file_hash
+        ).update(
+            {Document.summary: summary, Document.section_summaries: sections},
+            synchronize_session=False,
+        )
+        db.commit()
+    finally:
+        db.close()
+    if not written:
+        print(f"⏭️ Document {document_id} replaced while summarizing — summary dropped")
+        return None
+    print(f"📝 Summarized document {document_id}: {len(sections)} section(s)")
+    return {"summary": summary, "sections": sections}
+
+
+# =========================
+# LOOKUP (rag_summarize)
+# =========================
+def stored_summary(user_id: Optional[int], user_email: Optional[str] = None, document_id: Optional[int] = None) -> str:
+    """
+    The stored summary of one document, or the stored summaries of the
+    user's most recent documents combined. One query; no model call.
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(Document.id, Document.filename, Document.summary)
+        if user_id is not None:
+            query = query.filter(Document.user_id == user_id)
+        else:
+            query = query.join(User, User.id == Document.user_id).filter(User.email == user_email)
+        if document_id is not None:
+            rows = query.filter(Document.id == document_id).all()
+            if not rows:
+                return "Document not found."
+        else:
+            rows = query.order_by(Document.upload_date.desc(), Document.id.desc()).limit(SUMMARY_COMBINED_DOCUMENTS).all()
+            if not rows:
+                return "No documents to summarize."
+    finally:
+        db.close()
+
+    ready = [r for r in rows if r.summary]
+    if document_id is not None:
+        return ready[0].summary if ready else f"The summary of {rows[0].filename} is still being prepared."
+    # Newest first, until the token budget is spent
+    parts, budget = [], SUMMARY_COMBINED_MAX_TOKENS * 4
+    for r in ready:
+        part = f"{r.filename}: {r.summary}"
+        if parts and len(part) > budget:
+            break
+        parts.append(part[:budget])
+        budget -= len(part)
+    omitted = len(ready) - len(parts)
+    pending = len(rows) - len(ready)
+    if omitted:
+        parts.append(f"({omitted} older document(s) left out for length.)")
+    if pending:
+        parts.append(f"({pending} more document(s) are still being summarized.)")
+    return "\n\n".join(parts)
+
+
+if __name__ == "__main__":
+    from backend.jobs.queue import enqueue_summary_jobs
+    from backend.models import job  # noqa: F401  (register IngestJob mapper)
+
+    parser = argparse.ArgumentParser(description="Document summaries")
+    parser.add_argument("--backfill", action="store_true", help="queue summaries for documents that have none")
+    args = parser.parse_args()
+    if args.backfill:
+        db = SessionLocal()
+        try:
+            missing = [row.id for row in db.query(Document.id).filter(Document.summary.is_(None)).all()]
+        finally:
+            db.close()
+        print(f"📝 Queued {enqueue_summary_jobs(missing)} summary job(s)")
+    else:
+        parser.print_help()
@@ -0,0 +1,243 @@
+# backend/rag/vector_store.py
+"""
+Chroma client, collection handle cache and tenant layout.
+
+CHROMA_TENANT_LAYOUT selects how users are isolated:
+  per_user — one collection per user (docs_k_gmail_com)
+  shared   — one collection for everyone, partitioned by a `user_id`
+             metadata field that every read and write is scoped to
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from backend.utils.lazy import Lazy
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# =========================
+# CONFIG
+# =========================
+# Directory where ChromaDB data will be stored on disk
+CHROMA_DIR = Path(os.getenv("CHROMA_DIR", "chroma_db"))
+CHROMA_DIR.mkdir(exist_ok=True)  # Create folder if not exists
+
+CHROMA_TENANT_LAYOUT = os.getenv("CHROMA_TENANT_LAYOUT", "per_user")
+SHARED_COLLECTION_NAME = os.getenv("CHROMA_SHARED_COLLECTION", "docs_shared")
+# How often cached handles are checked against the compaction epoch (seconds)
+HANDLE_EPOCH_CHECK_SECONDS = float(os.getenv("HANDLE_EPOCH_CHECK_SECONDS", "5"))
+
+if CHROMA_TENANT_LAYOUT not in {"per_user", "shared"}:
+    raise ValueError(f"CHROMA_TENANT_LAYOUT must be 'per_user' or 'shared', got {CHROMA_TENANT_LAYOUT!r}")
+
+def _open_client():
+    import chromadb
+    return chromadb.PersistentClient(path=str(CHROMA_DIR))
+
+
+# Persistent Chroma client (data survives server restart), opened on first use
+_client = Lazy("chroma", _open_client)
+
+
+def get_client():
+    """The process-wide Chroma client."""
+    return _client.get()
+
+# Process-wide collection handles, by name
+_handles: Dict[str, Any] = {}
+_handles_lock = threading.Lock()
+
+# Touched when a collection is rebuilt (new collection id), so every
+# process drops handles that point at the old one
+_EPOCH_FILE = CHROMA_DIR / ".handles_epoch"
+_epoch = {"mtime": None, "checked": 0.0}
+
+
+def _read_epoch():
+    try:
+        return _EPOCH_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def bump_handle_epoch() -> None:
+    """Invalidate collection handles cached in every process."""
+    _EPOCH_FILE.write_text(str(time.time()))
+    forget_collection_handles()
+
+
+def _check_epoch(force: bool = False) -> None:
+    now = time.monotonic()
+    if not force and now - _epoch["checked"] < HANDLE_EPOCH_CHECK_SECONDS:
+        return
+    _epoch["checked"] = now
+    mtime = _read_epoch()
+    if mtime != _epoch["mtime"]:
+        _epoch["mtime"] = mtime
+        forget_collection_handles()
+
+
+def collection_name_for(user_email: str) -> str:
+    """
+    Per-user collection name.
+    Example:
+      k@gmail.com → docs_k_gmail_com
+    """
+    return f"docs_{user_email.replace('@', '_').replace('.', '_')}"
+
+
+@contextmanager
+def collection_lock(name: str, exclusive: bool = False):
+    """
+    Cross-process lock on one collection (a lock file in CHROMA_DIR).
+    Writes hold it shared; compaction holds it exclusively for its whole
+    copy-and-swap, so no write can land in a collection being retired.
+    """
+    with open(CHROMA_DIR / f".{name}.lock", "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        else:
+            # No shared locks on Windows: writers take turns as well
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class CollectionHandle:
+    """
+    Cached handle to one Chroma collection. Reads go straight through;
+    writes take the collection's shared lock and, under it, make sure the
+    handle still points at the live collection (not one compaction has
+    since retired).
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._open()
+
+    def _open(self) -> None:
+        self._epoch = _epoch["mtime"]
+        self._collection = get_client().get_or_create_collection(name=self._name)
+
+    def __getattr__(self, attr):
+        return getattr(self._collection, attr)
+
+    def _write(self, method: str, **kwargs):
+        with collection_lock(self._name):
+            _check_epoch(force=True)
+            if self._epoch != _epoch["mtime"]:
+                self._open()
+            return getattr(self._collection, method)(**kwargs)
+
+    def add(self, **kwargs):
+        return self._write("add", **kwargs)
+
+    def upsert(self, **kwargs):
+        return self._write("upsert", **kwargs)
+
+    def update(self, **kwargs):
+        return self._write("update", **kwargs)
+
+    def delete(self, **kwargs):
+        return self._write("delete", **kwargs)
+
+
+def get_collection_handle(name: str) -> CollectionHandle:
+    """Open (or create) a collection once per process and reuse the handle."""
+    _check_epoch()
+    handle = _handles.get(name)
+    if handle is not None:
+        return handle
+    with _handles_lock:
+        handle = _handles.get(name)
+        if handle is None:
+            handle = _handles[name] = CollectionHandle(name)
+        return handle
+
+
+def forget_collection_handles() -> None:
+    """Drop all cached handles (after collections are deleted or rebuilt)."""
+    with _handles_lock:
+        _handles.clear()
+
+
+class TenantCollection:
+    """
+    One user's view of the shared collection. Mirrors the subset of the
+    Chroma Collection API the app uses and scopes every call to `user_id`.
+    """
+
+    def __init__(self, collection, user_id: int):
+        self._collection = collection
+        self.user_id = user_id
+
+    @property
+    def name(self) -> str:
+        return self._collection.name
+
+    def _scope(self, where: Optional[dict]) -> dict:
+        tenant = {"user_id": self.user_id}
+        return {"$and": [tenant, where]} if where else tenant
+
+    def _tag(self, metadatas: Optional[List[dict]]) -> Optional[List[dict]]:
+        if metadatas is None:
+            return None
+        return [{**(m or {}), "user_id": self.user_id} for m in metadatas]
+
+    def add(self, ids, metadatas=None, **kwargs):
+        return self._collection.add(ids=ids, metadatas=self._tag(metadatas), **kwargs)
+
+    def upsert(self, ids, metadatas=None, **kwargs):
+        return self._collection.upsert(ids=ids, metadatas=self._tag(metadatas), **kwargs)
+
+    def update(self, ids, metadatas=None, **kwargs):
+        return self._collection.update(ids=ids, metadatas=self._tag(metadatas), **kwargs)
+
+    def query(self, where=None, **kwargs):
+        return self._collection.query(where=self._scope(where), **kwargs)
+
+    def get(self, ids=None, where=None, **kwargs):
+        return self._collection.get(ids=ids, where=self._scope(where), **kwargs)
+
+    def delete(self, ids=None, where=None):
+        return self._collection.delete(ids=ids, where=self._scope(where))
+
+    def count(self) -> int:
+        """The user's chunk count, from the chunk bookkeeping tables rather than the shared index."""
+        from backend.db.database import SessionLocal
+        from backend.rag.chunk_store import user_chunk_count
+
+        with SessionLocal() as db:
+            return user_chunk_count(db, self.user_id)
+
+
+def get_or_create_collection(user_email: str, user_id: Optional[int] = None):
+    """
+    The vector collection holding a user's chunks, per CHROMA_TENANT_LAYOUT.
+    The shared layout needs `user_id` to partition the data.
+    """
+    if CHROMA_TENANT_LAYOUT == "shared":
+        if user_id is None:
+            raise ValueError("user_id is required with CHROMA_TENANT_LAYOUT=shared")
+        return TenantCollection(get_collection_handle(SHARED_COLLECTION_NAME), user_id)
+    return get_collection_handle(collection_name_for(user_email))
@@ -0,0 +1,80 @@
+# backend/tests/conftest.py
+"""
+Shared fixtures. The whole run gets one throwaway DB / Chroma / BM25 dir,
+set up before any backend module reads its config at import.
+Run from the repo root (pytest is in requirements-dev.txt):
+`python -m pytest backend/tests`.
+"""
+import itertools
+import os
+
+import pytest
+
+os.environ["ANSWER_CACHE_ENABLED"] = "true"
+os.environ["RERANK_ENABLED"] = "false"
+
+from backend.benchmarks.common import isolated_env, create_schema_and_user  # noqa: E402
+
+WORKDIR = isolated_env("tests")
+# Uploads land in ./uploaded_files: keep them out of the checkout
+os.chdir(WORKDIR)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from backend.benchmarks.fakes import HashEmbeddings, ScriptedChatModel  # noqa: E402
+from backend.main import app, db_schema  # noqa: E402  (registers every table)
+from backend.rag.embeddings import set_embeddings  # noqa: E402
+from backend.rag.llm import set_llm  # noqa: E402
+
+_emails = itertools.count()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def backend_ready():
+    """Tables, plus deterministic offline embeddings and chat model."""
+    db_schema.get()
+    set_embeddings(HashEmbeddings(), "hash")
+    set_llm(ScriptedChatModel(answer=" ".join(["word"] * 200), token_delay=0.002))
+
+
+@pytest.fixture
+def workdir():
+    return WORKDIR
+
+
+def _new_user() -> tuple:
+    email = f"user{next(_emails)}@example.com"
+    return email, create_schema_and_user(email)
+
+
+def _login(user: tuple) -> TestClient:
+    from backend.utils.utils import create_refresh_token
+
+    email, uid = user
+    test_client = TestClient(app)
+    test_client.cookies.set("refresh_token", create_refresh_token({"sub": email, "uid": uid}))
+    return test_client
+
+
+@pytest.fixture
+def new_user():
+    """Factory for more users: `new_user()` → (email, id)."""
+    return _new_user
+
+
+@pytest.fixture
+def login():
+    """Factory for clients: `login(user)` → TestClient logged in as `user`."""
+    return _login
+
+
+@pytest.fixture
+def user():
+    """A fresh user per test, so collections and caches never overlap: (email, id)."""
+    return _new_user()
+
+
+@pytest.fixture
+def client(user):
+    """TestClient logged in as `user`."""
+    return _login(user)
@@ -0,0 +1,66 @@
+# backend/tests/test_answer_cache.py
+"""Only answers streamed to the end, from tools that worked, are cached."""
+import asyncio
+import uuid
+
+from backend.api import chat as chat_api
+from backend.api.chat import ChatRequest, answer_cache, chat
+from backend.benchmarks.fixtures import write_fixture
+from backend.db.database import AsyncSessionLocal
+from backend.rag.pipeline import process_uploaded_file
+
+
+def _stream(user, question: str, read_events: int | None = None) -> list:
+    """Run one chat request; stop after `read_events` events (None reads to the end)."""
+    email, uid = user
+
+    async def run():
+        async with AsyncSessionLocal() as db:
+            response = await chat(ChatRequest(message=question), {"email": email, "id": uid}, db)
+        events = []
+        async for event in response.body_iterator:
+            events.append(event)
+            if read_events is not None and len(events) >= read_events:
+                # The client went away mid-answer
+                await response.body_iterator.aclose()
+                break
+        return events
+
+    return asyncio.run(run())
+
+
+def test_partial_answer_is_not_cached(user, workdir):
+    email, uid = user
+    process_uploaded_file(write_fixture(workdir, "txt", 3), "f.txt", email, uuid.uuid4().hex, user_id=uid)
+    size = answer_cache.stats()["size"]
+
+    events = _stream(user, "what is it?", read_events=3)
+    assert len(events) == 3
+    assert answer_cache.stats()["size"] == size
+
+    events = _stream(user, "what is it?")
+    assert events[-1].strip() == "data: [DONE]"
+    assert answer_cache.stats()["size"] == size + 1
+
+
+class BrokenTool:
+    """A search tool whose backend is briefly down."""
+
+    async def ainvoke(self, args: dict) -> str:
+        raise ConnectionError("chroma unavailable")
+
+
+def test_answer_from_a_failed_tool_is_not_cached(user, workdir, monkeypatch):
+    email, uid = user
+    process_uploaded_file(write_fixture(workdir, "txt", 3), "g.txt", email, uuid.uuid4().hex, user_id=uid)
+    size = answer_cache.stats()["size"]
+
+    monkeypatch.setitem(chat_api.TOOLS, "rag_search", BrokenTool())
+    events = _stream(user, "what does it say?")
+    assert events[-1].strip() == "data: [DONE]"
+    assert answer_cache.stats()["size"] == size
+
+    # Once the tool works again the answer is cached as usual
+    monkeypatch.undo()
+    _stream(user, "what does it say?")
+    assert answer_cache.stats()["size"] == size + 1
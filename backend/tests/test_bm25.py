@@ -0,0 +1,104 @@
+# backend/tests/test_bm25.py
+"""BM25 index: results after deletes, corpus stats, and the postings cap."""
+import math
+
+import pytest
+
+from backend.rag import bm25
+from backend.rag.bm25 import BM25Index, tokenize
+
+
+@pytest.fixture
+def index(tmp_path):
+    return BM25Index(tmp_path / "bm25.sqlite3")
+
+
+def _reference(index: BM25Index, query: str) -> dict:
+    """Textbook BM25 straight from the postings, with no stats tables or caps."""
+    conn = index._connect()
+    n, total = conn.execute("SELECT COUNT(*), SUM(length) FROM chunks").fetchone()
+    scores = {}
+    for term in dict.fromkeys(tokenize(query)):
+        rows = conn.execute(
+            "SELECT p.chunk_id, p.tf, c.length FROM postings p JOIN chunks c USING (chunk_id) WHERE p.term = ?", (term,)
+        ).fetchall()
+        if not rows:
+            continue
+        idf = math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+        for chunk_id, tf, length in rows:
+            norm = tf + bm25.BM25_K1 * (1 - bm25.BM25_B + bm25.BM25_B * length / (total / n))
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (bm25.BM25_K1 + 1) / norm
+    return scores
+
+
+def _assert_stats_match(index: BM25Index) -> None:
+    conn = index._connect()
+    assert conn.execute("SELECT n, total_length FROM stats").fetchone() == conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks"
+    ).fetchone()
+    assert dict(conn.execute("SELECT term, df FROM terms")) == dict(
+        conn.execute("SELECT term, COUNT(*) FROM postings GROUP BY term")
+    )
+
+
+def _corpus(index: BM25Index) -> None:
+    texts = {
+        "a1": "invoice INV-2024-001 for acme corp",
+        "a2": "acme corp quarterly report",
+        "b1": "invoice INV-2024-002 for globex",
+        "b2": "globex travel policy and expenses",
+        "c1": "meeting notes: acme renewal invoice",
+    }
+    index.add(list(texts), list(texts.values()), [1, 1, 2, 2, 3])
+
+
+def test_scores_match_reference(index):
+    _corpus(index)
+    for query in ("acme invoice", "inv-2024-001", "globex expenses"):
+        results = index.search(query, k=10)
+        reference = _reference(index, query)
+        assert {cid for cid, _ in results} == set(reference)
+        for chunk_id, score in results:
+            assert score == pytest.approx(reference[chunk_id])
+
+
+def test_deleted_chunks_leave_results_and_stats(index):
+    _corpus(index)
+    index.delete_document(1)
+    index.delete_ids(["c1"])
+
+    assert index.search("acme") == []
+    assert [cid for cid, _ in index.search("invoice")] == ["b1"]
+    _assert_stats_match(index)
+    # Scores use the corpus as it is now, not as it was
+    for chunk_id, score in index.search("globex invoice"):
+        assert score == pytest.approx(_reference(index, "globex invoice")[chunk_id])
+
+    # Re-adding an id replaces its postings rather than double counting
+    index.add(["b1"], ["a new text about acme"], [2])
+    index.add(["b1"], ["a new text about acme"], [2])
+    assert [cid for cid, _ in index.search("acme")] == ["b1"]
+    assert index.search("invoice") == []
+    _assert_stats_match(index)
+
+
+def test_document_filter(index):
+    _corpus(index)
+    assert {cid for cid, _ in index.search("invoice", document_id=1)} == {"a1"}
+    assert index.search("globex", document_id=1) == []
+
+
+def test_common_terms_only_score_their_top_postings(index, monkeypatch):
+    monkeypatch.setattr(bm25, "BM25_MAX_POSTINGS", 10)
+    ids = [f"c{i}" for i in range(30)]
+    # "common" is in every chunk, c0..c9 have it most often; "rare" in one
+    texts = [" ".join(["common"] * (5 if i < 10 else 1) + ["filler"] * 5 + (["rare"] if i == 25 else [])) for i in range(30)]
+    index.add(ids, texts, [1] * 30)
+
+    results = index.search("common", k=30)
+    assert {cid for cid, _ in results} == set(ids[:10])
+    # A rare term is never capped: its chunk still scores, with both terms
+    rare = dict(index.search("common rare", k=30))
+    assert "c25" in rare
+    # The per-document path walks that document's chunks instead of capping
+    assert len(index.search("common", k=30, document_id=1)) == 30
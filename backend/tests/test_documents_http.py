@@ -0,0 +1,92 @@
+# backend/tests/test_documents_http.py
+"""Byte-range and ETag handling on the document endpoints."""
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from backend.db import database
+from backend.db.database import SessionLocal
+from backend.models.document import Document
+
+BODY = b"hello world " * 100
+
+
+@pytest.fixture
+def view_url(user, workdir):
+    _, uid = user
+    path = workdir / f"{uuid.uuid4().hex}.txt"
+    path.write_bytes(BODY)
+    with SessionLocal() as db:
+        doc = Document(filename="notes.txt", file_path=str(path), file_hash=uuid.uuid4().hex,
+                       user_id=uid, page_count=1, chunk_count=0)
+        db.add(doc)
+        db.commit()
+        return f"/api/documents/{doc.id}/view"
+
+
+# =========================
+# VIEW
+# =========================
+def test_view_serves_whole_file_with_validators(client, view_url):
+    response = client.get(view_url)
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["etag"]
+
+
+def test_view_range(client, view_url):
+    response = client.get(view_url, headers={"Range": "bytes=0-9"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 0-9/{len(BODY)}"
+    assert response.content == BODY[:10]
+
+    assert client.get(view_url, headers={"Range": f"bytes={len(BODY) + 10}-"}).status_code == 416
+
+
+def test_view_stale_if_range_gets_full_file(client, view_url):
+    response = client.get(view_url, headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == BODY
+
+
+def test_view_head_and_not_modified(client, view_url):
+    head = client.head(view_url)
+    assert head.status_code == 200
+    assert head.headers["content-length"] == str(len(BODY))
+    assert head.content == b""
+
+    response = client.get(view_url, headers={"If-None-Match": head.headers["etag"]})
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+# =========================
+# LISTING
+# =========================
+def test_listing_etag_matches_exactly(client):
+    etag = client.get("/api/documents").headers["etag"]
+    status = lambda value: client.get("/api/documents", headers={"If-None-Match": value}).status_code
+
+    assert status(etag) == 304
+    assert status(etag.removeprefix("W/")) == 304  # weak comparison
+    assert status(f'W/"other", {etag}') == 304
+    assert status("*") == 304
+    # Near misses are not a match
+    assert status(etag[:-3] + '"') == 200
+    assert status('W/"prefix' + etag[3:]) == 200
+
+
+def test_startup_adds_the_listing_index(monkeypatch, tmp_path):
+    # documents as created before keyset pagination
+    old = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with old.begin() as conn:
+        conn.execute(text("CREATE TABLE documents (id INTEGER PRIMARY KEY, user_id INTEGER, upload_date DATETIME)"))
+    monkeypatch.setattr(database, "engine", old)
+
+    assert database.add_missing_indexes(Document.__table__, ["ix_documents_user_upload_date"]) == [
+        "ix_documents_user_upload_date"
+    ]
+    index = next(i for i in inspect(old).get_indexes("documents") if i["name"] == "ix_documents_user_upload_date")
+    assert index["column_names"] == ["user_id", "upload_date", "id"]
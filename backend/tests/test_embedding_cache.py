@@ -0,0 +1,82 @@
+# backend/tests/test_embedding_cache.py
+"""The on-disk embedding cache: LRU eviction and its running row count."""
+import pytest
+
+from backend.rag import embedding_cache as cache_module
+from backend.rag.embedding_cache import CachedEmbeddings, EmbeddingCache, text_hash
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(tmp_path / "embeddings.sqlite3", max_entries=10)
+
+
+def _put(cache: EmbeddingCache, *keys: str) -> None:
+    for key in keys:
+        cache.put_many("m", [key], [[float(len(key))]])
+
+
+def _rows(cache: EmbeddingCache) -> set:
+    return {row[0] for row in cache._connect().execute("SELECT text_hash FROM embeddings")}
+
+
+def _trace(cache: EmbeddingCache) -> list:
+    """Every SQL statement the cache runs from now on."""
+    statements = []
+    cache._connect().set_trace_callback(statements.append)
+    return statements
+
+
+def test_evicts_least_recently_used_down_to_90_percent(cache):
+    _put(cache, *(f"k{i}" for i in range(10)))
+    # Reading k0 makes it recent again
+    assert cache.get_many("m", ["k0"]) == [[2.0]]
+
+    _put(cache, "k10")
+
+    rows = _rows(cache)
+    assert len(rows) == 9
+    assert "k0" in rows and "k10" in rows
+    assert not {"k1", "k2"} & rows
+
+
+def test_count_is_not_rerun_on_every_put(cache):
+    statements = _trace(cache)
+    _put(cache, *(f"k{i}" for i in range(5)))
+
+    counts = [s for s in statements if "COUNT(*)" in s]
+    # Only the first put counts; later ones add to the running total
+    assert len(counts) == 1
+    assert cache._count == 5
+
+
+def test_recount_picks_up_other_processes(cache, monkeypatch):
+    _put(cache, "mine")
+    # Another process with a higher limit fills the shared file
+    other = EmbeddingCache(cache.path, max_entries=100)
+    _put(other, *(f"theirs{i}" for i in range(10)))
+
+    # Within the recount interval only our own inserts are counted
+    _put(cache, "mine2")
+    assert cache._count == 2 and len(_rows(cache)) == 12
+
+    # Past it, the next put sees their rows and evicts
+    monkeypatch.setattr(cache_module, "EMBEDDING_CACHE_RECOUNT_SECONDS", 0)
+    _put(cache, "mine3")
+    assert len(_rows(cache)) == 9
+    assert cache._count == 9
+
+
+def test_cached_embeddings_embed_each_text_once(cache):
+    class CountingEmbeddings:
+        calls = []
+
+        def embed_documents(self, texts):
+            self.calls.append(list(texts))
+            return [[float(len(t))] for t in texts]
+
+    embeddings = CachedEmbeddings(CountingEmbeddings(), "m", cache)
+    assert embeddings.embed_documents(["a", "bb", "a"]) == [[1.0], [2.0], [1.0]]
+    assert embeddings.embed_documents(["bb", "ccc"]) == [[2.0], [3.0]]
+    assert CountingEmbeddings.calls == [["a", "bb"], ["ccc"]]
+    assert text_hash("a") in _rows(cache)
@@ -0,0 +1,110 @@
+# backend/tests/test_jobs.py
+"""Job claiming and stale-job retry in the SQL queue."""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.db.database import AsyncSessionLocal, SessionLocal
+from backend.jobs.queue import (
+    JOB_MAX_ATTEMPTS,
+    JOB_STALE_SECONDS,
+    claim_next_job,
+    enqueue_ingest_job,
+    requeue_stale_jobs,
+)
+from backend.models.job import IngestJob
+
+
+@pytest.fixture(autouse=True)
+def empty_queue():
+    with SessionLocal() as db:
+        db.query(IngestJob).delete()
+        db.commit()
+
+
+def _enqueue(uid: int, name: str) -> int:
+    async def run():
+        async with AsyncSessionLocal() as db:
+            job = await enqueue_ingest_job(db, uid, f"/tmp/{name}", name, name)
+            return job.id
+
+    return asyncio.run(run())
+
+
+def _job(job_id: int) -> IngestJob:
+    with SessionLocal() as db:
+        return db.get(IngestJob, job_id)
+
+
+def _lose_worker(job_id: int) -> None:
+    """Age the job's heartbeat past JOB_STALE_SECONDS, as if its worker died."""
+    with SessionLocal() as db:
+        db.get(IngestJob, job_id).heartbeat_at = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS + 1)
+        db.commit()
+
+
+# =========================
+# CLAIMING
+# =========================
+def test_claims_oldest_first_and_only_once(user):
+    _, uid = user
+    first, second = _enqueue(uid, "a.txt"), _enqueue(uid, "b.txt")
+
+    assert claim_next_job("w1") == first
+    assert claim_next_job("w2") == second
+    assert claim_next_job("w3") is None
+
+    job = _job(first)
+    assert (job.status, job.worker_id, job.attempts) == ("running", "w1", 1)
+    assert job.started_at is not None and job.heartbeat_at is not None
+
+
+def test_concurrent_workers_never_share_a_job(user):
+    from concurrent.futures import ThreadPoolExecutor
+
+    _, uid = user
+    ids = {_enqueue(uid, f"{i}.txt") for i in range(20)}
+
+    def drain(worker: int) -> list:
+        claimed = []
+        while (job_id := claim_next_job(f"w{worker}")) is not None:
+            claimed.append(job_id)
+        return claimed
+
+    with ThreadPoolExecutor(4) as pool:
+        results = [job_id for claimed in pool.map(drain, range(4)) for job_id in claimed]
+    assert sorted(results) == sorted(ids)
+
+
+# =========================
+# RETRY
+# =========================
+def test_live_jobs_are_left_alone(user):
+    _, uid = user
+    job_id = _enqueue(uid, "a.txt")
+    claim_next_job("w1")
+
+    assert requeue_stale_jobs() == 0
+    assert _job(job_id).status == "running"
+
+
+def test_lost_job_is_retried_then_failed(user):
+    _, uid = user
+    job_id = _enqueue(uid, "a.txt")
+
+    for attempt in range(1, JOB_MAX_ATTEMPTS):
+        assert claim_next_job("w1") == job_id
+        _lose_worker(job_id)
+        assert requeue_stale_jobs() == 1
+        job = _job(job_id)
+        assert (job.status, job.worker_id, job.attempts) == ("queued", None, attempt)
+
+    assert claim_next_job("w1") == job_id
+    _lose_worker(job_id)
+    assert requeue_stale_jobs() == 1
+    job = _job(job_id)
+    assert job.status == "failed"
+    assert job.attempts == JOB_MAX_ATTEMPTS
+    assert "max attempts" in job.error
+    assert claim_next_job("w1") is None
@@ -0,0 +1,84 @@
+# backend/tests/test_legacy_documents.py
+"""
+Delete and update of documents ingested before chunks carried a
+`document_id` (found by filename + user_email instead).
+"""
+import uuid
+
+from backend.benchmarks.fakes import HashEmbeddings
+from backend.db.database import SessionLocal
+from backend.models.document import Document
+from backend.rag.bm25 import get_bm25_index
+from backend.rag.pipeline import iter_chunks, iter_pages, process_uploaded_file, update_document
+from backend.rag.vector_store import get_or_create_collection
+
+
+def _legacy_document(user, path, filename: str, texts: list) -> tuple:
+    """A Document row plus chunks in the old layout: no document_id in their metadata."""
+    email, uid = user
+    with SessionLocal() as db:
+        doc = Document(filename=filename, file_path=str(path), file_hash=uuid.uuid4().hex, user_id=uid,
+                       chunk_count=len(texts))
+        db.add(doc)
+        db.commit()
+        doc_id = doc.id
+
+    collection = get_or_create_collection(email, user_id=uid)
+    ids = [str(uuid.uuid4()) for _ in texts]
+    collection.add(
+        ids=ids,
+        documents=texts,
+        embeddings=HashEmbeddings().embed_documents(texts),
+        metadatas=[{"filename": filename, "chunk_index": i, "page": 0, "user_email": email} for i in range(len(texts))],
+    )
+    get_bm25_index(email).rebuild(collection)
+    return doc_id, ids, collection
+
+
+def _bm25_ids(email: str) -> set:
+    return {row[0] for row in get_bm25_index(email)._connect().execute("SELECT chunk_id FROM chunks")}
+
+
+def test_delete_removes_only_the_legacy_chunks(user, client, workdir):
+    email, uid = user
+    path = workdir / f"{uuid.uuid4().hex}.txt"
+    path.write_text("alpha beta gamma " * 300)
+    doc_id, legacy_ids, collection = _legacy_document(user, path, "report.txt", [f"legacy chunk {i}" for i in range(3)])
+
+    # A newer upload under the same filename must survive the delete
+    newer = workdir / f"{uuid.uuid4().hex}.txt"
+    newer.write_text("delta epsilon " * 300)
+    process_uploaded_file(str(newer), "report.txt", email, uuid.uuid4().hex, user_id=uid)
+    newer_ids = set(collection.get()["ids"]) - set(legacy_ids)
+    assert newer_ids
+
+    assert client.delete(f"/api/documents/{doc_id}").status_code == 200
+
+    assert set(collection.get()["ids"]) == newer_ids
+    assert _bm25_ids(email) == newer_ids
+
+
+def test_update_diffs_against_the_legacy_chunks(user, workdir):
+    email, uid = user
+    paragraphs = [f"Paragraph {i}: " + " ".join(f"word{i}_{j}" for j in range(150)) for i in range(20)]
+    v1 = workdir / f"{uuid.uuid4().hex}.txt"
+    v1.write_text("\n\n".join(paragraphs))
+    texts = [chunk.page_content for chunk in iter_chunks(iter_pages(v1), {"load": 0, "split": 0})]
+    doc_id, legacy_ids, collection = _legacy_document(user, v1, "doc.txt", texts)
+
+    paragraphs[5] = "Changed paragraph " + "new " * 100
+    v2 = workdir / f"{uuid.uuid4().hex}.txt"
+    v2.write_text("\n\n".join(paragraphs))
+    update_document(doc_id, str(v2), "doc.txt", email, uuid.uuid4().hex, user_id=uid)
+
+    stored = collection.get(include=["metadatas"])
+    with SessionLocal() as db:
+        chunk_count = db.get(Document, doc_id).chunk_count
+    assert len(stored["ids"]) == chunk_count
+    # Every chunk is tagged now, and unchanged ones kept their vectors
+    assert all(meta.get("document_id") == doc_id for meta in stored["metadatas"])
+    kept = set(legacy_ids) & set(stored["ids"])
+    assert 0 < len(kept) < len(legacy_ids)
+    assert _bm25_ids(email) == set(stored["ids"])
+    null_rows = get_bm25_index(email)._connect().execute("SELECT count(*) FROM chunks WHERE document_id IS NULL")
+    assert null_rows.fetchone()[0] == 0
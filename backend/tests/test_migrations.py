@@ -0,0 +1,23 @@
+# backend/tests/test_migrations.py
+"""Startup migrations of databases created by an older release."""
+from sqlalchemy import MetaData, inspect, text
+
+from backend.db.database import add_missing_columns, engine
+from backend.models.models import User
+
+
+def test_adds_not_null_column_with_its_default():
+    # The users table as it shipped before corpus_version, with a row in it
+    table = User.__table__.to_metadata(MetaData(), name="users_before_corpus_version")
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE TABLE {table.name} (id INTEGER PRIMARY KEY, email VARCHAR(255))"))
+        conn.execute(text(f"INSERT INTO {table.name} (id, email) VALUES (1, 'old@example.com')"))
+
+    assert add_missing_columns(table, ["corpus_version"]) == ["corpus_version"]
+    assert add_missing_columns(table, ["corpus_version"]) == []
+
+    column = next(c for c in inspect(engine).get_columns(table.name) if c["name"] == "corpus_version")
+    assert column["nullable"] is False
+    with engine.begin() as conn:
+        assert conn.execute(text(f"SELECT corpus_version FROM {table.name}")).scalar() == 0
+        conn.execute(text(f"DROP TABLE {table.name}"))
@@ -0,0 +1,91 @@
+# backend/tests/test_page_store.py
+"""Page store: pages written at ingest read back exactly, one at a time."""
+import itertools
+import uuid
+
+import pytest
+from langchain_core.documents import Document as LCDocument
+
+from backend.rag.page_store import (
+    PageStore,
+    PageStoreWriter,
+    delete_pages,
+    has_pages,
+    iter_stored_pages,
+    read_page,
+    store_path,
+)
+
+# Ids well clear of the documents the other tests ingest
+_ids = itertools.count(900_000)
+
+PAGES = [
+    LCDocument(page_content="First page.\nWith two lines.", metadata={"source": "a.pdf", "total_pages": 3, "page": 0, "page_label": "i"}),
+    LCDocument(page_content="", metadata={"source": "a.pdf", "total_pages": 3, "page": 1, "page_label": "ii", "extract_timeout": True}),
+    LCDocument(page_content="Ünïcödé — ✓ " * 500, metadata={"source": "a.pdf", "total_pages": 3, "page": 2, "page_label": "1"}),
+]
+
+
+@pytest.fixture
+def document_id():
+    document_id = next(_ids)
+    writer = PageStoreWriter(document_id)
+    for page in PAGES:
+        writer.add(page)
+    writer.commit()
+    yield document_id
+    delete_pages(document_id)
+
+
+def test_round_trip(document_id):
+    assert [(p.page_content, p.metadata) for p in iter_stored_pages(document_id)] == [
+        (p.page_content, p.metadata) for p in PAGES
+    ]
+
+
+def test_single_page_reads(document_id):
+    page = read_page(document_id, 2)
+    assert page["text"] == PAGES[2].page_content
+    assert page["metadata"] == {"page": 2, "page_label": "1"}
+    assert page["total_pages"] == 3
+    assert read_page(document_id, 1)["metadata"]["extract_timeout"] is True
+    with pytest.raises(IndexError):
+        read_page(document_id, 3)
+
+
+def test_compressed_on_disk(document_id):
+    assert store_path(document_id).stat().st_size < len(PAGES[2].page_content.encode()) / 4
+
+
+def test_aborted_write_leaves_nothing():
+    document_id = next(_ids)
+    writer = PageStoreWriter(document_id)
+    writer.add(PAGES[0])
+    writer.abort()
+    assert not has_pages(document_id)
+    assert not store_path(document_id).with_suffix(".tmp").exists()
+    with pytest.raises(FileNotFoundError):
+        read_page(document_id, 0)
+
+
+def test_corrupt_store_is_refused(document_id):
+    path = store_path(document_id)
+    path.write_bytes(path.read_bytes()[:-1] + b"X")
+    with pytest.raises(ValueError):
+        PageStore(document_id)
+
+
+def test_ingest_fills_the_store_and_the_page_endpoint(user, client, workdir):
+    from backend.rag.pipeline import process_uploaded_file
+
+    email, uid = user
+    path = workdir / f"{uuid.uuid4().hex}.txt"
+    path.write_text("Stored once, served many times. " * 50)
+    document_id = process_uploaded_file(str(path), "p.txt", email, uuid.uuid4().hex, user_id=uid)
+
+    response = client.get(f"/api/documents/{document_id}/pages/1")
+    assert response.status_code == 200
+    assert response.json()["text"] == path.read_text()
+    assert response.json()["total_pages"] == 1
+    assert client.get(f"/api/documents/{document_id}/pages/1", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+    assert client.get(f"/api/documents/{document_id}/pages/2").status_code == 404
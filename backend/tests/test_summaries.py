@@ -0,0 +1,103 @@
+# backend/tests/test_summaries.py
+"""Precomputed summaries: a superseded version never gets written, and the combined view is capped."""
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from backend.db.database import SessionLocal
+from backend.models.document import Document
+from backend.rag import summaries
+from backend.rag.pipeline import process_uploaded_file
+from backend.rag.summaries import build_document_summary, stored_summary
+
+
+class NumberedLLM:
+    """Answers every prompt with a short numbered summary, no model needed."""
+
+    def __init__(self):
+        self.prompts = 0
+
+    def batch(self, prompts, config=None):
+        replies = []
+        for _ in prompts:
+            self.prompts += 1
+            replies.append(SimpleNamespace(content=f"summary {self.prompts}"))
+        return replies
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    fake = NumberedLLM()
+    monkeypatch.setattr(summaries, "get_llm", lambda: fake)
+    return fake
+
+
+@pytest.fixture
+def document(user, workdir):
+    email, uid = user
+    path = workdir / f"{uuid.uuid4().hex}.txt"
+    path.write_text("A long report. " * 2000)
+    file_hash = uuid.uuid4().hex
+    return process_uploaded_file(str(path), "report.txt", email, file_hash, user_id=uid), file_hash
+
+
+def _stored(document_id: int):
+    with SessionLocal() as db:
+        return db.query(Document.summary, Document.section_summaries).filter(Document.id == document_id).one()
+
+
+def _replace_version(document_id: int) -> None:
+    with SessionLocal() as db:
+        db.query(Document).filter(Document.id == document_id).update({Document.file_hash: uuid.uuid4().hex})
+        db.commit()
+
+
+def test_summary_is_stored_for_the_current_version(llm, document):
+    document_id, file_hash = document
+    result = build_document_summary(document_id, file_hash=file_hash)
+
+    stored = _stored(document_id)
+    assert stored.summary == result["summary"]
+    assert [s["section"] for s in stored.section_summaries] == list(range(1, len(result["sections"]) + 1))
+    assert len(result["sections"]) > 1
+
+
+def test_job_for_an_older_version_is_skipped(llm, document):
+    document_id, file_hash = document
+    _replace_version(document_id)
+
+    assert build_document_summary(document_id, file_hash=file_hash) is None
+    assert llm.prompts == 0
+    assert _stored(document_id).summary is None
+
+
+def test_version_replaced_while_summarizing_is_dropped(llm, document, monkeypatch):
+    document_id, file_hash = document
+    reduce = summaries.reduce_summaries
+
+    def reduce_then_replace(*args, **kwargs):
+        summary = reduce(*args, **kwargs)
+        # A new version lands while the reduce step is still running
+        _replace_version(document_id)
+        return summary
+
+    monkeypatch.setattr(summaries, "reduce_summaries", reduce_then_replace)
+    assert build_document_summary(document_id, file_hash=file_hash) is None
+    assert _stored(document_id) == (None, None)
+
+
+def test_combined_summary_is_capped_newest_first(user, monkeypatch):
+    _, uid = user
+    with SessionLocal() as db:
+        for i in range(5):
+            db.add(Document(filename=f"doc{i}.txt", file_path="/dev/null", file_hash=uuid.uuid4().hex,
+                            user_id=uid, summary=f"summary of doc{i} " + "x" * 300))
+        db.commit()
+    monkeypatch.setattr(summaries, "SUMMARY_COMBINED_MAX_TOKENS", 200)
+
+    combined = stored_summary(uid)
+    assert len(combined) <= 200 * 4 + 100
+    assert combined.startswith("doc4.txt:")
+    assert "doc0.txt" not in combined
+    assert combined.endswith("older document(s) left out for length.)")
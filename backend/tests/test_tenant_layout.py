@@ -0,0 +1,79 @@
+# backend/tests/test_tenant_layout.py
+"""The shared tenant layout: one collection, every call scoped by user_id."""
+import uuid
+
+import pytest
+
+from backend.benchmarks.fakes import HashEmbeddings
+from backend.benchmarks.fixtures import write_fixture
+from backend.db.database import SessionLocal
+from backend.models.document import Document
+from backend.rag.pipeline import process_uploaded_file
+from backend.rag.vector_store import TenantCollection, get_collection_handle
+
+
+@pytest.fixture
+def shared():
+    """A fresh shared collection, whatever CHROMA_TENANT_LAYOUT the run uses."""
+    return get_collection_handle(f"shared_{uuid.uuid4().hex[:8]}")
+
+
+def _add(tenant: TenantCollection, texts: list, document_id: int) -> list:
+    ids = [str(uuid.uuid4()) for _ in texts]
+    tenant.add(
+        ids=ids,
+        documents=texts,
+        embeddings=HashEmbeddings().embed_documents(texts),
+        metadatas=[{"document_id": document_id, "chunk_index": i} for i in range(len(texts))],
+    )
+    return ids
+
+
+def test_users_never_see_each_others_chunks(shared):
+    alice, bob = TenantCollection(shared, 1), TenantCollection(shared, 2)
+    alice_ids = _add(alice, ["alice's secret plan", "alice's budget"], document_id=7)
+    bob_ids = _add(bob, ["bob's secret plan"], document_id=7)
+
+    # Same document id, same words: still only the caller's own chunks
+    assert set(alice.get(where={"document_id": 7})["ids"]) == set(alice_ids)
+    assert set(bob.get()["ids"]) == set(bob_ids)
+    hits = alice.query(query_embeddings=HashEmbeddings().embed_documents(["bob's secret plan"]), n_results=10)
+    assert set(hits["ids"][0]) == set(alice_ids)
+    # Asking for another user's ids by name returns nothing
+    assert alice.get(ids=bob_ids)["ids"] == []
+
+    # A delete can't reach past the caller either
+    alice.delete(ids=bob_ids)
+    alice.delete(where={"document_id": 7})
+    assert set(bob.get()["ids"]) == set(bob_ids)
+    assert alice.get()["ids"] == []
+
+
+def test_metadata_cannot_claim_another_user(shared):
+    mallory, victim = TenantCollection(shared, 3), TenantCollection(shared, 4)
+    mallory.add(
+        ids=["forged"],
+        documents=["planted"],
+        embeddings=HashEmbeddings().embed_documents(["planted"]),
+        metadatas=[{"user_id": 4}],
+    )
+    assert victim.get()["ids"] == []
+    assert mallory.get()["ids"] == ["forged"]
+
+
+class NoScans:
+    """A collection that fails any read: count() must not touch the index."""
+
+    def get(self, *args, **kwargs):
+        raise AssertionError("count() fetched ids from the vector index")
+
+
+def test_count_comes_from_chunk_bookkeeping(user, new_user, workdir):
+    email, uid = user
+    document_id = process_uploaded_file(write_fixture(workdir, "txt", 2), "c.txt", email, uuid.uuid4().hex, user_id=uid)
+    with SessionLocal() as db:
+        chunk_count = db.get(Document, document_id).chunk_count
+
+    assert chunk_count > 0
+    assert TenantCollection(NoScans(), uid).count() == chunk_count
+    assert TenantCollection(NoScans(), new_user()[1]).count() == 0
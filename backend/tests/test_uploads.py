@@ -0,0 +1,181 @@
+# backend/tests/test_uploads.py
+"""Uploads: duplicate checks (per user, never across users) and batch archives."""
+import hashlib
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+
+from backend.db import database
+from backend.db.database import SessionLocal, add_missing_indexes
+from backend.jobs.worker import run_job
+from backend.models.document import Document
+from backend.models.job import IngestJob
+from backend.utils.file_hash import FileTooLargeError
+from backend.utils.upload_stream import MultipartFileSink
+
+BODY = b"The same paper, uploaded by two people. " * 200
+
+
+def _upload(client, name: str = "paper.txt", body: bytes = BODY):
+    return client.post("/api/upload", files={"file": (name, body, "text/plain")})
+
+
+def _job(job_id: int) -> IngestJob:
+    with SessionLocal() as db:
+        return db.get(IngestJob, job_id)
+
+
+def test_two_users_can_upload_the_same_file(new_user, login):
+    documents = []
+    for user in (new_user(), new_user()):
+        response = _upload(login(user))
+        assert response.status_code == 200
+        job_id = response.json()["job_id"]
+        run_job(job_id)
+        job = _job(job_id)
+        assert job.status == "done", job.error
+        documents.append(job.document_id)
+
+    with SessionLocal() as db:
+        hashes = {db.get(Document, document_id).file_hash for document_id in documents}
+    assert len(set(documents)) == 2 and len(hashes) == 1
+
+
+def test_same_user_cannot_upload_a_file_twice(client):
+    run_job(_upload(client).json()["job_id"])
+    response = _upload(client, name="copy.txt")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "File already uploaded"
+
+
+def test_startup_migrates_global_file_hash_uniqueness(monkeypatch, tmp_path):
+    # documents as created by an older release: file_hash unique across all users
+    old = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with old.begin() as conn:
+        conn.execute(text("CREATE TABLE documents (id INTEGER PRIMARY KEY, user_id INTEGER, file_hash VARCHAR(64))"))
+        conn.execute(text("CREATE UNIQUE INDEX ix_documents_file_hash ON documents (file_hash)"))
+    monkeypatch.setattr(database, "engine", old)
+
+    names = ["uq_documents_user_file_hash", "ix_documents_file_hash"]
+    assert add_missing_indexes(Document.__table__, names) == names
+    assert add_missing_indexes(Document.__table__, names) == []
+
+    insert = text("INSERT INTO documents (user_id, file_hash) VALUES (:user_id, 'abc')")
+    with old.begin() as conn:
+        conn.execute(insert, {"user_id": 1})
+        conn.execute(insert, {"user_id": 2})
+    with pytest.raises(IntegrityError), old.begin() as conn:
+        conn.execute(insert, {"user_id": 1})
+
+
+# =========================
+# ARCHIVES
+# =========================
+def _zip(members: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, body in members.items():
+            archive.writestr(name, body)
+    return buffer.getvalue()
+
+
+def _batch(client, *files):
+    response = client.post("/api/upload/batch", files=[("files", f) for f in files])
+    assert response.status_code == 200, response.text
+    return {item["filename"]: item for item in response.json()["files"]}
+
+
+def test_corrupt_zip_member_is_rejected_not_fatal(client):
+    body = b"corrupted on the way " * 500
+    data = bytearray(_zip({"good.txt": b"good member " * 100, "bad.txt": body}))
+    # Flip a byte of bad.txt's compressed data: its CRC no longer matches
+    start = data.index(b"bad.txt") + len("bad.txt")
+    data[start + 5] ^= 0xFF
+
+    files = _batch(client, ("docs.zip", bytes(data), "application/zip"))
+    assert files["docs.zip/good.txt"]["status"] == "queued"
+    assert files["docs.zip/bad.txt"]["status"] == "rejected"
+    assert files["docs.zip/bad.txt"]["reason"].startswith("Unreadable archive member")
+
+
+def test_encrypted_zip_member_is_rejected(client):
+    data = bytearray(_zip({"secret.txt": b"top secret " * 100, "open.txt": b"nothing to hide " * 100}))
+    # Mark secret.txt encrypted in its local and central directory headers
+    for signature in (b"PK\x03\x04", b"PK\x01\x02"):
+        offset = data.index(signature)
+        flags = offset + (6 if signature == b"PK\x03\x04" else 8)
+        data[flags] |= 0x01
+
+    files = _batch(client, ("docs.zip", bytes(data), "application/zip"))
+    assert files["docs.zip/secret.txt"]["status"] == "rejected"
+    assert files["docs.zip/open.txt"]["status"] == "queued"
+
+
+def test_truncated_tar_keeps_the_members_before_the_damage(client):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, body in (("first.txt", b"first member " * 100), ("second.txt", os.urandom(200_000))):
+            info = tarfile.TarInfo(name)
+            info.size = len(body)
+            archive.addfile(info, io.BytesIO(body))
+    data = buffer.getvalue()[:-50_000]
+
+    files = _batch(client, ("docs.tar.gz", data, "application/gzip"))
+    assert files["docs.tar.gz/first.txt"]["status"] == "queued"
+    assert files["docs.tar.gz/second.txt"]["status"] == "rejected"
+
+
+def test_invalid_types_and_duplicates_are_reported(client):
+    run_job(_upload(client).json()["job_id"])
+    archive = _zip({"a.txt": b"same bytes " * 100, "copy/a.txt": b"same bytes " * 100, "tool.exe": b"MZ"})
+
+    files = _batch(client, ("docs.zip", archive, "application/zip"), ("paper.txt", BODY, "text/plain"))
+    assert files["docs.zip/a.txt"]["status"] == "queued"
+    assert files["docs.zip/copy/a.txt"] == {
+        "filename": "docs.zip/copy/a.txt", "status": "duplicate", "duplicate_of": "docs.zip/a.txt",
+    }
+    assert files["docs.zip/tool.exe"]["status"] == "rejected"
+    assert files["paper.txt"]["status"] == "duplicate"
+
+
+# =========================
+# STREAMED SINGLE UPLOADS
+# =========================
+def test_sink_writes_and_hashes_the_file_part_across_any_chunking(tmp_path):
+    body = (
+        b"--XyZ\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nnot the file\r\n"
+        b"--XyZ\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.txt\"\r\n"
+        b"Content-Type: text/plain\r\n\r\n" + BODY + b"\r\n--XyZ--\r\n"
+    )
+    for chunk_size in (1, 7, 4096, len(body)):
+        dest = tmp_path / f"{chunk_size}.part"
+        sink = MultipartFileSink("multipart/form-data; boundary=XyZ", str(dest))
+        for start in range(0, len(body), chunk_size):
+            sink.write(body[start:start + chunk_size])
+        sink.finish()
+        assert (sink.filename, sink.size, sink.file_hash) == ("a.txt", len(BODY), hashlib.sha256(BODY).hexdigest())
+        assert dest.read_bytes() == BODY
+
+
+def test_sink_enforces_the_size_limit_mid_stream(tmp_path):
+    sink = MultipartFileSink("multipart/form-data; boundary=XyZ", str(tmp_path / "big.part"), max_size=1000)
+    sink.write(b"--XyZ\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.txt\"\r\n\r\n")
+    with pytest.raises(FileTooLargeError):
+        sink.write(b"x" * 1001)
+    sink.close()
+
+
+def test_upload_rejects_bad_type_and_missing_file(client):
+    response = _upload(client, name="tool.exe")
+    assert response.status_code == 400 and response.json()["detail"].startswith("Invalid file type")
+
+    response = client.post("/api/upload", files={"other": ("a.txt", b"hello", "text/plain")})
+    assert response.status_code == 400 and response.json()["detail"] == "No file in form field 'file'"
+
+    response = client.post("/api/upload", content=b"hello", headers={"Content-Type": "text/plain"})
+    assert response.status_code == 400
@@ -0,0 +1,85 @@
+# backend/utils/body_limit.py
+"""
+Request body size limits, enforced before the app reads the body.
+
+FastAPI parses (and spools to disk) the whole multipart body before a
+handler runs, so a size check inside the handler only fires after an
+oversize upload has been received in full. This ASGI middleware rejects
+by Content-Length up front and, for chunked bodies, stops reading as soon
+as the running byte count passes the limit.
+"""
+import json
+from typing import Callable, Optional
+
+from starlette.exceptions import HTTPException
+
+
+class BodyTooLarge(HTTPException):
+    """
+    Raised from `receive` once a body passes its limit. An HTTPException,
+    so FastAPI's body parsing passes it through as a 400 with our message.
+    """
+
+    def __init__(self, detail: str):
+        super().__init__(status_code=400, detail=detail)
+
+
+class BodyLimitMiddleware:
+    """
+    Args:
+        app: The ASGI app.
+        limit_for: `limit_for(method, path)` → max body bytes for that
+            route, or None for no limit.
+    """
+
+    def __init__(self, app, limit_for: Callable[[str, str], Optional[int]]):
+        self.app = app
+        self.limit_for = limit_for
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        limit = self.limit_for(scope["method"], scope["path"])
+        if limit is None:
+            return await self.app(scope, receive, send)
+        detail = f"Upload too large. Max {limit // (1024 * 1024)}MB"
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length", b"").decode()
+        if content_length.isdigit() and int(content_length) > limit:
+            # Rejected before a single body byte is read
+            return await self._reject(send, detail)
+
+        received = 0
+        started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise BodyTooLarge(detail)
+            return message
+
+        async def tracking_send(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except BodyTooLarge:
+            if not started:
+                await self._reject(send, detail)
+
+    async def _reject(self, send, detail: str) -> None:
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 400,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                        (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -1,4 +1,5 @@
 import hashlib
+from typing import BinaryIO, Optional, Tuple
 
 def compute_file_hash(file_bytes: bytes) -> str:
     """
@@ -17,4 +18,45 @@ def compute_file_hash(file_bytes: bytes) -> str:
     sha256.update(file_bytes)
     # Return the hexadecimal digest of the hash
     return sha256.hexdigest()
-  
\ No newline at end of file
+  
+
+# Block size for streamed copies — keeps per-upload memory constant
+HASH_BLOCK_SIZE = 256 * 1024
+
+
+class FileTooLargeError(ValueError):
+    """Raised when a streamed file exceeds its size limit."""
+
+
+def stream_to_file(src: BinaryIO, dest_path: str, max_size: Optional[int] = None,
+                   block_size: int = HASH_BLOCK_SIZE) -> Tuple[str, int]:
+    """
+    Copies a file-like object to disk in fixed-size blocks, updating the
+    SHA-256 as each block arrives.
+
+    Args:
+        src: Readable binary file object.
+        dest_path: Where to write the copy.
+        max_size: Optional byte limit, enforced mid-stream.
+        block_size: Bytes read per iteration.
+
+    Returns:
+        Tuple of (hex SHA-256, size in bytes).
+
+    Raises:
+        FileTooLargeError: As soon as more than `max_size` bytes were read.
+            The partial file is left for the caller to clean up.
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(dest_path, "wb") as out:
+        while True:
+            block = src.read(block_size)
+            if not block:
+                break
+            size += len(block)
+            if max_size is not None and size > max_size:
+                raise FileTooLargeError(f"File exceeds {max_size} bytes")
+            sha256.update(block)
+            out.write(block)
+    return sha256.hexdigest(), size
@@ -0,0 +1,69 @@
+# backend/utils/lazy.py
+"""
+Thread-safe lazy initialization for heavy, process-wide resources
+(embedding model, Chroma client, LLM client, DB schema).
+
+Nothing is built at import time; the first caller of `.get()` builds the
+resource while concurrent callers wait for it, and later calls are a
+single attribute read. Every resource registers itself so `/ready` can
+report which ones are warm and how long each took to build.
+"""
+import threading
+import time
+from typing import Callable, Dict, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+# name → Lazy, for readiness reporting
+_registry: Dict[str, "Lazy"] = {}
+
+
+class Lazy(Generic[T]):
+    """A value built once, on first use, by `factory()`."""
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._ready = False
+        self._lock = threading.Lock()
+        self.init_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        _registry[name] = self
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def get(self) -> T:
+        if self._ready:
+            return self._value
+        with self._lock:
+            if not self._ready:
+                start = time.perf_counter()
+                try:
+                    self._value = self._factory()
+                except Exception as e:
+                    self.error = str(e)
+                    raise
+                self.init_seconds = round(time.perf_counter() - start, 3)
+                self.error = None
+                self._ready = True
+                print(f"🔥 {self.name} ready in {self.init_seconds}s")
+        return self._value
+
+    def set(self, value: T) -> None:
+        """Install a prebuilt value instead of calling the factory (benchmarks, tests)."""
+        with self._lock:
+            self._value = value
+            self._ready = True
+            self.init_seconds = 0.0
+            self.error = None
+
+    def status(self) -> dict:
+        return {"ready": self._ready, "init_seconds": self.init_seconds, "error": self.error}
+
+
+def lazy_status() -> Dict[str, dict]:
+    """Warm/cold state of every registered resource."""
+    return {name: resource.status() for name, resource in _registry.items()}
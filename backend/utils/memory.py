@@ -0,0 +1,71 @@
+import os
+import resource
+import sys
+import threading
+from typing import Optional
+
+# Seconds between RSS samples while a job runs
+SAMPLE_INTERVAL = 0.2
+
+
+def current_rss_bytes() -> Optional[int]:
+    """
+    Resident set size of this process, or None if it can't be read.
+    Reads /proc on Linux; falls back to the process high-water mark elsewhere.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS, kilobytes on Linux
+        return peak if sys.platform == "darwin" else peak * 1024
+    except Exception:
+        return None
+
+
+class PeakMemory:
+    """
+    Context manager that samples RSS on a background thread and records
+    the peak seen while the block runs (includes native allocations such
+    as model tensors, unlike tracemalloc).
+
+    Usage:
+        with PeakMemory() as mem:
+            run_job()
+        print(mem.peak_mb)
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        rss = current_rss_bytes()
+        if rss and rss > self.peak_bytes:
+            self.peak_bytes = rss
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self._sample()
+        return False
+
+    @property
+    def peak_mb(self) -> float:
+        return round(self.peak_bytes / (1024 * 1024), 1)
@@ -0,0 +1,151 @@
+# backend/utils/metrics.py
+"""
+Timing spans and Prometheus metrics.
+
+`span("ingest.embed", document_id=7)` times a block, observes it in the
+`rag_stage_seconds` histogram and writes one JSON line to the span log.
+The log goes through a QueueHandler, so the calling thread (or the event
+loop) only enqueues a record; a QueueListener thread does the I/O.
+
+Metrics are exposed at `/metrics` (see main.py). Ingestion runs in the
+worker processes: set PROMETHEUS_MULTIPROC_DIR to a directory shared by
+the API and workers and `/metrics` aggregates all of them.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+
+# =========================
+# CONFIG
+# =========================
+# Where span lines go: "stderr" or a file path
+SPAN_LOG = os.getenv("SPAN_LOG", "stderr")
+SPAN_LOG_LEVEL = os.getenv("SPAN_LOG_LEVEL", "INFO").upper()
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Latency buckets (seconds) from sub-millisecond lookups to long model calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+# =========================
+# METRICS
+# =========================
+STAGE_SECONDS = Histogram(
+    "rag_stage_seconds", "Duration of a pipeline / request stage", ["stage"], buckets=LATENCY_BUCKETS
+)
+STAGE_ERRORS = Counter("rag_stage_errors_total", "Stages that raised", ["stage"])
+TOOL_SECONDS = Histogram(
+    "rag_tool_seconds", "Duration of one chat tool call", ["tool"], buckets=LATENCY_BUCKETS
+)
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    "rag_llm_first_token_seconds", "Time from LLM call to its first streamed token",
+    ["phase"], buckets=LATENCY_BUCKETS,
+)
+LLM_COMPLETION_SECONDS = Histogram(
+    "rag_llm_completion_seconds", "Time from LLM call to the end of its stream",
+    ["phase"], buckets=LATENCY_BUCKETS,
+)
+CHAT_REQUESTS = Counter("rag_chat_requests_total", "Chat requests by outcome", ["outcome"])
+ACTIVE_CHATS = Gauge("rag_active_chats", "Chat responses currently streaming", multiprocess_mode="livesum")
+EMBED_BATCH_SIZE = Histogram(
+    "rag_embed_batch_size", "Texts per embedding call", ["source"], buckets=SIZE_BUCKETS
+)
+CACHE_LOOKUPS = Counter(
+    "rag_cache_lookups_total", "Cache lookups by cache and result (hit/miss)", ["cache", "result"]
+)
+UPLOADS = Counter("rag_uploads_total", "Upload requests by outcome", ["outcome"])
+# Refreshed from the jobs table on every scrape
+QUEUE_DEPTH = Gauge("rag_ingest_jobs", "Ingestion jobs by status", ["status"], multiprocess_mode="max")
+
+
+def cache_result(cache: str, hits: int = 0, misses: int = 0) -> None:
+    """Count cache hits/misses; hit rate = hits / (hits + misses) over any window."""
+    if hits:
+        CACHE_LOOKUPS.labels(cache, "hit").inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(cache, "miss").inc(misses)
+
+
+# =========================
+# SPAN LOG (non-blocking)
+# =========================
+span_logger = logging.getLogger("backend.spans")
+span_logger.setLevel(SPAN_LOG_LEVEL)
+span_logger.propagate = False
+
+_span_queue: queue.Queue = queue.Queue(-1)
+span_logger.addHandler(logging.handlers.QueueHandler(_span_queue))
+_sink = logging.StreamHandler() if SPAN_LOG == "stderr" else logging.FileHandler(SPAN_LOG)
+_sink.setFormatter(logging.Formatter("%(message)s"))
+_listener = logging.handlers.QueueListener(_span_queue, _sink)
+_listener.start()
+# Flush queued lines on interpreter exit
+atexit.register(_listener.stop)
+
+
+def record_span(name: str, seconds: float, status: str = "ok", **fields) -> None:
+    """Observe and log a span timed elsewhere (e.g. accumulated across a stream)."""
+    STAGE_SECONDS.labels(name).observe(seconds)
+    if status != "ok":
+        STAGE_ERRORS.labels(name).inc()
+    if span_logger.isEnabledFor(logging.INFO):
+        span_logger.info(json.dumps({
+            "span": name,
+            "ms": round(seconds * 1000, 3),
+            "status": status,
+            "pid": os.getpid(),
+            **fields,
+        }, default=str))
+
+
+@contextmanager
+def span(name: str, **fields) -> Iterator[dict]:
+    """
+    Time the enclosed block as stage `name`. Yields a dict; keys added to
+    it inside the block are logged with the span.
+    """
+    extra = dict(fields)
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield extra
+    except BaseException as e:
+        status = "error"
+        extra.setdefault("error", type(e).__name__)
+        raise
+    finally:
+        record_span(name, time.perf_counter() - start, status, **extra)
+
+
+# =========================
+# EXPOSITION
+# =========================
+def render_metrics() -> tuple[bytes, str]:
+    """Prometheus text exposition for this process, or all processes in multiprocess mode."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop a dead worker's live gauges from the multiprocess files."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,169 @@
+# backend/utils/upload_stream.py
+"""
+Single-file multipart uploads streamed straight from the request body.
+
+FastAPI's `UploadFile` is only handed to a route after Starlette has
+parsed the whole multipart body into its own spooled temp file, so
+copying it into `uploaded_files/` writes every large upload to disk twice.
+Here the body is fed to python-multipart's push parser as it arrives and
+the file part is written to its destination and hashed block by block:
+one write, constant memory.
+"""
+import hashlib
+from typing import Callable, Optional
+
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+
+try:
+    from python_multipart.exceptions import FormParserError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.exceptions import FormParserError
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from backend.utils.file_hash import FileTooLargeError
+
+
+class MalformedUpload(ValueError):
+    """The body is not multipart/form-data, or has no file in the expected field."""
+
+
+class MultipartFileSink:
+    """
+    Push parser for a multipart/form-data body: the first part named
+    `field` that carries a filename is written to `dest_path`, hashing
+    as it goes; every other part is skipped.
+
+    Args:
+        content_type: The request's Content-Type header.
+        dest_path: Where to write the file part.
+        field: Form field holding the file.
+        max_size: Optional byte limit on the file, enforced mid-stream.
+        on_filename: Called with the file's name once its part headers
+            are parsed, before any of its bytes are written; may raise to
+            reject it (e.g. a bad extension).
+    """
+
+    def __init__(
+        self,
+        content_type: str,
+        dest_path: str,
+        field: str = "file",
+        max_size: Optional[int] = None,
+        on_filename: Optional[Callable[[str], None]] = None,
+    ):
+        media_type, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if media_type != b"multipart/form-data" or not boundary:
+            raise MalformedUpload("Expected a multipart/form-data upload")
+        self.dest_path = dest_path
+        self.field = field
+        self.max_size = max_size
+        self.on_filename = on_filename
+        self.filename: Optional[str] = None
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._out = None
+        self._done = False
+        self._headers: dict = {}
+        self._header_field = b""
+        self._header_value = b""
+        self.parser = MultipartParser(boundary, callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    @property
+    def file_hash(self) -> str:
+        return self._sha256.hexdigest()
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, params = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = params.get(b"name", b"").decode("utf-8", "replace")
+        filename = params.get(b"filename")
+        if name == self.field and filename is not None and not self._done and self._out is None:
+            self.filename = filename.decode("utf-8", "replace")
+            if self.on_filename is not None:
+                self.on_filename(self.filename)
+            self._out = open(self.dest_path, "wb")
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._out is None:
+            return
+        block = data[start:end]
+        self.size += len(block)
+        if self.max_size is not None and self.size > self.max_size:
+            raise FileTooLargeError(f"File exceeds {self.max_size} bytes")
+        self._sha256.update(block)
+        self._out.write(block)
+
+    def _on_part_end(self) -> None:
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+            self._done = True
+
+    def write(self, chunk: bytes) -> None:
+        self.parser.write(chunk)
+
+    def finish(self) -> None:
+        """Check the body ended cleanly with a complete file part."""
+        self.parser.finalize()
+        if not self._done:
+            raise MalformedUpload(f"No file in form field '{self.field}'")
+
+    def close(self) -> None:
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+
+
+async def stream_upload(
+    request: Request,
+    dest_path: str,
+    max_size: Optional[int] = None,
+    field: str = "file",
+    on_filename: Optional[Callable[[str], None]] = None,
+) -> tuple[str, str, int]:
+    """
+    Write the file in `field` of a multipart request to `dest_path`
+    (see MultipartFileSink for the arguments).
+
+    Returns:
+        (filename, hex SHA-256, size in bytes)
+
+    Raises:
+        MalformedUpload: Not multipart, truncated, or no file in `field`.
+        FileTooLargeError: As soon as the file passes `max_size`. The
+            partial file is left for the caller to clean up.
+    """
+    sink = MultipartFileSink(request.headers.get("content-type", ""), dest_path, field, max_size, on_filename)
+    try:
+        async for chunk in request.stream():
+            # Parsing, hashing and the disk write stay off the event loop
+            await run_in_threadpool(sink.write, chunk)
+        await run_in_threadpool(sink.finish)
+    except FormParserError as e:
+        raise MalformedUpload(f"Malformed upload: {e}")
+    finally:
+        sink.close()
+    return sink.filename, sink.file_hash, sink.size
@@ -1,18 +1,29 @@
 # backend/api/utils.py
+import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Cookie, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import Cookie, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, event
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.db.database import AsyncSessionLocal
 from backend.models.models import User
 from backend.schema.schemas import UserCreate
-from backend.db.database import get_db
 
 SECRET_KEY = "your-super-secret-jwt-key-change-in-prod"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+# Verified tokens are remembered for this long (never past their own expiry).
+# Also the longest another worker may keep accepting a deleted user's token.
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "300"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain, hashed):
@@ -21,17 +32,18 @@ def verify_password(plain, hashed):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
-def create_user(db: Session, user: UserCreate):
-    hashed = get_password_hash(user.password)
+async def create_user(db: AsyncSession, user: UserCreate):
+    # bcrypt is deliberately slow — don't run it on the event loop
+    hashed = await run_in_threadpool(get_password_hash, user.password)
     db_user = User(email=user.email, hashed_password=hashed, name=user.name)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = db.query(User).filter(User.email == email).first()
-    if not user or not verify_password(password, user.hashed_password):
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    user = await db.scalar(select(User).where(User.email == email))
+    if not user or not await run_in_threadpool(verify_password, password, user.hashed_password):
         return None
     return user
 
@@ -56,5 +68,77 @@ def verify_token(token: str = Cookie(None, alias="refresh_token")):
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-def get_current_user(token_data: dict = Depends(verify_token)):
-    return {"email": token_data["sub"]}
\ No newline at end of file
+class TokenCache:
+    """
+    Small TTL + LRU cache of verified token → resolved user, so a request
+    doesn't re-decode the JWT or look the user up in the DB.
+    """
+
+    def __init__(self, ttl: int = TOKEN_CACHE_TTL, maxsize: int = TOKEN_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return user
+
+    def put(self, token: str, user: dict, exp: float | None = None) -> None:
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        with self._lock:
+            self._entries[token] = (expires_at, user)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for token in [t for t, (_, u) in self._entries.items() if u["id"] == user_id]:
+                del self._entries[token]
+
+
+token_cache = TokenCache()
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target):
+    # Drop this process's cached tokens for a deleted user right away;
+    # other processes find the user gone on their next cache miss
+    token_cache.invalidate_user(target.id)
+
+
+async def get_current_user(token: str = Cookie(None, alias="refresh_token")):
+    """
+    Resolve the session to {"email", "id"} once per token (per
+    TOKEN_CACHE_TTL). A cache miss always checks the user still exists,
+    by the "uid" claim, or by email for older tokens without it.
+    """
+    if not token:
+        raise HTTPException(status_code=401, detail="No token")
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+
+    token_data = verify_token(token)
+    query = select(User.id).where(User.email == token_data["sub"])
+    if token_data.get("uid") is not None:
+        query = query.where(User.id == token_data["uid"])
+    async with AsyncSessionLocal() as db:
+        user_id = await db.scalar(query)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    user = {"email": token_data["sub"], "id": user_id}
+    token_cache.put(token, user, token_data.get("exp"))
+    return user
\ No newline at end of file